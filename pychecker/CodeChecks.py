@@ -20,9 +20,11 @@ from pychecker import msgs
 from pychecker import utils
 from pychecker import Warning
 from pychecker import OP
+from pychecker import flow
 from pychecker import Stack
 from pychecker import python
 from pychecker import pcmodules
+from pychecker import trace
 
 __pychecker__ = 'no-argsused'
 
@@ -613,9 +615,11 @@ def _handleDeprecated(code, name):
         return False
     else:
         if cfg().deprecated:
-            msg = msgs.USING_DEPRECATED_MODULE % name
             if undeprecated:
-                msg.data = msg.data + msgs.USE_INSTEAD % undeprecated
+                msg = msgs.USING_DEPRECATED_MODULE_INSTEAD % \
+                      (name, undeprecated)
+            else:
+                msg = msgs.USING_DEPRECATED_MODULE % name
             code.addWarning(msg)
         return True
 
@@ -645,13 +649,13 @@ def _handleImport(code, operand, module, main, fromWhere):
 
     if operand == '*':
         if isinstance(fromWhere, pcmodules.PyCheckerModule):
-            utils.debug('Handling * import, adding %r',
-                fromWhere.getTokenNames())
+            trace.event(trace.IMPORT, trace.BRIEF,
+                'Handling * import, adding %r', fromWhere.getTokenNames())
             for name in fromWhere.getTokenNames():
                 module.addImported(name, code.getLineNum(), fromWhere)
         else:
-            utils.debug('Handling * import, but no PC module for %r',
-                fromWhere)
+            trace.event(trace.IMPORT, trace.BRIEF,
+                'Handling * import, but no PC module for %r', fromWhere)
 
     # FIXME: direct names imported should be added too
 
@@ -745,7 +749,7 @@ def _handleImportFrom(code, operand, module, main):
     # see if the module we are importing from has the operand as a module
     siblingModuleDir = module.moduleDir
     pcmodule = _getOrLoadPCModule(code, moduleName, moduleDir,
-        siblingModuleDir=siblingModuleDir)
+        siblingModuleDir=siblingModuleDir, importer=module.moduleName)
     if operand in pcmodule.modules:
         code.pushStack(Stack.Item(pcmodule.modules[operand], types.ModuleType))
     else:
@@ -775,9 +779,7 @@ def _getFormatInfo(formatString, code) :
     for section in sections[1:] :
         orig_section = section
         if not section:
-            w = msgs.INVALID_FORMAT % orig_section
-            w.data = w.data + ' (end of format string)'
-            code.addWarning(w)
+            code.addWarning(msgs.INVALID_FORMAT_END % orig_section)
             continue
 
         # handle dictionary formats
@@ -929,15 +931,7 @@ def _getTypeStr(t):
 
 
 def _getLineNum(co, instr_index):
-    co_lnotab = co.co_lnotab
-    lineno = co.co_firstlineno
-    addr = 0
-    for lnotab_index in range(0, len(co_lnotab), 2):
-        addr = addr + ord(co_lnotab[lnotab_index])
-        if addr > instr_index:
-            return lineno
-        lineno = lineno + ord(co_lnotab[lnotab_index+1])
-    return lineno
+    return OP.decode(co).lineNum(instr_index)
 
 
 class Code :
@@ -948,10 +942,12 @@ class Code :
     @type bytes:        str
     @ivar func_code:    the function code object
     @type func_code:    L{types.CodeType}
-    @ivar index:        index into bytes for the current instruction
+    @ivar index:        index into bytes for the next instruction
     @type index:        int
-    @ivar extended_arg: extended argument for the current instruction
-    @type extended_arg: int
+    @ivar instructions: the decoded instructions of func_code
+    @type instructions: L{OP.Instructions}
+    @ivar position:     instruction number of the next instruction
+    @type position:     int
     @ivar maxCode:      length of bytes
     @type maxCode:      int
     @ivar stack:        
@@ -973,18 +969,21 @@ class Code :
     @ivar cells:        cells used for handling tokens in nested code;
                         dict of oparg -> stack item
     @type cells:        dict of int -> L{Stack.Item}
+    @ivar truncated:    whether the analysis of this code, or of code
+                        nested in it, was stopped before the end
+    @type truncated:    int (used as bool)
     """
 
     # opcodes are either 1 byte (no argument) or 3 bytes (with argument) long
     # opcode can be EXTENDED_ARGS which then accumulates to the previous arg
-    # to span values > 64K
+    # to span values > 64K; OP.Instructions takes care of both
     def __init__(self) :
         self.bytes = None
         self.func = None
         self.func_code = None
         self.index = 0
-        self.indexList = []
-        self.extended_arg = 0
+        self.instructions = None
+        self.position = 0
         self.lastLineNum = 0
         self.maxCode = 0
         self.has_except = 0
@@ -992,12 +991,9 @@ class Code :
         self.starts_and_ends_with_finally = 0
 
         self.returnValues = []
-        self.raiseValues = []
         self.stack = []
 
         self.unpackCount = 0
-        self.loops = 0
-        self.branches = {}
 
         self.warnings = []
 
@@ -1010,14 +1006,17 @@ class Code :
         self.codeObjects = {}
         self.codeOrder = []
         self.cells = {}
+        self.truncated = 0
 
     def init(self, func):
         """
         @type  func:        L{function.Function}
         """
         self.func = func
-        self.func_code, self.bytes, self.index, self.maxCode, self.extended_arg = \
+        self.func_code, self.bytes, self.index, self.maxCode, extended_arg = \
                         OP.initFuncCode(func.function)
+        self.instructions = OP.decode(self.func_code)
+        self.position = 0
         self.lastLineNum = self.func_code.co_firstlineno
         self.returnValues = []
 
@@ -1030,8 +1029,17 @@ class Code :
         line = self.lastLineNum
         # if we don't have linenum info, calc it from co_lntab & index
         if line == self.func_code.co_firstlineno:
-            # FIXME: this could be optimized, if we kept last line info
-            line = _getLineNum(self.func_code, self.index - 1)
+            line = self.instructions.lineNum(self.index - 1)
+        return line
+
+    def getLastLineNum(self):
+        """
+        Return the line number of the last instruction, wherever the
+        walk through the code is.
+        """
+        line = self.lastLineNum
+        if line == self.func_code.co_firstlineno:
+            line = self.instructions.lineNum(self.maxCode - 1)
         return line
 
     def getWarning(self, err, line = None) :
@@ -1050,7 +1058,9 @@ class Code :
         w = err
         if not isinstance(w, Warning.Warning):
             w = self.getWarning(err, line)
-        utils.debug('adding warning: %s', w.format())
+        if trace.tracing and trace.on(trace.WARNING):
+            trace.event(trace.WARNING, trace.BRIEF,
+                        'adding warning: %s', w.format())
         self.warnings.append(w)
 
     def popNextOp(self) :
@@ -1062,23 +1072,31 @@ class Code :
         The operand is the object referenced by the oparg, from the
         respective array (co_consts, co_names, co_varnames)
 
-        Changes L{index} and L{extended_arg} to point to the next operation.
+        Changes L{index} and L{position} to point to the next operation.
 
         @returns: tuple of (opcode, oparg, operand)
         @rtype:   tuple of (int, int, object)
         """
-        self.indexList.append(self.index)
-        info = OP.getInfo(self.bytes, self.index, self.extended_arg)
-        op, oparg, self.index, self.extended_arg = info
+        instructions = self.instructions
+        position = self.position
+        self.position = position + 1
+        self.index = instructions.offsets[position + 1]
+        op = instructions.ops[position]
+        oparg = instructions.opargs[position]
+        operand = instructions.operands[position]
         if op < OP.HAVE_ARGUMENT :
-            utils.debug("DIS  %d %s" % (self.indexList[-1], OP.name[op]))
-            operand = None
+            if trace.tracing and trace.on(trace.DIS, trace.DETAIL) :
+                trace.event(trace.DIS, trace.DETAIL, "DIS  %d %s" % (
+                    instructions.offsets[position], OP.name[op]))
         else :
-            operand = OP.getOperand(op, self.func_code, oparg)
-            self.label = label = OP.getLabel(op, oparg, self.index)
-            utils.debug("DIS  %d %s" % (self.indexList[-1], OP.name[op]), oparg, operand)
-            if label != None :
-                self.addBranch(label)
+            label = instructions.labels[position]
+            if label < 0 :
+                label = None
+            self.label = label
+            if trace.tracing and trace.on(trace.DIS, trace.DETAIL) :
+                trace.event(trace.DIS, trace.DETAIL, "DIS  %d %s" % (
+                    instructions.offsets[position], OP.name[op]),
+                    oparg, operand)
 
         return op, oparg, operand
 
@@ -1090,15 +1108,13 @@ class Code :
         @rtype:   tuple of (int, int, int)
         """
         try :
-            return OP.getInfo(self.bytes, self.index + offset, 0)[0:3]
+            return self.instructions.info(self.index + offset)
         except IndexError :
             return -1, 0, -1
 
     def getFirstOp(self) :
         # find the first real op, maybe we should not check if params are used
-        i = extended_arg = 0
-        while i < self.maxCode :
-            op, oparg, i, extended_arg = OP.getInfo(self.bytes, i, extended_arg)
+        for op in self.instructions.ops :
             if not OP.LINE_NUM(op) :
                 if not (OP.LOAD_CONST(op) or OP.LOAD_GLOBAL(op)) :
                     return op
@@ -1175,35 +1191,26 @@ class Code :
 
     def addReturn(self) :
         if len(self.stack) > 0 :
-            value = (self.getLineNum(), self.stack[-1], self.nextOpInfo()[2])
+            value = (self.getLineNum(), self.stack[-1], self.index)
             self.returnValues.append(value)
             self.popStack()
 
-    def addRaise(self) :
-        self.raiseValues.append((self.getLineNum(), None, self.nextOpInfo()[2]))
-
-    def addBranch(self, label) :
-        if label is not None :
-            self.branches[label] = self.branches.get(label, 0) + 1
+    def getGraph(self) :
+        """
+        @returns: the control flow graph of the code being checked
+        @rtype:   L{flow.Graph}
+        """
+        return flow.graph(self.instructions)
 
-    def removeBranch(self, label) :
-        branch = self.branches.get(label, None)
-        if branch is not None :
-            if branch == 1 :
-                del self.branches[label]
-            else :
-                self.branches[label] = branch - 1
-
-    def remove_unreachable_code(self, label) :
-        if len(self.indexList) >= 2 :
-            index = self.indexList[-2]
-            if index >= 0 and OP.POP_BLOCK(ord(self.bytes[index])) :
-                index = self.indexList[-3]
-            if index >= 0 :
-                op = ord(self.bytes[index])
-                if OP.RETURN_VALUE(op) or OP.RAISE_VARARGS(op) or \
-                   OP.END_FINALLY(ord(self.bytes[label-1])) :
-                    self.removeBranch(label)
+    def isSet(self, varname) :
+        """
+        Tells whether a variable can have been set when the instruction
+        being processed is run.  For the local variables of the code, that
+        is whether some way to the instruction sets it.
+        """
+        if varname in self.func_code.co_varnames :
+            return self.getGraph().maybeSet(varname, self.position - 1)
+        return self.unusedLocals.has_key(varname)
 
     def updateCheckerArgs(self, operand) :
         """
@@ -1472,8 +1479,7 @@ def _checkLoadLocal(code, codeSource, varname, deletedWarn, usedBeforeSetWarn) :
     deletedLine = code.deletedLocals.get(varname)
     if deletedLine :
         code.addWarning(deletedWarn % (varname, deletedLine))
-    elif not code.unusedLocals.has_key(varname) and \
-         not codeSource.func.isParam(varname) :
+    elif not code.isSet(varname) and not codeSource.func.isParam(varname) :
         code.addWarning(usedBeforeSetWarn % varname)
     code.unusedLocals[varname] = None
     _checkLocalShadow(code, codeSource.module, varname)
@@ -1554,9 +1560,10 @@ def _checkDeprecated(code, identifierTuple):
     except (KeyError, TypeError):
         pass
     else:
-        msg = msgs.USING_DEPRECATED_ATTR % name
         if undeprecated:
-            msg.data = msg.data + msgs.USE_INSTEAD % undeprecated
+            msg = msgs.USING_DEPRECATED_ATTR_INSTEAD % (name, undeprecated)
+        else:
+            msg = msgs.USING_DEPRECATED_ATTR % name
         code.addWarning(msg)
 
 def _LOAD_ATTR(oparg, operand, codeSource, code) :
@@ -1704,7 +1711,8 @@ def _COMPARE_OP(oparg, operand, codeSource, code) :
 
     _checkNoEffect(code)
 
-def _getOrLoadPCModule(code, name, moduleDir=None, siblingModuleDir=None):
+def _getOrLoadPCModule(code, name, moduleDir=None, siblingModuleDir=None,
+                       importer=None):
     """
     Retrieve a previously loaded PyChecker module by name, or load it.
 
@@ -1712,6 +1720,8 @@ def _getOrLoadPCModule(code, name, moduleDir=None, siblingModuleDir=None):
     @type  code:     L{Code}
     @param name:     the name being imported that could be deprecated
     @type  name:     str
+    @param importer: the name of the module doing the import
+    @type  importer: str
 
     @rtype: L{pcmodules.PyCheckerModule}
     """
@@ -1729,12 +1739,12 @@ def _getOrLoadPCModule(code, name, moduleDir=None, siblingModuleDir=None):
     if not pcmodule:
         pcmodule = pcmodules.PyCheckerModule(name, moduleDir=moduleDir)
         try:
-            pcmodule.load(allowImportError=True)
+            pcmodule.load(allowImportError=True, importer=importer)
         except ImportError, e:
             pcmodule = pcmodules.PyCheckerModule(name,
                 moduleDir=siblingModuleDir)
             try:
-                pcmodule.load(allowImportError=True)
+                pcmodule.load(allowImportError=True, importer=importer)
             except ImportError, e:
                 if not _handleDeprecated(code, name):
                     raise e
@@ -1749,7 +1759,8 @@ def _IMPORT_NAME(oparg, operand, codeSource, code):
         # FIXME: but should only be a candidate, and here we pass it always
         siblingModuleDir = codeSource.module.moduleDir
         pcmodule = _getOrLoadPCModule(code, operand,
-            siblingModuleDir=siblingModuleDir)
+            siblingModuleDir=siblingModuleDir,
+            importer=codeSource.module.moduleName)
         code.pushStack(Stack.Item(pcmodule, types.ModuleType))
     except ImportError:
         # TODO: a submodule could import a same-level module
@@ -1805,8 +1816,9 @@ def _shouldIgnoreCodeOptimizations(code, bytecodes, offset, length=None):
 #
 # which generates a Possible stmt w/no effect
 
-# ROT_TWO = 2; JUMP_FORWARD = 110; 2, 0 is the offset (2)
-_IGNORE_SEQ = '%c%c%c%c' % (2, 110, 2, 0)
+# ROT_TWO; JUMP_FORWARD; 2, 0 is the offset (2)
+_IGNORE_SEQ = '%c%c%c%c' % (OP.opmap['ROT_TWO'], OP.opmap['JUMP_FORWARD'],
+                             2, 0)
 def _shouldIgnoreNoEffectWarning(code):
     return _shouldIgnoreCodeOptimizations(code, _IGNORE_SEQ, 5)
 
@@ -2283,7 +2295,6 @@ def _check_string_iteration(code, index):
         code.addWarning(msgs.STRING_ITERATION % item.data)
 
 def _FOR_LOOP(oparg, operand, codeSource, code) :
-    code.loops = code.loops + 1
     _check_string_iteration(code, -2)
     _popStackRef(code, '<for_loop>', 2)
 
@@ -2291,7 +2302,6 @@ def _GET_ITER(oparg, operand, codeSource, code) :
     _check_string_iteration(code, -1)
 
 def _FOR_ITER(oparg, operand, codeSource, code) :
-    code.loops = code.loops + 1
     _popStackRef(code, '<for_iter>', 1)
 
 def _jump(oparg, operand, codeSource, code):
@@ -2303,59 +2313,6 @@ def _jump(oparg, operand, codeSource, code):
                 code.addWarning(msgs.USING_METHOD_AS_ATTR % name)
 _JUMP_ABSOLUTE = _jump
 
-def _skip_loops(bytes, i, lastLineNum, max) :
-    extended_arg = 0
-    blockCount = 1
-    while i < max :
-        op, oparg, i, extended_arg = OP.getInfo(bytes, i, extended_arg)
-        if OP.LINE_NUM(op) :
-            lastLineNum = oparg
-        elif OP.FOR_LOOP(op) or OP.FOR_ITER(op) or OP.SETUP_LOOP(op) :
-            blockCount = blockCount + 1
-        elif OP.POP_BLOCK(op) :
-            blockCount = blockCount - 1
-            if blockCount <= 0 :
-                break
-
-    return lastLineNum, i
-
-def _is_unreachable(code, topOfStack, branch, ifFalse) :
-    # Are we are checking exceptions, but we not catching all exceptions?
-    if (topOfStack.type == Stack.TYPE_COMPARISON and 
-        topOfStack.data[1] == 'exception match' and 
-        topOfStack.data[2] is not Exception) :
-        return 1
-
-    # do we possibly have while 1: ?
-    if not (topOfStack.const and topOfStack.data == 1 and ifFalse):
-        return 0
-
-    # get the op just before the branch (ie, -3)
-    op, oparg, i, extended_arg = OP.getInfo(code.bytes, branch - 3, 0)
-    # are we are jumping to before the while 1: (LOAD_CONST, JUMP_IF_FALSE)
-    if not (OP.JUMP_ABSOLUTE(op) and oparg == (code.index - 3*3)) :
-        return 0
-
-    # check if we break out of the loop
-    i = code.index
-    lastLineNum = code.getLineNum()
-    while i < branch :
-        op, oparg, i, extended_arg = OP.getInfo(code.bytes, i, extended_arg)
-        if OP.LINE_NUM(op) :
-            lastLineNum = oparg
-        elif OP.BREAK_LOOP(op) :
-            return 0
-        elif OP.FOR_LOOP(op) or OP.FOR_ITER(op) or OP.SETUP_LOOP(op) :
-            lastLineNum, i = _skip_loops(code.bytes, i, lastLineNum, branch)
-
-    i = code.index - 3*4
-    op, oparg, i, extended_arg = OP.getInfo(code.bytes, i, 0)
-    if OP.SETUP_LOOP(op) :
-        # a little lie to pretend we have a raise after a while 1:
-        code.removeBranch(i + oparg)
-        code.raiseValues.append((lastLineNum, None, i + oparg))
-    return 1
-
 # In Python 2.3, while/if 1: gets optimized to
 # ...
 # JUMP_FORWARD 4
@@ -2364,8 +2321,8 @@ def _is_unreachable(code, topOfStack, branch, ifFalse) :
 #
 # which generates a Using a conditional statement with a constant value
 
-# JUMP_FORWARD = 110; 4, 0 is the offset (4)
-_IGNORE_BOGUS_JUMP = '%c%c%c' % (110, 4, 0)
+# JUMP_FORWARD; 4, 0 is the offset (4)
+_IGNORE_BOGUS_JUMP = '%c%c%c' % (OP.opmap['JUMP_FORWARD'], 4, 0)
 def _shouldIgnoreBogusJumps(code):
     return _shouldIgnoreCodeOptimizations(code, _IGNORE_BOGUS_JUMP, 6, 3)
 
@@ -2393,9 +2350,6 @@ def _jump_conditional(oparg, operand, codeSource, code, ifFalse, nextIsPop):
            (topOfStack.data != 1 or cfg().constant1):
             _checkConstantCondition(code, topOfStack, ifFalse, nextIsPop)
 
-        if _is_unreachable(code, topOfStack, code.label, ifFalse):
-            code.removeBranch(code.label)
-
     _jump(oparg, operand, codeSource, code)
 
 # JUMP_IF_FALSE(delta)
@@ -2408,7 +2362,6 @@ def _JUMP_IF_TRUE(oparg, operand, codeSource, code):
 
 def _JUMP_FORWARD(oparg, operand, codeSource, code):
     _jump(oparg, operand, codeSource, code)
-    code.remove_unreachable_code(code.label)
 
 # POP_JUMP_IF_FALSE(target)
 # If TOS is false, sets the bytecode counter to target. TOS is popped.
@@ -2452,7 +2405,6 @@ def _checkStrException(code, varType, item):
         code.addWarning(msgs.RAISE_STR_EXCEPTION % item.data)
 
 def _RAISE_VARARGS(oparg, operand, codeSource, code) :
-    code.addRaise()
     if not cfg().badExceptions:
         return
 
@@ -2508,157 +2460,28 @@ _STORE_SLICE3 = _unimplemented
 # new in 2.7
 _BUILD_SET = _unimplemented
 
+# these op codes are handled by the function for another one
+_INPLACE_ADD = _BINARY_ADD
+_INPLACE_SUBTRACT = _BINARY_SUBTRACT
+_INPLACE_MULTIPLY = _BINARY_MULTIPLY
+_INPLACE_DIVIDE = _BINARY_DIVIDE
+_INPLACE_MODULO = _BINARY_MODULO
+_INPLACE_POWER = _BINARY_POWER
+_INPLACE_LSHIFT = _BINARY_LSHIFT
+_INPLACE_RSHIFT = _BINARY_RSHIFT
+_INPLACE_AND = _BINARY_AND
+_INPLACE_XOR = _BINARY_XOR
+_INPLACE_OR = _BINARY_OR
+_SET_LINENO = _LINE_NUM
+
 # dispatched from pychecker/warn.py
+# each op code is handled by the function named after it, with the +
+# dropped from SLICE+0 and the like
 DISPATCH = [ None ] * 256
-DISPATCH[  0] = _STOP_CODE
-DISPATCH[  1] = _POP_TOP
-DISPATCH[  2] = _ROT_TWO
-DISPATCH[  3] = _ROT_THREE
-DISPATCH[  4] = _DUP_TOP
-DISPATCH[  5] = _ROT_FOUR
-DISPATCH[  9] = _NOP            # since Python 2.4
-DISPATCH[ 10] = _UNARY_POSITIVE
-DISPATCH[ 11] = _UNARY_NEGATIVE
-DISPATCH[ 12] = _UNARY_NOT
-DISPATCH[ 13] = _UNARY_CONVERT
-DISPATCH[ 15] = _UNARY_INVERT
-DISPATCH[ 18] = _LIST_APPEND
-DISPATCH[ 19] = _BINARY_POWER
-DISPATCH[ 20] = _BINARY_MULTIPLY
-DISPATCH[ 21] = _BINARY_DIVIDE
-DISPATCH[ 22] = _BINARY_MODULO
-DISPATCH[ 23] = _BINARY_ADD
-DISPATCH[ 24] = _BINARY_SUBTRACT
-DISPATCH[ 25] = _BINARY_SUBSCR
-DISPATCH[ 26] = _BINARY_FLOOR_DIVIDE
-DISPATCH[ 27] = _BINARY_TRUE_DIVIDE
-DISPATCH[ 28] = _INPLACE_FLOOR_DIVIDE
-DISPATCH[ 29] = _INPLACE_TRUE_DIVIDE
-DISPATCH[ 30] = _SLICE0
-DISPATCH[ 31] = _SLICE1
-DISPATCH[ 32] = _SLICE2
-DISPATCH[ 33] = _SLICE3
-DISPATCH[ 40] = _STORE_SLICE0
-DISPATCH[ 41] = _STORE_SLICE1
-DISPATCH[ 42] = _STORE_SLICE2
-DISPATCH[ 43] = _STORE_SLICE3
-DISPATCH[ 50] = _DELETE_SLICE0
-DISPATCH[ 51] = _DELETE_SLICE1
-DISPATCH[ 52] = _DELETE_SLICE2
-DISPATCH[ 53] = _DELETE_SLICE3
-DISPATCH[ 54] = _STORE_MAP              # Since Python 2.6
-DISPATCH[ 55] = _BINARY_ADD             # INPLACE
-DISPATCH[ 56] = _BINARY_SUBTRACT        # INPLACE
-DISPATCH[ 57] = _BINARY_MULTIPLY        # INPLACE
-DISPATCH[ 58] = _BINARY_DIVIDE          # INPLACE
-DISPATCH[ 59] = _BINARY_MODULO          # INPLACE
-DISPATCH[ 60] = _STORE_SUBSCR
-DISPATCH[ 61] = _DELETE_SUBSCR
-DISPATCH[ 62] = _BINARY_LSHIFT
-DISPATCH[ 63] = _BINARY_RSHIFT
-DISPATCH[ 64] = _BINARY_AND
-DISPATCH[ 65] = _BINARY_XOR
-DISPATCH[ 66] = _BINARY_OR
-DISPATCH[ 67] = _BINARY_POWER           # INPLACE
-DISPATCH[ 68] = _GET_ITER
-DISPATCH[ 70] = _PRINT_EXPR
-DISPATCH[ 71] = _PRINT_ITEM
-DISPATCH[ 72] = _PRINT_NEWLINE
-DISPATCH[ 73] = _PRINT_ITEM_TO
-DISPATCH[ 74] = _PRINT_NEWLINE_TO
-DISPATCH[ 75] = _BINARY_LSHIFT          # INPLACE
-DISPATCH[ 76] = _BINARY_RSHIFT          # INPLACE
-DISPATCH[ 77] = _BINARY_AND             # INPLACE
-DISPATCH[ 78] = _BINARY_XOR             # INPLACE
-DISPATCH[ 79] = _BINARY_OR              # INPLACE
-DISPATCH[ 80] = _BREAK_LOOP
-DISPATCH[ 81] = _WITH_CLEANUP           # Since Python 2.5
-DISPATCH[ 82] = _LOAD_LOCALS
-DISPATCH[ 83] = _RETURN_VALUE
-DISPATCH[ 84] = _IMPORT_STAR
-DISPATCH[ 85] = _EXEC_STMT
-DISPATCH[ 86] = _YIELD_VALUE
-DISPATCH[ 87] = _POP_BLOCK
-DISPATCH[ 88] = _END_FINALLY
-DISPATCH[ 89] = _BUILD_CLASS
-DISPATCH[ 90] = _STORE_NAME
-DISPATCH[ 91] = _DELETE_NAME
-DISPATCH[ 92] = _UNPACK_SEQUENCE
-DISPATCH[ 93] = _FOR_ITER
+for _name, _op in OP.opmap.items():
+    DISPATCH[_op] = globals().get('_' + _name.replace('+', ''))
+
 # changed from no arguments to taking an argument and 18 to 94 in 2.7
 # Python svn revision 67818
-DISPATCH[ 94] = _LIST_APPEND_2_7
-DISPATCH[ 95] = _STORE_ATTR
-DISPATCH[ 96] = _DELETE_ATTR
-DISPATCH[ 97] = _STORE_GLOBAL
-DISPATCH[ 98] = _DELETE_GLOBAL
-DISPATCH[ 99] = _DUP_TOPX
-DISPATCH[100] = _LOAD_CONST
-DISPATCH[101] = _LOAD_NAME
-DISPATCH[102] = _BUILD_TUPLE
-DISPATCH[103] = _BUILD_LIST
-
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    DISPATCH[104] = _BUILD_SET
-    DISPATCH[105] = _BUILD_MAP
-    DISPATCH[106] = _LOAD_ATTR
-    DISPATCH[107] = _COMPARE_OP
-    DISPATCH[108] = _IMPORT_NAME
-    DISPATCH[109] = _IMPORT_FROM
-else:
-    DISPATCH[104] = _BUILD_MAP
-    DISPATCH[105] = _LOAD_ATTR
-    DISPATCH[106] = _COMPARE_OP
-    DISPATCH[107] = _IMPORT_NAME
-    DISPATCH[108] = _IMPORT_FROM
-
-DISPATCH[110] = _JUMP_FORWARD
-
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    DISPATCH[111] = _POP_JUMP_IF_FALSE
-    DISPATCH[112] = _POP_JUMP_IF_TRUE
-else:
-    DISPATCH[111] = _JUMP_IF_FALSE
-    DISPATCH[112] = _JUMP_IF_TRUE
-
-DISPATCH[113] = _JUMP_ABSOLUTE
-
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    DISPATCH[114] = _JUMP_IF_FALSE_OR_POP
-    DISPATCH[115] = _JUMP_IF_TRUE_OR_POP
-else:
-    DISPATCH[114] = _FOR_LOOP
-
-DISPATCH[116] = _LOAD_GLOBAL
-DISPATCH[119] = _CONTINUE_LOOP
-DISPATCH[120] = _SETUP_LOOP
-DISPATCH[121] = _SETUP_EXCEPT
-DISPATCH[122] = _SETUP_FINALLY
-DISPATCH[124] = _LOAD_FAST
-DISPATCH[125] = _STORE_FAST
-DISPATCH[126] = _DELETE_FAST
-DISPATCH[127] = _LINE_NUM
-DISPATCH[130] = _RAISE_VARARGS
-DISPATCH[131] = _CALL_FUNCTION
-DISPATCH[132] = _MAKE_FUNCTION
-DISPATCH[133] = _BUILD_SLICE
-DISPATCH[134] = _MAKE_CLOSURE
-DISPATCH[135] = _LOAD_CLOSURE
-DISPATCH[136] = _LOAD_DEREF
-DISPATCH[137] = _STORE_DEREF
-DISPATCH[140] = _CALL_FUNCTION_VAR
-DISPATCH[141] = _CALL_FUNCTION_KW
-DISPATCH[142] = _CALL_FUNCTION_VAR_KW
-
-# changed from 143 to 145 in 2.7, because 143 is now _SETUP_WITH
-# Python svn revision 72912
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    DISPATCH[143] = _SETUP_WITH
-    DISPATCH[145] = _EXTENDED_ARG
-else:
-    DISPATCH[143] = _EXTENDED_ARG
-
-# Added in 2.7
-# Python svn revision 77422
-DISPATCH[146] = _SET_ADD
-DISPATCH[147] = _MAP_ADD
+if OP.opmap.get('LIST_APPEND', 0) >= OP.HAVE_ARGUMENT:
+    DISPATCH[OP.opmap['LIST_APPEND']] = _LIST_APPEND_2_7
@@ -31,6 +31,10 @@ def get_warning_levels():
 
 _WARNING_LEVELS = get_warning_levels()
 
+_OUTPUT_FORMATS = ('text', 'jsonl')
+
+_DEFERRED_MODES = ('thread', 'exit')
+
 _RC_FILE = ".pycheckrc"
 CHECKER_VAR = '__pychecker__'
 _VERSION = '0.8.18'
@@ -57,10 +61,33 @@ _OPTIONS = (
  ('',  0, 'only', 'only', 'only warn about files passed on the command line'),
  ('e', 1, 'level', None, 'the maximum error level of warnings to be displayed'),
  ('#', 1, 'limit', 'limit', 'the maximum number of warnings to be displayed'),
+ ('',  1, 'format', None, 'output format of the warnings: text, or jsonl for one JSON object per line'),
  ('F', 1, 'config', None, 'specify .pycheckrc file to use'),
  ('',  0, 'quixote', None, 'support Quixote\'s PTL modules'),
  ('',  1, 'evil', 'evil', 'list of evil C extensions that crash the interpreter'),
  ('',  0, 'keepgoing', 'ignoreImportErrors', 'ignore import errors'),
+ ('',  1, 'jobs', 'jobs', 'number of worker processes to check files in parallel'),
+ ('',  1, 'maxworkermem', 'maxWorkerMemory', 'restart a worker process once it uses this many megabytes'),
+ ('',  1, 'cache', 'cacheDir', 'directory or http:// url to keep warnings for unchanged files in'),
+ ('',  0, 'static', 'staticAnalysis', 'do not import modules, only look at their byte code'),
+ ('',  0, 'sandbox', 'sandboxImports', 'import modules outside the standard library in a child process, so crashes and hangs only fail their import'),
+ ('',  1, 'sandbox-timeout', 'sandboxTimeout', 'with --sandbox, seconds a module gets to import'),
+ ('',  1, 'server', 'serverSocket', 'run as a daemon checking files for clients on this unix socket'),
+ ('',  0, 'fork', 'forkServer', 'with --server, check each request in a forked child of the daemon'),
+ ('',  1, 'preload', 'preloadModules', 'with --server, modules to load once before checking any files'),
+ ('',  1, 'connect', 'clientSocket', 'have the daemon on this unix socket check the files'),
+ ('',  1, 'coordinator', 'coordinatorAddress', 'check the files on the workers connecting to this [host:]port'),
+ ('',  1, 'worker', 'workerAddress', 'check files for the coordinator on this [host:]port'),
+ ('',  0, 'watch', 'watch', 'keep running, checking files again when they or their imports change'),
+ ('',  1, 'exclude', 'excludes', 'do not check (or import) files and directories matching these glob patterns'),
+ ('',  1, 'files-from', 'filesFrom', 'also check the files listed in this file, one per line or NUL separated; - is stdin'),
+ ('',  0, 'progress', 'progress', 'show how far the check is on stderr'),
+ ('',  1, 'progress-file', 'progressFile', 'write how far the check is to this file'),
+ ('',  1, 'metrics-file', 'metricsFile', 'write counters and timers of the run to this file, in the Prometheus textfile format'),
+ ('',  0, 'import-profile', 'importProfile', 'show how long importing each module took, and what imported it'),
+ ('',  0, 'stream', 'streamWarnings', 'check one file at a time, printing the warnings of each module right away'),
+ ('',  1, 'deferred', None, 'with import pychecker.checker, check imported modules in batches, in a thread or at exit'),
+ ('',  1, 'changed-since', 'changedSince', 'only check files changed since this git revision, and the files importing them'),
      ]),
     ('Error Control', [
  ('i', 0, 'import', 'importUsed', 'unused imports'),
@@ -136,6 +163,8 @@ _OPTIONS = (
  ('J', 1, 'maxargs', 'maxArgs', 'maximum # of arguments to a function'),
  ('K', 1, 'maxlocals', 'maxLocals', 'maximum # of locals in a function'),
  ('5', 1, 'maxrefs', 'maxReferences', 'maximum # of identifier references (Law of Demeter)'),
+ ('',  1, 'maxinstructions', 'maxInstructions', 'stop analyzing a function after this many byte code instructions, 0 for no limit'),
+ ('',  1, 'maxmoduleseconds', 'maxModuleSeconds', 'stop analyzing a module after this many seconds, 0 for no limit'),
  ('m', 0, 'moduledoc', 'noDocModule', 'no module doc strings'),
  ('c', 0, 'classdoc', 'noDocClass', 'no class doc strings'),
  ('f', 0, 'funcdoc', 'noDocFunc', 'no function/method doc strings'),
@@ -144,6 +173,8 @@ _OPTIONS = (
  ( '', 0, 'rcfile', None, 'print a .pycheckrc file generated from command line args'),
  ('P', 0, 'printparse', 'printParse', 'print internal checker parse structures'),
  ('d', 0, 'debug', 'debug', 'turn on debugging for checker'),
+ ('',  1, 'trace', None, 'trace these categories: dis, check, import, suppress, warning, run or all, each with an optional :level of 1 or 2'),
+ ('',  1, 'trace-file', 'traceFile', 'append what -d or --trace traces to this file, one JSON object per line'),
  ('',  0, 'findevil', 'findEvil', 'print each class object to find one that crashes'),
  ('Q', 0, 'quiet', 'quiet', 'turn off all output except warnings'),
  ('V', 0, 'version', None, 'print the version of PyChecker and exit'),
@@ -156,7 +187,10 @@ def init() :
     for _, group in _OPTIONS :
         for opt in group:
             optStr = GET_OPT_VALUE[opt[1]]
-            shortArgs = shortArgs + opt[0] + optStr[0]
+            # options without a short form must not add a : to the
+            # short option before them
+            if opt[0]:
+                shortArgs = shortArgs + opt[0] + optStr[0]
             longArgs.append(opt[2] + optStr[1])
             longArgs.append('no-' + opt[2] + optStr[1])
 
@@ -235,6 +269,8 @@ class Config :
         self.files = {}
 
         self.debug = 0
+        self.trace = []
+        self.traceFile = ''
         self.quiet = 0
         self.only = 0
         self.level = 0
@@ -246,6 +282,29 @@ class Config :
         self.quixote = 0
         self.evil = []
         self.findEvil = 0
+        self.jobs = 0
+        self.maxWorkerMemory = 0
+        self.cacheDir = ''
+        self.staticAnalysis = 0
+        self.sandboxImports = 0
+        self.sandboxTimeout = 30
+        self.serverSocket = ''
+        self.clientSocket = ''
+        self.forkServer = 0
+        self.preloadModules = []
+        self.coordinatorAddress = ''
+        self.workerAddress = ''
+        self.watch = 0
+        self.excludes = []
+        self.filesFrom = ''
+        self.changedSince = ''
+        self.streamWarnings = 0
+        self.progress = 0
+        self.progressFile = ''
+        self.metricsFile = ''
+        self.importProfile = 0
+        self.outputFormat = 'text'
+        self.deferredImports = ''
 
         self.noDocModule = 0
         self.noDocClass = 0
@@ -304,6 +363,8 @@ class Config :
         self.maxArgs = 10
         self.maxLocals = 40
         self.maxReferences = 5
+        self.maxInstructions = 0
+        self.maxModuleSeconds = 0
 
         self.slots = 1
         self.emptySlots = 1
@@ -345,12 +406,15 @@ class Config :
             # since we first got loaded with command line arguments,
             # and so -d shows these suppression messages
             from pychecker import utils
+            from pychecker import trace
             utils.initConfig(self)
             if suppressions:
-                utils.debug('Loaded %d suppressions from %s',
+                trace.event(trace.SUPPRESS, trace.BRIEF,
+                    'Loaded %d suppressions from %s',
                     len(suppressions), filename)
             if suppressionRegexs:
-                utils.debug('Loaded %d suppression regexs from %s',
+                trace.event(trace.SUPPRESS, trace.BRIEF,
+                    'Loaded %d suppression regexs from %s',
                     len(suppressionRegexs), filename)
             utils.popConfig()
 
@@ -431,6 +495,41 @@ class Config :
 
                     self.level = _WARNING_LEVELS[normalizedValue].level
                     continue
+                elif longArg == 'deferred':
+                    if value not in _DEFERRED_MODES:
+                        sys.stderr.write('Invalid deferred mode (%s).  '
+                                         'Must be one of: %s\n' %
+                                         (value, _DEFERRED_MODES))
+                        sys.exit(1)
+
+                    self.deferredImports = value
+                    continue
+                elif longArg == 'format':
+                    if value not in _OUTPUT_FORMATS:
+                        sys.stderr.write('Invalid output format (%s).  '
+                                         'Must be one of: %s\n' %
+                                         (value, _OUTPUT_FORMATS))
+                        sys.exit(1)
+
+                    self.outputFormat = value
+                    # only the warnings can be parsed
+                    if value != 'text':
+                        self.quiet = 1
+                    continue
+                elif longArg == 'trace':
+                    from pychecker import trace
+                    specs = string.split(value, ',')
+                    try:
+                        trace.parse(specs)
+                    except ValueError, detail:
+                        sys.stderr.write('Invalid trace (%s): %s.  '
+                                         'Categories are: %s\n' %
+                                         (value, detail,
+                                          ', '.join(trace.CATEGORIES)))
+                        sys.exit(1)
+
+                    self.trace = specs
+                    continue
             elif value  :
                 newValue = value
                 memberType = type(getattr(self, member))
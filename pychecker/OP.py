@@ -8,89 +8,109 @@
 Python byte code operations.
 
 Very similar to the dis and opcode module, but dis does not exist in Jython,
-so recreate the small portion we need here.
+so recreate the small portion we need here.  The opcodes come from the
+tables scripts/opcodes.py generates for each version of Python, or from
+dis for a version without generated tables.
 """
 
-from pychecker import utils
-
-def LINE_NUM(op):              return op == 127
-def LOAD_GLOBAL(op):           return op == 116
-def LOAD_CONST(op):            return op == 100
-def LOAD_FAST(op):             return op == 124
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    def LOAD_ATTR(op):             return op == 106
-else:
-    def LOAD_ATTR(op):             return op == 105
-def LOAD_DEREF(op):            return op == 136
-def STORE_ATTR(op):            return op == 95
-def POP_TOP(op):               return op == 1
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    def IMPORT_FROM(op):           return op == 109
-else:
-    def IMPORT_FROM(op):           return op == 108
-def IMPORT_STAR(op):           return op == 84
-def UNARY_POSITIVE(op):        return op == 10
-def UNARY_NEGATIVE(op):        return op == 11
-def UNARY_INVERT(op):          return op == 15
-def RETURN_VALUE(op):          return op == 83
-def JUMP_FORWARD(op):          return op == 110
-def JUMP_ABSOLUTE(op):         return op == 113
-def FOR_ITER(op):              return op == 93
-def FOR_LOOP(op):              return op == 114
-def SETUP_LOOP(op):            return op == 120
-def BREAK_LOOP(op):            return op == 80
-def RAISE_VARARGS(op):         return op == 130
-def POP_BLOCK(op):             return op == 87
-def END_FINALLY(op):           return op == 88
-def CALL_FUNCTION(op):         return op == 131
-
-def UNPACK_SEQUENCE(op) :
-    "Deal w/Python 1.5.2 (UNPACK_[LIST|TUPLE]) or 2.0 (UNPACK_SEQUENCE)"
-    return op in (92, 93,)
-
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    def IS_CONDITIONAL_JUMP(op):
-        return op in (111, 112, 114, 115)
-else:
-    def IS_CONDITIONAL_JUMP(op):
-        return op in (111, 112)
-
-def IS_NOT(op):
-    return op == 12
-
-HAVE_ARGUMENT = 90 # Opcodes from here have an argument
-
-# moved 2 places in 2.7
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    EXTENDED_ARG = 145
-else:
-    EXTENDED_ARG = 143
-
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    _HAS_NAME = (90, 91, 95, 96, 97, 98, 101, 106, 108, 109, 116,)
-else:
-    _HAS_NAME = (90, 91, 95, 96, 97, 98, 101, 105, 107, 108, 116,)
-_HAS_LOCAL = (124, 125, 126,)
-_HAS_CONST = (100,)
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    _HAS_COMPARE = (107,)
-else:
-    _HAS_COMPARE = (106,)
-if utils.pythonVersion() >= utils.PYTHON_2_7:
-    _HAS_JREL = (93, 110, 120, 121, 122, 143,)
-    _HAS_JABS = (111, 112, 113, 114, 115, 119,)
-else:
-    # FIXME: 2.6 here has 93 and does not have 114
-    _HAS_JREL = (110, 111, 112, 114, 120, 121, 122,)
-    _HAS_JABS = (113, 119,)
-
-_CMP_OP =  ('<', '<=', '==', '!=', '>', '>=', 'in', 'not in', 'is',
-            'is not', 'exception match', 'BAD')
-
-EXCEPT_COMPARISON = 10
-IS_COMPARISON = 8
-IN_COMPARISON = 6
-NOT_IN_COMPARISON = 7
+import sys
+import array
+import bisect
+
+
+def _loadTables():
+    try:
+        return __import__('pychecker.opcodes%d%d' % sys.version_info[:2],
+                          globals(), locals(), ['opmap'])
+    except ImportError:
+        import dis
+        return dis
+
+_tables = _loadTables()
+
+HAVE_ARGUMENT = _tables.HAVE_ARGUMENT # Opcodes from here have an argument
+EXTENDED_ARG = _tables.EXTENDED_ARG
+
+opmap = _tables.opmap
+
+# for debugging
+name = ['<%d>' % op for op in range(256)]
+for _name, _op in opmap.items():
+    name[_op] = _name
+
+def _is(*names):
+    """
+    Returns a function telling whether an opcode is one of the given ones;
+    the names that are not opcodes in this version of Python are ignored.
+    """
+    ops = {}
+    for opname in names:
+        if opmap.has_key(opname):
+            ops[opmap[opname]] = 1
+    return ops.has_key
+
+LINE_NUM = _is('SET_LINENO')
+LOAD_GLOBAL = _is('LOAD_GLOBAL')
+LOAD_CONST = _is('LOAD_CONST')
+LOAD_FAST = _is('LOAD_FAST')
+LOAD_ATTR = _is('LOAD_ATTR')
+LOAD_DEREF = _is('LOAD_DEREF')
+STORE_ATTR = _is('STORE_ATTR')
+POP_TOP = _is('POP_TOP')
+IMPORT_FROM = _is('IMPORT_FROM')
+IMPORT_STAR = _is('IMPORT_STAR')
+UNARY_POSITIVE = _is('UNARY_POSITIVE')
+UNARY_NEGATIVE = _is('UNARY_NEGATIVE')
+UNARY_INVERT = _is('UNARY_INVERT')
+RETURN_VALUE = _is('RETURN_VALUE')
+JUMP_FORWARD = _is('JUMP_FORWARD')
+JUMP_ABSOLUTE = _is('JUMP_ABSOLUTE')
+FOR_ITER = _is('FOR_ITER')
+FOR_LOOP = _is('FOR_LOOP')
+SETUP_LOOP = _is('SETUP_LOOP')
+BREAK_LOOP = _is('BREAK_LOOP')
+RAISE_VARARGS = _is('RAISE_VARARGS')
+POP_BLOCK = _is('POP_BLOCK')
+END_FINALLY = _is('END_FINALLY')
+CALL_FUNCTION = _is('CALL_FUNCTION')
+
+# Deal w/Python 1.5.2 (UNPACK_[LIST|TUPLE]) or 2.0 (UNPACK_SEQUENCE)
+UNPACK_SEQUENCE = _is('UNPACK_SEQUENCE', 'UNPACK_LIST', 'UNPACK_TUPLE')
+
+# since 2.7, JUMP_IF_x no longer exists, but POP_JUMP_IF_x and
+# JUMP_IF_x_OR_POP do
+IS_CONDITIONAL_JUMP = _is('JUMP_IF_FALSE', 'JUMP_IF_TRUE',
+                          'POP_JUMP_IF_FALSE', 'POP_JUMP_IF_TRUE',
+                          'JUMP_IF_FALSE_OR_POP', 'JUMP_IF_TRUE_OR_POP')
+
+IS_NOT = _is('UNARY_NOT')
+
+# returns true if the code results in conditional execution
+conditional = _is('RETURN_VALUE', 'FOR_ITER', 'FOR_LOOP',
+                  'JUMP_IF_FALSE', 'JUMP_IF_TRUE',
+                  'POP_JUMP_IF_FALSE', 'POP_JUMP_IF_TRUE',
+                  'JUMP_IF_FALSE_OR_POP', 'JUMP_IF_TRUE_OR_POP',
+                  'SETUP_EXCEPT', 'RAISE_VARARGS')
+
+def _flags(ops):
+    flags = [0] * 256
+    for op in ops:
+        flags[op] = 1
+    return flags
+
+_HAS_NAME = _flags(_tables.hasname)
+_HAS_LOCAL = _flags(_tables.haslocal)
+_HAS_CONST = _flags(_tables.hasconst)
+_HAS_COMPARE = _flags(_tables.hascompare)
+_HAS_JREL = _flags(_tables.hasjrel)
+_HAS_JABS = _flags(_tables.hasjabs)
+
+_CMP_OP = tuple(_tables.cmp_op)
+
+EXCEPT_COMPARISON = list(_CMP_OP).index('exception match')
+IS_COMPARISON = list(_CMP_OP).index('is')
+IN_COMPARISON = list(_CMP_OP).index('in')
+NOT_IN_COMPARISON = list(_CMP_OP).index('not in')
 
 def getOperand(op, func_code, oparg) :
     """
@@ -98,20 +118,20 @@ def getOperand(op, func_code, oparg) :
 
     @rtype: object
     """
-    if op in _HAS_NAME :
+    if _HAS_NAME[op] :
         return func_code.co_names[oparg]
-    elif op in _HAS_LOCAL :
+    elif _HAS_LOCAL[op] :
         return func_code.co_varnames[oparg]
-    elif op in _HAS_CONST :
+    elif _HAS_CONST[op] :
         return func_code.co_consts[oparg]
-    elif op in _HAS_COMPARE :
+    elif _HAS_COMPARE[op] :
         return _CMP_OP[oparg]
     return None
 
 def getLabel(op, oparg, i) :
-    if op in _HAS_JREL :
+    if _HAS_JREL[op] :
         return i + oparg
-    elif op in _HAS_JABS :
+    elif _HAS_JABS[op] :
         return oparg
     return None
 
@@ -134,6 +154,137 @@ def getInfo(code, index, extended_arg) :
         oparg, extended_arg = 0, 0
     return op, oparg, index, extended_arg
 
+class Instructions:
+    """
+    The instructions of a code object, decoded once.
+
+    Instruction number i starts at byte offsets[i] and ends where
+    instruction i + 1 starts.  An EXTENDED_ARG is an instruction of its
+    own; its argument is folded into the oparg of the next instruction.
+
+    @ivar code:      the code object
+    @type code:      L{types.CodeType}
+    @ivar count:     number of instructions
+    @type count:     int
+    @ivar offsets:   byte offset of each instruction, followed by the
+                     length of the byte code
+    @type offsets:   array of int
+    @ivar ops:       opcode of each instruction
+    @type ops:       array of int
+    @ivar opargs:    argument of each instruction, 0 if it has none
+    @type opargs:    array of int
+    @ivar operands:  the object the argument references, or None
+    @type operands:  list of object
+    @ivar labels:    the offset the instruction jumps to, or -1
+    @type labels:    array of int
+    @ivar positions: byte offset -> instruction number, -1 for offsets
+                     inside an instruction
+    @type positions: array of int
+    @ivar lineStarts: byte offsets where the line number changes, from
+                      co_lnotab; None until a line number is asked for
+    @type lineStarts: array of int or None
+    @ivar lines:      line number before the first offset in lineStarts,
+                      then after each of them
+    @type lines:      array of int or None
+    @ivar graph:      the L{pychecker.flow.Graph} of the instructions, or
+                      None until it is asked for
+    @type graph:      L{pychecker.flow.Graph} or None
+    """
+
+    def __init__(self, code) :
+        co_code = code.co_code
+        maxCode = len(co_code)
+        self.code = code
+        self.offsets = offsets = array.array('l')
+        self.ops = ops = array.array('B')
+        self.opargs = opargs = array.array('l')
+        self.labels = labels = array.array('l')
+        self.operands = operands = []
+        self.positions = positions = array.array('l', [-1]) * (maxCode + 1)
+
+        index = extended_arg = 0
+        while index < maxCode :
+            positions[index] = len(offsets)
+            offsets.append(index)
+            op, oparg, index, extended_arg = getInfo(co_code, index,
+                                                     extended_arg)
+            ops.append(op)
+            opargs.append(oparg)
+            operand = label = None
+            if op >= HAVE_ARGUMENT :
+                operand = getOperand(op, code, oparg)
+                label = getLabel(op, oparg, index)
+            operands.append(operand)
+            if label is None :
+                label = -1
+            labels.append(label)
+
+        positions[maxCode] = len(offsets)
+        offsets.append(maxCode)
+        self.count = len(ops)
+        self.lineStarts = self.lines = None
+        self.graph = None
+
+    def _buildLineTable(self) :
+        co_lnotab = self.code.co_lnotab
+        addr = 0
+        lineno = self.code.co_firstlineno
+        lineStarts = array.array('l')
+        lines = array.array('l', [lineno])
+        for lnotab_index in range(0, len(co_lnotab), 2) :
+            addr = addr + ord(co_lnotab[lnotab_index])
+            lineno = lineno + ord(co_lnotab[lnotab_index+1])
+            lineStarts.append(addr)
+            lines.append(lineno)
+        self.lineStarts, self.lines = lineStarts, lines
+
+    def lineNum(self, index) :
+        """
+        Returns the line number of the byte code at the given offset.
+
+        @rtype: int
+        """
+        if self.lineStarts is None :
+            self._buildLineTable()
+        return self.lines[bisect.bisect_right(self.lineStarts, index)]
+
+    def info(self, index) :
+        """
+        Returns (op, oparg, index of the next instruction) for the
+        instruction starting at the given byte offset, like L{getInfo}.
+
+        @raises IndexError: if there is no instruction at the offset
+        """
+        position = self.positions[index]
+        if position < 0 :
+            # not where an instruction starts, decode it the hard way
+            return getInfo(self.code.co_code, index, 0)[0:3]
+        return self.ops[position], self.opargs[position], \
+               self.offsets[position + 1]
+
+# code object id -> (code object, Instructions)
+_decoded = {}
+
+def decode(code) :
+    """
+    Returns the L{Instructions} of the code object, decoding them the
+    first time.
+
+    @type  code: L{types.CodeType}
+    @rtype:      L{Instructions}
+    """
+    entry = _decoded.get(id(code))
+    if entry is None or entry[0] is not code :
+        entry = _decoded[id(code)] = (code, Instructions(code))
+    return entry[1]
+
+def clearDecoded() :
+    """
+    Forget the instructions decoded so far, so the code objects of the
+    checked modules can go away once a check is done.
+    """
+    _decoded.clear()
+
 def initFuncCode(func) :
     """Returns (func_code, code, i, maxCode, extended_arg) based on func,
        this is a helper function to setup looping through byte code"""
@@ -141,25 +292,3 @@ def initFuncCode(func) :
     func_code = func.func_code
     code = func_code.co_code
     return func_code, code, 0, len(code), 0
-
-def conditional(op):
-    "returns true if the code results in conditional execution"
-    return op in [83,                   # return
-                  93,                   # for_iter
-                  111, 112, 114, 115,   # conditional jump
-                  121,                  # setup_exec
-                  130                   # raise_varargs
-                  ]
-
-# this code is here for debugging purposes.
-# Jython doesn't support dis, so don't rely on it
-try :
-    import dis
-    name = dis.opname
-except ImportError :
-    class Name:
-        'Turn name[x] into x'
-        def __getitem__(self, x):
-            from pychecker import utils
-            return utils.safestr(x)
-    name = Name()
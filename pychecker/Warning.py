@@ -8,6 +8,8 @@
 Warning class to hold info about each warning.
 """
 
+from pychecker import msgs
+
 
 class Warning :
     """
@@ -78,3 +80,36 @@ class Warning :
 
     def output(self, stream, removeSysPath=True) :
         stream.write(self.format(removeSysPath) + "\n")
+
+    def record(self) :
+        """
+        Return the warning as a dict, with the template the message was
+        made from and its arguments instead of the formatted message.
+
+        @rtype: dict
+        """
+        template = getattr(self.err, 'template', None)
+        args = getattr(self.err, 'args', ())
+        if template is None and isinstance(self.err, msgs.WarningClass):
+            template = self.err
+        if type(args) is not type(()):
+            args = (args, )
+
+        if template is None:
+            # made some other way, all we have is the message
+            warningClass = templateId = None
+            text = str(self.err)
+        else:
+            warningClass = template.__class__.__name__
+            templateId = msgs.getTemplateId(template)
+            text = template.msg
+
+        return {
+            'file': self.file,
+            'line': self.line,
+            'level': self.level,
+            'class': warningClass,
+            'id': templateId,
+            'template': text,
+            'args': list(args),
+        }
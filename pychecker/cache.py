@@ -0,0 +1,471 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Keep the warnings for each checked file between runs.
+
+Warnings are stored per file under a key made from the file's source,
+the pychecker and python versions, and the effective configuration and
+suppressions.  Each entry also records the source hashes of all modules
+the file imported; if any of those changed, the entry is not used.
+A file with a valid entry is neither imported nor analyzed.
+
+The entries are kept by a backend: in a directory, which can be shared
+over NFS, or on an HTTP server that stores what is PUT and returns it on
+GET.  A backend is any object with a C{get(key)} method returning the
+str stored under the key or None, and a C{put(key, data)} method.
+Neither the keys nor the entries depend on where the checkout is, so
+machines checking the same sources can share their entries.  Entries
+hold only marshalled strings and numbers, so reading one does not run
+any code; still, whoever can write to the cache decides which warnings
+are reported, so only share it with machines you trust.
+"""
+
+import os
+import sys
+import copy
+import socket
+import marshal
+import httplib
+import urllib2
+
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
+
+from pychecker import utils
+from pychecker import msgs
+from pychecker import warn
+from pychecker import pcmodules
+from pychecker import progress
+from pychecker import metrics
+from pychecker import Config
+
+# bump when the format of cache entries changes
+_CACHE_VERSION = 4
+
+# seconds to wait for an HTTP cache server
+HTTP_TIMEOUT = 10
+
+# config members that do not change the warnings found for a file
+_IGNORED_MEMBERS = ('files', 'debug', 'quiet', 'limit', 'printParse',
+                    'findEvil', 'jobs', 'maxWorkerMemory', 'cacheDir',
+                    'serverSocket', 'clientSocket', 'watch', 'excludes',
+                    'filesFrom', 'changedSince',
+                    'streamWarnings', 'outputFormat',
+                    'deferredImports', 'forkServer', 'preloadModules',
+                    'coordinatorAddress', 'workerAddress',
+                    'progress', 'progressFile', 'metricsFile',
+                    'importProfile', 'trace', 'traceFile')
+
+
+def fingerprint(cfg, suppressions=None):
+    """
+    Return a digest of everything besides the source that influences the
+    warnings found for a file.
+
+    @type  cfg:          L{pychecker.Config.Config}
+    @type  suppressions: tuple of (dict, dict)
+
+    @rtype: str
+    """
+    digest = sha1()
+    digest.update('%d %s %s\n' % (_CACHE_VERSION, Config._VERSION,
+                                  sys.version))
+    members = cfg.__dict__.keys()
+    members.sort()
+    for member in members:
+        if member not in _IGNORED_MEMBERS:
+            digest.update('%s=%r\n' % (member, cfg.__dict__[member]))
+
+    if suppressions:
+        names, regexs = suppressions
+        items = names.items()
+        items.sort()
+        digest.update('suppressions=%r\n' % (items, ))
+        items = [(regex.pattern, value) for regex, value in regexs.items()]
+        items.sort()
+        digest.update('suppressionRegexs=%r\n' % (items, ))
+
+    return digest.hexdigest()
+
+
+class DirectoryBackend:
+    """
+    Stores cache entries as files in a directory.
+
+    @ivar directory: the directory the entries are stored in
+    @type directory: str
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        try:
+            handle = open(self._path(key), 'rb')
+        except IOError:
+            return None
+        try:
+            return handle.read()
+        finally:
+            handle.close()
+
+    def put(self, key, data):
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # someone else might have created it in the meantime
+                if not os.path.isdir(self.directory):
+                    raise
+
+        # write to a temporary file and rename it, so concurrent
+        # readers never see a partial entry; the host name keeps
+        # machines sharing the directory over NFS apart
+        path = self._path(key)
+        tmpPath = '%s.%s.%d.tmp' % (path, socket.gethostname(), os.getpid())
+        handle = open(tmpPath, 'wb')
+        try:
+            handle.write(data)
+        finally:
+            handle.close()
+        os.rename(tmpPath, path)
+
+
+class _PutRequest(urllib2.Request):
+    def get_method(self):
+        return 'PUT'
+
+
+class HTTPBackend:
+    """
+    Stores cache entries on an HTTP server, with GET and PUT requests
+    for the URL of the entry under the base URL.
+
+    The cache is not worth failing a check for, so entries that cannot
+    be fetched are missing, and entries that cannot be stored are lost.
+
+    @ivar url: the base URL of the entries
+    @type url: str
+    """
+
+    def __init__(self, url, timeout=HTTP_TIMEOUT):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _url(self, key):
+        return '%s/%s' % (self.url, key)
+
+    def get(self, key):
+        try:
+            response = urllib2.urlopen(self._url(key), timeout=self.timeout)
+            try:
+                return response.read()
+            finally:
+                response.close()
+        except urllib2.HTTPError, e:
+            if e.code != 404:
+                utils.debug('cache: unable to get %s: %s', self._url(key), e)
+        except (urllib2.URLError, httplib.HTTPException, socket.error), e:
+            utils.debug('cache: unable to get %s: %s', self._url(key), e)
+        return None
+
+    def put(self, key, data):
+        request = _PutRequest(self._url(key), data,
+                              {'Content-Type': 'application/octet-stream'})
+        try:
+            urllib2.urlopen(request, timeout=self.timeout).close()
+        except (urllib2.URLError, httplib.HTTPException, socket.error), e:
+            utils.debug('cache: unable to put %s: %s', self._url(key), e)
+
+
+def getBackend(location):
+    """
+    @param location: a directory, or an http:// or https:// URL
+
+    @rtype: L{DirectoryBackend} or L{HTTPBackend}
+    """
+    if location.startswith('http://') or location.startswith('https://'):
+        return HTTPBackend(location)
+    return DirectoryBackend(location)
+
+
+class ResultCache:
+    """
+    Stores the warnings of checked files in a backend.
+
+    @ivar backend:     where the entries are stored
+    @type backend:     L{DirectoryBackend}, L{HTTPBackend} or alike
+    @ivar fingerprint: digest of the configuration, see L{fingerprint}
+    @type fingerprint: str
+    """
+
+    def __init__(self, backend, fingerprint):
+        """
+        @param backend: the backend, or its location; see L{getBackend}
+        @type  backend: L{DirectoryBackend}, L{HTTPBackend} or str
+        """
+        if isinstance(backend, str):
+            backend = getBackend(backend)
+        self.backend = backend
+        self.fingerprint = fingerprint
+        # (path, mtime, size) -> source digest
+        self._digests = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _digest(self, path):
+        """
+        @rtype: str or None
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        statKey = (path, stat.st_mtime, stat.st_size)
+        digest = self._digests.get(statKey)
+        if digest is None:
+            try:
+                handle = open(path, 'rb')
+            except IOError:
+                return None
+            try:
+                digest = sha1(handle.read()).hexdigest()
+            finally:
+                handle.close()
+            self._digests[statKey] = digest
+        return digest
+
+    def _key(self, filename):
+        digest = self._digest(filename)
+        if digest is None:
+            return None
+
+        # not where the file is, so other checkouts can use the entry
+        key = sha1(self.fingerprint)
+        key.update('%s\n%s\n' % (filename, digest))
+        return key.hexdigest()
+
+    def lookup(self, filename):
+        """
+        Return the warnings stored for the given file, or None if there
+        are none or the file or one of its imports changed.
+
+        @type  filename: str
+
+        @rtype: list of L{pychecker.Warning.Warning} or None
+        """
+        key = self._key(filename)
+        entry = None
+        if key is not None:
+            data = self.backend.get(key)
+            if data is not None:
+                entry = _loadEntry(data)
+
+        if entry is not None:
+            for path, digest in entry['dependencies']:
+                if self._digest(path) != digest:
+                    utils.debug('cache: %s changed, checking %s again',
+                        path, filename)
+                    entry = None
+                    break
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        utils.debug('cache: using %d cached warnings for %s',
+            len(entry['warnings']), filename)
+        self.hits += 1
+        return entry['warnings']
+
+    def store(self, filename, warnings):
+        """
+        Store the warnings found for the given file.
+
+        This needs to be called in the process that checked the file,
+        since the imported modules are looked up there.
+
+        @type  filename: str
+        @type  warnings: list of L{pychecker.Warning.Warning}
+        """
+        # import failures and internal errors might not be caused by
+        # the source, so check the file again next time
+        for warning in warnings:
+            if warning.level >= msgs.Internal.level:
+                return
+
+        key = self._key(filename)
+        if key is None:
+            return
+
+        dependencies = []
+        for path in _getDependencies(filename):
+            digest = self._digest(path)
+            if digest is None:
+                return
+            dependencies.append((path, digest))
+
+        data = _dumpEntry(dependencies, warnings)
+        if data is not None:
+            self.backend.put(key, data)
+
+
+def _dumpEntry(dependencies, warnings):
+    """
+    @type  dependencies: list of (str, str)
+    @type  warnings:     list of L{pychecker.Warning.Warning}
+
+    @returns: the entry, or None if a warning holds more than plain data
+    @rtype:   str or None
+    """
+    records = []
+    for warning in warnings:
+        record = warning.record()
+        records.append((record['file'], record['line'], record['level'],
+                        record['class'], record['template'],
+                        str(warning.err), tuple(record['args'])))
+    try:
+        return marshal.dumps((_CACHE_VERSION, tuple(dependencies),
+                              tuple(records)))
+    except ValueError:
+        return None
+
+def _loadEntry(data):
+    """
+    Return the dependencies and warnings of an entry made by L{_dumpEntry}.
+
+    @type  data: str
+
+    @returns: None if the entry is not valid
+    @rtype:   dict or None
+    """
+    from pychecker import Warning
+
+    try:
+        version, dependencies, records = marshal.loads(data)
+        if version != _CACHE_VERSION:
+            return None
+
+        dependencies = [(str(path), str(digest))
+                        for path, digest in dependencies]
+        warnings = []
+        for (filename, line, level, className, template, text,
+             args) in records:
+            err = msgs.WarningMessage(str(text))
+            err.level = int(level)
+            if className is not None:
+                warningClass = getattr(msgs, className, None)
+                if not isinstance(warningClass, type(msgs.WarningClass)) \
+                   or not issubclass(warningClass, msgs.WarningClass):
+                    return None
+                err.template = warningClass(str(template))
+                err.template.level = err.level
+                err.args = tuple(args)
+            warnings.append(Warning.Warning(str(filename), int(line), err))
+    except (EOFError, ValueError, TypeError):
+        return None
+
+    return {
+        'dependencies': dependencies,
+        'warnings': warnings,
+    }
+
+
+def _getDependencies(filename):
+    """
+    Return the source files of all modules imported, directly or not,
+    while checking the given file.  Files under the current directory
+    are relative to it, others are absolute.
+
+    @rtype: list of str
+    """
+    from pychecker import check
+
+    seen = {}
+    todo = []
+    for moduleName, moduleDir in check.getModules([filename]):
+        pcmodule = pcmodules.getPCModule(moduleName, moduleDir)
+        if pcmodule is not None:
+            todo.append(pcmodule)
+
+    while todo:
+        pcmodule = todo.pop()
+        if seen.has_key(id(pcmodule)):
+            continue
+        seen[id(pcmodule)] = pcmodule
+        todo.extend(pcmodule.modules.values())
+        todo.extend([imported for line, imported
+                     in pcmodule.imported.values()])
+
+    cwd = os.path.join(os.getcwd(), '')
+    paths = {}
+    for pcmodule in seen.values():
+        if pcmodule.module is None:
+            continue
+        path = pcmodule.filename()
+        if path[-3:] == '.py' and os.path.exists(path):
+            path = os.path.abspath(path)
+            if path.startswith(cwd):
+                path = path[len(cwd):]
+            paths[path] = 1
+
+    paths = paths.keys()
+    paths.sort()
+    return paths
+
+def checkFiles(files, cfg, suppressions=None, printProcessing=False):
+    """
+    Check the given files, reusing the warnings stored in cfg.cacheDir
+    for files that did not change.
+
+    @type  files: list of str
+    @type  cfg:   L{pychecker.Config.Config}
+
+    @rtype: list of L{pychecker.Warning.Warning}
+    """
+    from pychecker import check
+    from pychecker import parallel
+
+    utils.initConfig(cfg)
+    try:
+        resultCache = ResultCache(cfg.cacheDir, fingerprint(cfg, suppressions))
+
+        warnings = []
+        misses = []
+        for filename in files:
+            cached = resultCache.lookup(filename)
+            if cached is None:
+                misses.append(filename)
+            else:
+                warnings.extend(cached)
+                progress.checked(len(cached))
+                metrics.addWarnings(cached)
+
+        utils.debug('cache: %d of %d files need to be checked',
+            len(misses), len(files))
+        metrics.add('cache_hits_total', resultCache.hits)
+        metrics.add('cache_misses_total', resultCache.misses)
+
+        # the warnings are stored unlimited, we limit once we have all of them
+        checkCfg = copy.copy(cfg)
+        checkCfg.limit = 0
+        if cfg.jobs > 1 and len(misses) > 1 and parallel.available():
+            warnings.extend(parallel.checkFiles(misses, checkCfg, suppressions,
+                                                printProcessing, resultCache))
+        else:
+            for filename in misses:
+                found = check._check([filename], checkCfg, suppressions,
+                                     printProcessing)
+                resultCache.store(filename, found)
+                warnings.extend(found)
+
+        return warn.limitWarnings(warnings, cfg)
+    finally:
+        utils.popConfig()
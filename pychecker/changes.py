@@ -0,0 +1,195 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Check only the files affected by changes since a git revision.
+
+The files changed since the revision are asked from git.  The files to
+check are then loaded, without being checked, to find out which modules
+they import, and only the changed files and the files importing them,
+directly or not, are kept.
+"""
+
+import os
+import sys
+import types
+import subprocess
+
+from pychecker import utils
+from pychecker import pcmodules
+
+
+class GitError(Exception):
+    """
+    Raised when git could not tell us what changed.
+    """
+
+
+def _git(args, cwd=None):
+    """
+    Run git with the given arguments and return its output.
+
+    @type  args: list of str
+
+    @rtype: str
+    """
+    try:
+        process = subprocess.Popen(['git'] + args, cwd=cwd,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+    except OSError, e:
+        raise GitError("could not run git: %s" % e.strerror)
+    output, error = process.communicate()
+    if process.returncode != 0:
+        raise GitError(error.strip() or "git %s failed" % " ".join(args))
+    return output
+
+def _sourcePath(filename):
+    """
+    @returns: the real path of the source for the given module file
+    @rtype:   str
+    """
+    base, ext = os.path.splitext(filename)
+    if ext in ('.pyc', '.pyo'):
+        filename = base + '.py'
+    return os.path.realpath(filename)
+
+def changedFiles(rev, cwd=None):
+    """
+    Return the python files that changed since the given revision of the
+    git repository we are in, including files not yet known to git.
+
+    @type  rev: str
+
+    @rtype: list of str
+    """
+    top = _git(['rev-parse', '--show-toplevel'], cwd).strip()
+    names = _git(['diff', '--name-only', '-z', rev, '--'], top).split('\0')
+    names.extend(_git(['ls-files', '-z', '--others', '--exclude-standard'],
+                      top).split('\0'))
+
+    changed = {}
+    for name in names:
+        if name[-3:] == '.py':
+            changed[os.path.realpath(os.path.join(top, name))] = 1
+    changed = changed.keys()
+    changed.sort()
+    return changed
+
+def _getImporters():
+    """
+    Return the reverse dependency graph of the loaded modules by source
+    file.
+
+    Besides the graph L{pcmodules.getImporters} builds, this uses the
+    modules, functions and classes found in each loaded module, since
+    the names imported with from ... import are only known after the
+    modules have been checked.
+
+    @returns: path -> paths of the modules importing it or from it
+    @rtype:   dict of str -> dict of str -> 1
+    """
+    importers = {}
+
+    pcimporters = pcmodules.getImporters()
+    for pcmodule in pcmodules.getPCModules():
+        if pcmodule.module is None:
+            continue
+        path = _sourcePath(pcmodule.filename())
+        for importer in pcimporters.get(id(pcmodule), []):
+            if importer.module is not None:
+                importers.setdefault(path, {})[
+                    _sourcePath(importer.filename())] = 1
+
+    # the files being checked are not kept in sys.modules
+    modules = sys.modules.values() + \
+        [pcmodule.module for pcmodule in pcmodules.getPCModules()]
+    for module in modules:
+        filename = getattr(module, '__file__', None)
+        if not filename:
+            continue
+        path = _sourcePath(filename)
+        for value in module.__dict__.values():
+            if isinstance(value, types.ModuleType):
+                otherFilename = getattr(value, '__file__', None)
+            elif isinstance(value, types.FunctionType):
+                otherFilename = value.func_globals.get('__file__')
+            else:
+                name = getattr(value, '__module__', None)
+                if type(name) is not types.StringType:
+                    continue
+                otherFilename = getattr(sys.modules.get(name), '__file__',
+                                        None)
+            if otherFilename:
+                otherPath = _sourcePath(otherFilename)
+                if otherPath != path:
+                    importers.setdefault(otherPath, {})[path] = 1
+
+    return importers
+
+def selectFiles(files, cfg, changed=None):
+    """
+    Return the files among the given ones that changed since
+    cfg.changedSince, or that import a changed module, directly or not.
+
+    Files that cannot be imported are always returned, since the change
+    might be what broke them.
+
+    @type  files:   list of str
+    @type  cfg:     L{pychecker.Config.Config}
+    @param changed: the changed files; asked from git if not given
+    @type  changed: list of str
+
+    @rtype: list of str
+    """
+    from pychecker import check
+
+    if changed is None:
+        changed = changedFiles(cfg.changedSince)
+    utils.initConfig(cfg)
+    utils.debug('changes: %d files changed since %s', len(changed),
+        cfg.changedSince)
+
+    # load the files to find what they import, and forget about them
+    # afterwards, so they get loaded and checked as usual
+    beforePCModules = {}
+    for pcmodule in pcmodules.getPCModules():
+        beforePCModules[id(pcmodule)] = 1
+    beforeModules = dict(sys.modules.items())
+    oldPath = sys.path[:]
+    try:
+        check.processFiles(files, cfg)
+
+        affected = {}
+        todo = []
+        for path in changed:
+            affected[os.path.realpath(path)] = 1
+            todo.append(os.path.realpath(path))
+        importers = _getImporters()
+        while todo:
+            for importer in importers.get(todo.pop(), {}).keys():
+                if not affected.has_key(importer):
+                    affected[importer] = 1
+                    todo.append(importer)
+
+        selected = []
+        for filename, (moduleName, moduleDir) in \
+                zip(files, check.getModules(files)):
+            pcmodule = pcmodules.getPCModule(moduleName, moduleDir)
+            if affected.has_key(os.path.realpath(filename)) or \
+               pcmodule is None or pcmodule.module is None:
+                selected.append(filename)
+    finally:
+        for pcmodule in pcmodules.getPCModules():
+            if not beforePCModules.has_key(id(pcmodule)):
+                pcmodules.removePCModule(pcmodule)
+        # like check._check, keep the modules that are not ours
+        for name, module in sys.modules.items():
+            if module and not beforeModules.has_key(name) and \
+               check._mightBeSiblingModule(module):
+                del sys.modules[name]
+        sys.path[:] = oldPath
+        utils.popConfig()
+
+    utils.debug('changes: checking %d of %d files', len(selected), len(files))
+    return selected
@@ -15,7 +15,17 @@ import types
 import sys
 import imp
 import os
+import time
 import glob
+import fnmatch
+
+try:
+    import json
+except ImportError:
+    try:
+        import simplejson as json
+    except ImportError:
+        json = None
 
 from pychecker import utils
 from pychecker import printer
@@ -25,6 +35,9 @@ from pychecker import Config
 from pychecker import function
 from pychecker import msgs
 from pychecker import pcmodules
+from pychecker import progress
+from pychecker import metrics
+from pychecker import trace
 from pychecker.Warning import Warning
 
 _cfg = None
@@ -52,7 +65,80 @@ def _flattenList(list) :
 
     return new_list
 
-def getModules(arg_list) :
+def _isExcluded(path, excludes):
+    """
+    @type  path:     str
+    @param excludes: glob patterns, matched against the path and its last
+                     component
+    @type  excludes: list of str
+
+    @rtype: bool
+    """
+    path = os.path.normpath(path)
+    name = os.path.basename(path)
+    for pattern in excludes:
+        if fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+def findFiles(arg_list, cfg=None):
+    """
+    Generate the files to check for the given arguments.
+
+    Wildcard file specifications are expanded, and directories are walked
+    for python files, as the files are asked for.  Files and directories
+    matching one of cfg.excludes are skipped, so they are never imported.
+
+    All files found are also added to cfg.files.
+
+    @type  arg_list: list of str
+    @type  cfg:      L{Config.Config}
+
+    @rtype: generator of str
+    """
+    if cfg is None:
+        cfg = _cfg or Config.Config()
+    suffixes = ['.py']
+    if cfg.quixote:
+        suffixes.append('.ptl')
+
+    for arg in arg_list:
+        # is this a wildcard filespec? (necessary for windows)
+        if '*' in arg or '?' in arg or '[' in arg :
+            paths = glob.glob(arg)
+            paths.sort()
+        else:
+            paths = [arg]
+
+        for path in paths:
+            if _isExcluded(path, cfg.excludes):
+                utils.debug('main: excluding %s', path)
+                continue
+            if not os.path.isdir(path):
+                cfg.files[os.path.abspath(path)] = 1
+                yield path
+                continue
+
+            for dirpath, dirnames, filenames in os.walk(path):
+                # prune excluded directories so we never walk them
+                dirnames.sort()
+                for dirname in dirnames[:]:
+                    if dirname[0] == '.' or \
+                       _isExcluded(os.path.join(dirpath, dirname),
+                                   cfg.excludes):
+                        dirnames.remove(dirname)
+
+                filenames.sort()
+                for filename in filenames:
+                    if os.path.splitext(filename)[1] not in suffixes:
+                        continue
+                    filename = os.path.join(dirpath, filename)
+                    if _isExcluded(filename, cfg.excludes):
+                        continue
+                    cfg.files[os.path.abspath(filename)] = 1
+                    yield filename
+
+def getModules(arg_list, mustExist=True) :
     """
     arg_list is a list of arguments to pychecker; arguments can represent
     a module name, a filename, or a wildcard file specification.
@@ -85,8 +171,13 @@ def getModules(arg_list) :
         for suf, suflen in zip(PY_SUFFIXES, PY_SUFFIX_LENS):
             if len(arg) > suflen and arg[-suflen:] == suf:
                 arg_dir = os.path.dirname(arg)
-                if arg_dir and not os.path.exists(arg) :
-                    print 'File or pathname element does not exist: "%s"' % arg
+                if mustExist and arg_dir and not os.path.exists(arg) :
+                    msg = 'File or pathname element does not exist: "%s"' % arg
+                    # keep machine readable output clean
+                    if _cfg.outputFormat == 'text':
+                        print msg
+                    else:
+                        sys.stderr.write(msg + '\n')
                     continue
 
                 module_name = os.path.basename(arg)[:-suflen]
@@ -117,6 +208,9 @@ _BUILTIN_MODULE_ATTRS = { 'sys': [ 'ps1', 'ps2', 'tracebacklimit',
                                  ],
                         }
 
+# builtin module name -> PyCheckerModule whose attributes were fixed up
+_fixedBuiltinModules = {}
+
 def fixupBuiltinModules(needs_init=0):
     for moduleName in sys.builtin_module_names :
         # Skip sys since it will reset sys.stdout in IDLE and cause
@@ -129,7 +223,11 @@ def fixupBuiltinModules(needs_init=0):
             _ = pcmodules.PyCheckerModule(moduleName, 0)
         # builtin modules don't have a moduleDir
         module = pcmodules.getPCModule(moduleName)
-        if module is not None :
+        # only fix up once, this gets called for every batch of files
+        # checked by the same process
+        if module is not None and \
+           _fixedBuiltinModules.get(moduleName) is not module:
+            _fixedBuiltinModules[moduleName] = module
             try :
                 m = imp.init_builtin(moduleName)
             except ImportError :
@@ -158,6 +256,34 @@ def _printWarnings(warnings, stream=None):
         warning.output(stream, removeSysPath=True)
 
 
+def _printRecords(warnings, stream=None):
+    """
+    Print the warnings as JSON Lines, one object per warning; see
+    L{Warning.record}.
+    """
+    if stream is None:
+        stream = sys.stdout
+
+    warnings.sort()
+    lastWarning = None
+    for warning in warnings :
+        # ignore duplicate warnings
+        if lastWarning is not None and cmp(lastWarning, warning) == 0:
+            continue
+        lastWarning = warning
+        stream.write(json.dumps(warning.record(), sort_keys=True,
+                                default=str) + "\n")
+
+def _outputWarnings(warnings, cfg, stream=None):
+    """
+    Print the warnings in the format asked for by cfg.outputFormat.
+    """
+    if cfg.outputFormat == 'jsonl':
+        _printRecords(warnings, stream)
+    else:
+        _printWarnings(warnings, stream)
+
+
 class NullModule:
     def __getattr__(self, unused_attr):
         return None
@@ -188,12 +314,15 @@ def install_ignore__import__():
     _orig__import__ = __builtin__.__import__
     __builtin__.__import__ = __import__
 
-def processFiles(files, cfg=None, pre_process_cb=None):
+def processFiles(files, cfg=None, pre_process_cb=None, sources=None):
     """
     @type  files:          list of str
     @type  cfg:            L{Config.Config}
     @param pre_process_cb: callable notifying of module name, filename
     @type  pre_process_cb: callable taking (str, str)
+    @param sources:        the text to load instead of reading the file,
+                           for some of the files
+    @type  sources:        dict of str -> str
     """
     
     warnings = []
@@ -214,26 +343,36 @@ def processFiles(files, cfg=None, pre_process_cb=None):
 
     utils.initConfig(_cfg)
 
-    utils.debug('Processing %d files' % len(files))
+    trace.event(trace.IMPORT, trace.BRIEF, 'Processing %d files', len(files))
 
-    for file, (moduleName, moduleDir) in zip(files, getModules(files)):
+    if sources is None:
+        sources = {}
+    for file, (moduleName, moduleDir) in \
+            zip(files, getModules(files, not sources)):
         if callable(pre_process_cb):
             pre_process_cb("module %s (%s)" % (moduleName, file))
+        progress.importing(moduleName)
 
         # create and load the PyCheckerModule, tricking sys.path temporarily
         oldsyspath = sys.path[:]
         if moduleDir is not None:
             sys.path.insert(0, moduleDir)
         pcmodule = pcmodules.PyCheckerModule(moduleName, moduleDir=moduleDir)
-        loaded = pcmodule.load()
+        if sources.has_key(file):
+            loaded = pcmodule.loadSource(sources[file], file)
+            filename = file
+        else:
+            loaded = pcmodule.load()
+            filename = pcmodule.filename()
         sys.path = oldsyspath
+        progress.imported()
 
         if not loaded:
-            w = Warning(pcmodule.filename(), 1,
+            w = Warning(filename, 1,
                         msgs.Internal("NOT PROCESSED UNABLE TO IMPORT"))
             warnings.append(w)
 
-    utils.debug('Processed %d files' % len(files))
+    trace.event(trace.IMPORT, trace.BRIEF, 'Processed %d files', len(files))
 
     utils.popConfig()
 
@@ -248,7 +387,8 @@ def getWarnings(files, cfg = None, suppressions = None):
 
 
 def _print_processing(name) :
-    if not _cfg.quiet :
+    # the progress shows what is being processed instead
+    if not _cfg.quiet and not progress.showing():
         sys.stderr.write("Processing %s...\n" % name)
 
 def _mightBeSiblingModule(module):
@@ -272,20 +412,27 @@ def _mightBeSiblingModule(module):
 
     return True
 
-# grooming this to be public API to use pychecker as a module
-def _check(files, cfg=None, suppressions=None, printProcessing=False):
+def _loadFiles(files, cfg, printProcessing=False, sources=None):
+    """
+    Load the given files and the modules they import.
+
+    @param sources: the text to load instead of reading the file, for
+                    some of the files; see L{processFiles}
+
+    @returns: the import warnings, and the modules to check that were
+              loaded because of these files
+    @rtype:   tuple of (list of L{Warning}, list of L{pcmodules.PyCheckerModule})
+    """
     # snapshot modules before and after processing, so that we only warn
     # about the modules loaded because of these files.
     # preferable to clearing the loaded modules because we don't have to
     # reprocess previously handled modules
     beforePCModules = getAllPCModules()
     beforeModules = dict(sys.modules.items())
-    utils.initConfig(cfg)
 
-    utils.debug('main: Checking %d files', len(files))
     utils.debug('main: Finding import warnings')
     importWarnings = processFiles(files, cfg,
-        printProcessing and _print_processing or None)
+        printProcessing and _print_processing or None, sources)
     utils.debug('main: Found %d import warnings' % len(importWarnings))
     utils.debug('main: %d modules in sys.modules' % len(sys.modules.keys()))
 
@@ -316,9 +463,27 @@ def _check(files, cfg=None, suppressions=None, printProcessing=False):
             utils.debug('main: unloading python module %s', v)
             del sys.modules[k]
 
+    return importWarnings, newPCModules
+
+# grooming this to be public API to use pychecker as a module
+def _check(files, cfg=None, suppressions=None, printProcessing=False,
+           sources=None):
+    utils.initConfig(cfg)
+
+    utils.debug('main: Checking %d files', len(files))
+    start = time.time()
+    importWarnings, newPCModules = _loadFiles(files, cfg, printProcessing,
+                                              sources)
+    metrics.add('import_seconds_total', time.time() - start)
+    metrics.add('files_checked_total', len(files))
+    metrics.add('modules_loaded_total', len(newPCModules))
+
     utils.debug('main: Finding warnings')
     # suppressions is a tuple of suppressions, suppressionRegexs dicts
     warnings = warn.find(newPCModules, cfg, suppressions)
+    OP.clearDecoded()
+    metrics.addWarnings(importWarnings)
+    metrics.addWarnings(warnings)
 
     utils.debug('main: Found %d warnings in %d files and %d modules',
         len(importWarnings) + len(warnings), len(files), len(newPCModules))
@@ -327,3 +492,159 @@ def _check(files, cfg=None, suppressions=None, printProcessing=False):
     utils.popConfig()
 
     return importWarnings + warnings
+
+def check_sources(sources, cfg=None, suppressions=None):
+    """
+    Check the given source texts as if they were the contents of the
+    given files, without reading or writing any files.
+
+    Modules imported by the sources are still loaded as usual, so they
+    do not see the other sources.
+
+    @param sources: pairs of file name and source text
+    @type  sources: list of (str, str)
+    @type  cfg:     L{Config.Config}
+
+    @rtype: list of L{Warning}
+    """
+    if cfg is None:
+        cfg = Config.Config()
+    files = [filename for filename, text in sources]
+    for filename in files:
+        cfg.files[os.path.abspath(filename)] = 1
+    return _check(files, cfg, suppressions, sources=dict(sources))
+
+def check_source(text, filename, cfg=None, suppressions=None):
+    """
+    Check the given source text as if it were the contents of filename.
+
+    @type  text:     str
+    @type  filename: str
+    @type  cfg:      L{Config.Config}
+
+    @rtype: list of L{Warning}
+    """
+    return check_sources([(filename, text)], cfg, suppressions)
+
+def _iterCheck(files, cfg=None, suppressions=None, printProcessing=False):
+    """
+    Check the given files one at a time, generating the warnings of each
+    module as soon as it is analyzed, instead of collecting all of them.
+
+    Like L{warn.iterFind}, (module, None) is generated before a module is
+    analyzed and (module, warnings) after.  The warnings found while
+    loading a file are generated as (None, warnings).  The warnings of
+    each module are sorted and stripped of duplicates, but not limited.
+
+    @type  files: list or generator of str
+    @type  cfg:   L{Config.Config}
+
+    @rtype: generator of (L{pcmodules.PyCheckerModule} or None,
+                          list of L{Warning} or None)
+    """
+    for file in files:
+        utils.initConfig(cfg)
+        start = time.time()
+        importWarnings, newPCModules = _loadFiles([file], cfg,
+                                                  printProcessing)
+        metrics.add('import_seconds_total', time.time() - start)
+        metrics.add('files_checked_total')
+        metrics.add('modules_loaded_total', len(newPCModules))
+        utils.popConfig()
+        if importWarnings:
+            metrics.addWarnings(importWarnings)
+            yield None, warn.uniqueWarnings(importWarnings)
+        for module, warnings in warn.iterFind(newPCModules, cfg,
+                                              suppressions):
+            if warnings:
+                metrics.addWarnings(warnings)
+            yield module, warnings
+        OP.clearDecoded()
+
+# events generated by iter_warnings
+MODULE_START = 'start'
+WARNING = 'warning'
+MODULE_END = 'end'
+
+def iter_warnings(files, cfg=None, suppressions=None, events=False):
+    """
+    Check the given files, generating the warnings of each module as
+    soon as the module is analyzed.
+
+    The files are loaded and analyzed one at a time, as the warnings are
+    asked for, so callers can stop early.  The warnings of each module
+    are sorted and stripped of duplicates, but not limited.
+
+    @type  files:  list of str
+    @type  cfg:    L{Config.Config}
+    @param events: if true, generate (MODULE_START, module) before each
+                   module is analyzed, (WARNING, warning) for each
+                   warning, and (MODULE_END, module) after each module
+    @type  events: bool
+
+    @rtype: generator of L{Warning}, or of (str, L{pcmodules.PyCheckerModule}
+            or L{Warning}) with events
+    """
+    if cfg is None:
+        cfg = Config.Config()
+
+    for module, warnings in _iterCheck(files, cfg, suppressions):
+        if not events:
+            for warning in warnings or []:
+                yield warning
+            continue
+
+        if warnings is None:
+            yield MODULE_START, module
+            continue
+        for warning in warnings:
+            yield WARNING, warning
+        if module is not None:
+            yield MODULE_END, module
+
+def streamWarnings(files, cfg, suppressions=None, printProcessing=False,
+                   stream=None):
+    """
+    Check the given files, printing the warnings of each module as soon
+    as it is analyzed.
+
+    Only the warnings of one module are kept in memory at a time, so the
+    most severe warnings cannot be picked when limiting the number of
+    warnings; the first cfg.limit warnings found are printed instead.
+
+    @type  files: list or generator of str
+    @type  cfg:   L{Config.Config}
+
+    @returns: the number of warnings found
+    @rtype:   int
+    """
+    if stream is None:
+        stream = sys.stdout
+
+    text = cfg.outputFormat != 'jsonl'
+    # separate the warnings from the processing messages around them
+    separate = text and printProcessing and not cfg.quiet
+    count = 0
+    for module, warnings in _iterCheck(files, cfg, suppressions,
+                                       printProcessing):
+        if not warnings:
+            continue
+        if cfg.limit:
+            shown = warnings[:max(cfg.limit - count, 0)]
+        else:
+            shown = warnings
+        if shown:
+            if text and count or separate:
+                stream.write("\n")
+            _outputWarnings(shown, cfg, stream)
+            if separate:
+                stream.write("\n")
+            stream.flush()
+        count = count + len(warnings)
+
+    if cfg.limit and count > cfg.limit:
+        if text:
+            stream.write("\n")
+        _outputWarnings([Warning('', 0, msgs.TOO_MANY_WARNINGS %
+                                        (count - cfg.limit))], cfg, stream)
+    return count
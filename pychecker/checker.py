@@ -100,6 +100,29 @@ def _printWarnings(warnings, stream=None):
         warning.output(stream, removeSysPath=True)
 
 
+def _readFileList(filename):
+    """
+    Read a list of files, separated by NUL characters if there are any,
+    otherwise one per line.
+
+    @param filename: the file to read, or - for stdin
+    @type  filename: str
+
+    @rtype: list of str
+    """
+    if filename == '-':
+        data = sys.stdin.read()
+    else:
+        f = open(filename, 'rb')
+        data = f.read()
+        f.close()
+
+    if '\0' in data:
+        names = data.split('\0')
+    else:
+        names = data.splitlines()
+    return [name for name in names if name]
+
 def main(argv) :
     __pychecker__ = 'no-miximport'
     import pychecker
@@ -130,6 +153,41 @@ def main(argv) :
     global _cfg
     _cfg, files, suppressions = Config.setupFromArgs(argv[1:])
     utils.initConfig(_cfg)
+    listedFiles = []
+    if _cfg.filesFrom:
+        try:
+            listedFiles = _readFileList(_cfg.filesFrom)
+        except IOError, err:
+            sys.stderr.write("Unable to read files from file: %s\n  %s\n" % \
+                             (_cfg.filesFrom, err))
+            sys.exit(101)
+        files = files + listedFiles
+    if _cfg.clientSocket:
+        from pychecker import server
+        return server.runClient(_cfg.clientSocket, argv[1:] + listedFiles)
+    if _cfg.serverSocket:
+        from pychecker import server
+        sys.path.insert(0, '')
+        try:
+            server.serve(_cfg.serverSocket, _cfg)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        return 0
+    address = _cfg.coordinatorAddress or _cfg.workerAddress
+    if address:
+        from pychecker import distributed
+        try:
+            distributed.checkAddress(distributed.parseAddress(address),
+                                     distributed.getAuthKey())
+        except ValueError:
+            sys.stderr.write("Invalid address: %s\n" % address)
+            return 101
+        except distributed.AuthKeyRequired, e:
+            sys.stderr.write("%s\n" % e)
+            return 101
+    if _cfg.workerAddress:
+        sys.path.insert(0, '')
+        return distributed.runWorker(_cfg)
     if not files :
         return 0
 
@@ -142,13 +200,72 @@ def main(argv) :
 
     # import here, because sys.path is not set up at the top for pychecker dir
     from pychecker import check
-    warnings = check._check(files,
-        cfg=_cfg,
-        suppressions=suppressions, printProcessing=True)
+    from pychecker import parallel
+    from pychecker import progress
+    from pychecker import metrics
+    from pychecker import importprofile
+    files = check.findFiles(files, _cfg)
+    if _cfg.changedSince:
+        from pychecker import changes
+        try:
+            files = changes.selectFiles(list(files), _cfg)
+        except changes.GitError, err:
+            sys.stderr.write("Unable to find files changed since %s:\n  %s\n" \
+                             % (_cfg.changedSince, err))
+            sys.exit(101)
+    if _cfg.watch:
+        from pychecker import watch
+        watch.watch(list(files), _cfg, suppressions)
+        return 0
+
+    # streaming checks the files as they are found; everything else,
+    # and --only, which needs all of them known up front, walks first
+    if not _cfg.streamWarnings or _cfg.only or \
+       _cfg.progress or _cfg.progressFile:
+        files = list(files)
+
+    if _cfg.metricsFile:
+        metrics.start()
+    if _cfg.importProfile:
+        importprofile.start()
+    if _cfg.progress or _cfg.progressFile:
+        progress.start(len(files), _cfg)
+    try:
+        if _cfg.streamWarnings:
+            count = check.streamWarnings(files, _cfg, suppressions,
+                                         printProcessing=True)
+        elif _cfg.coordinatorAddress:
+            warnings = distributed.checkFiles(files, _cfg, suppressions)
+        elif _cfg.cacheDir:
+            from pychecker import cache
+            warnings = cache.checkFiles(files,
+                cfg=_cfg,
+                suppressions=suppressions, printProcessing=True)
+        elif _cfg.jobs > 1 and len(files) > 1 and parallel.available():
+            warnings = parallel.checkFiles(files,
+                cfg=_cfg,
+                suppressions=suppressions, printProcessing=True)
+        else:
+            warnings = check._check(files,
+                cfg=_cfg,
+                suppressions=suppressions, printProcessing=True)
+    finally:
+        progress.stop()
+        importprofile.stop()
+    if _cfg.metricsFile:
+        metrics.stop(_cfg.metricsFile)
+
+    if _cfg.streamWarnings:
+        if count:
+            return 1
+        if not _cfg.quiet :
+            print "\nWarnings...\n\nNone"
+        return 0
+
     if not _cfg.quiet :
         print "\nWarnings...\n"
     if warnings:
-        _printWarnings(warnings)
+        check._outputWarnings(warnings, _cfg)
         return 1
 
     if not _cfg.quiet :
@@ -163,19 +280,129 @@ if __name__ == '__main__' :
         sys.exit(127)
 
 else :
+    import thread
+
     _orig__import__ = None
     _suppressions = None
+
+    # fingerprints of the warnings printed, so each is printed once;
+    # only the most recent ones are kept
+    _MAX_WARNINGS_CACHE = 10000
     _warnings_cache = {}
+    _warnings_order = []
+
+    # normalized sys.path, recomputed only when sys.path changes
+    _sys_path = None
+    _sys_path_set = {}
+
+    # with --deferred, modules imported but not checked yet
+    _pending = []
+    _pending_event = None
+    _pending_lock = thread.allocate_lock()
+    # the thread checking the pending modules, whose imports we ignore
+    _checking_thread = None
+    # seconds without new imports before the thread checks the batch
+    _DEFERRED_DELAY = 1.0
 
     def _get_unique_warnings(warnings):
         for i in range(len(warnings)-1, -1, -1):
-            w = warnings[i].format()
-            if _warnings_cache.has_key(w):
+            w = warnings[i]
+            key = hash((w.file, w.line, str(w.err)))
+            if _warnings_cache.has_key(key):
                 del warnings[i]
             else:
-                _warnings_cache[w] = 1
+                _warnings_cache[key] = 1
+                _warnings_order.append(key)
+        if len(_warnings_order) > _MAX_WARNINGS_CACHE:
+            excess = len(_warnings_order) - _MAX_WARNINGS_CACHE
+            for key in _warnings_order[:excess]:
+                del _warnings_cache[key]
+            del _warnings_order[:excess]
         return warnings
 
+    def _get_module_dir(pymodule):
+        """
+        @returns: the directory to load the module from, or None if the
+                  module was found on sys.path
+        @rtype:   str or None
+        """
+        global _sys_path, _sys_path_set
+        if sys.path != _sys_path:
+            _sys_path = sys.path[:]
+            _sys_path_set = {}
+            for path in _sys_path:
+                _sys_path_set[os.path.normcase(os.path.abspath(path))] = 1
+
+        # FIXME: can we find a good moduleDir ?
+        # based on possible module.__file__, check if it's from
+        # sys.path, and if not, extract moduleDir
+        moduleDir = os.path.dirname(pymodule.__file__)
+        if _sys_path_set.has_key(os.path.normcase(os.path.abspath(moduleDir))):
+            return None
+        return moduleDir
+
+    def _load_module(pymodule):
+        """
+        @rtype: L{pcmodules.PyCheckerModule} or None
+        """
+        try :
+            # FIXME: could it possibly be from a higher-level package,
+            # instead of the current dir ? Loop up with __init__.py ?
+            module = pcmodules.PyCheckerModule(pymodule.__name__,
+                moduleDir=_get_module_dir(pymodule))
+            if module.initModule(pymodule):
+                return module
+            print 'Unable to load module', pymodule.__name__
+        except Exception:
+            name = getattr(pymodule, '__name__', utils.safestr(pymodule))
+            # FIXME: can we use it here ?
+            utils.importError(name)
+        return None
+
+    def _check_pending():
+        """
+        Check all modules imported since the last batch, at once.
+        """
+        global _checking_thread
+        _pending_lock.acquire()
+        _checking_thread = thread.get_ident()
+        try:
+            while _pending:
+                pymodules = _pending[:]
+                del _pending[:len(pymodules)]
+                modules = []
+                for pymodule in pymodules:
+                    module = _load_module(pymodule)
+                    if module is not None:
+                        modules.append(module)
+                if modules:
+                    utils.initConfig(_cfg)
+                    try:
+                        warnings = warn.find(modules, _cfg, _suppressions)
+                    finally:
+                        utils.popConfig()
+                    _printWarnings(_get_unique_warnings(warnings))
+                    sys.stdout.flush()
+        finally:
+            _checking_thread = None
+            _pending_lock.release()
+
+    def _check_pending_later():
+        """
+        Check the pending modules in batches, once no modules were
+        imported for a while.
+        """
+        while 1:
+            _pending_event.wait()
+            _pending_event.clear()
+            # wait until the imports settle down
+            while 1:
+                _pending_event.wait(_DEFERRED_DELAY)
+                if not _pending_event.isSet():
+                    break
+                _pending_event.clear()
+            _check_pending()
+
     def __import__(name, globals=None, locals=None, fromlist=None, level=None):
         if globals is None:
             globals = {}
@@ -189,41 +416,40 @@ else :
             pymodule = _orig__import__(name, globals, locals, fromlist, level)
         else:
             pymodule = _orig__import__(name, globals, locals, fromlist)
-        if check :
-            try :
-                # FIXME: can we find a good moduleDir ?
-                # based on possible module.__file__, check if it's from
-                # sys.path, and if not, extract moduleDir
-                moduleDir = os.path.dirname(pymodule.__file__)
-                for path in sys.path:
-                    if os.path.abspath(moduleDir) == os.path.abspath(path):
-                        moduleDir = None
-                        break
-
-                # FIXME: could it possibly be from a higher-level package,
-                # instead of the current dir ? Loop up with __init__.py ?
-                module = pcmodules.PyCheckerModule(pymodule.__name__,
-                    moduleDir=moduleDir)
-                if module.initModule(pymodule):
-                    warnings = warn.find([module], _cfg, _suppressions)
-                    _printWarnings(_get_unique_warnings(warnings))
-                else :
-                    print 'Unable to load module', pymodule.__name__
-            except Exception:
-                name = getattr(pymodule, '__name__', utils.safestr(pymodule))
-                # FIXME: can we use it here ?
-                utils.importError(name)
+        if check and _cfg.deferredImports:
+            # only remember the module, unless imported while checking
+            if _checking_thread != thread.get_ident():
+                _pending.append(pymodule)
+                if _pending_event is not None:
+                    _pending_event.set()
+        elif check :
+            module = _load_module(pymodule)
+            if module is not None:
+                warnings = warn.find([module], _cfg, _suppressions)
+                _printWarnings(_get_unique_warnings(warnings))
 
         return pymodule
 
     def _init() :
-        global _cfg, _suppressions, _orig__import__
+        global _cfg, _suppressions, _orig__import__, _pending_event
+        from pychecker import check
 
         args = string.split(os.environ.get('PYCHECKER', ''))
         _cfg, files, _suppressions = Config.setupFromArgs(args)
         utils.initConfig(_cfg)
         check.fixupBuiltinModules(1)
 
+        if _cfg.deferredImports == 'thread':
+            import threading
+            _pending_event = threading.Event()
+            checker = threading.Thread(target=_check_pending_later)
+            checker.setDaemon(1)
+            checker.start()
+        if _cfg.deferredImports:
+            # check whatever is left when the program ends
+            import atexit
+            atexit.register(_check_pending)
+
         # keep the orig __import__ around so we can call it
         import __builtin__
         _orig__import__ = __builtin__.__import__
@@ -0,0 +1,455 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Check files on worker processes spread over several machines.
+
+The coordinator started with --coordinator listens on a TCP port and
+hands out batches of files to the workers started with --worker that
+connect to it.  Workers check each file of a batch with the normal
+L{pychecker.check._check} code path and send the warnings back.
+
+Workers need to run in a checkout of the same files, from the directory
+that matches the one the coordinator was started in, since they get the
+file names as given to the coordinator; the checkout can be anywhere.
+Batches are made from the largest files first, and get smaller as fewer
+files are left, so all workers finish at about the same time; the size
+of a file is used as the estimate of how long it takes to check it.
+
+The messages are pickled, so anything that can connect can run code on
+the other side.  If the PYCHECKER_AUTHKEY environment variable is set,
+the coordinator and the workers use it to authenticate each other; it
+has to be set to listen on or connect to anything but the loopback
+interface.
+"""
+
+import os
+import sys
+import copy
+import time
+import socket
+import threading
+import traceback
+
+try:
+    from multiprocessing import connection
+except ImportError:
+    connection = None
+
+from pychecker import utils
+from pychecker import msgs
+from pychecker import warn
+from pychecker import progress
+from pychecker.Warning import Warning
+
+# messages sent from the coordinator to a worker
+_CONFIG = 'config'
+_BATCH = 'batch'
+_STOP = 'stop'
+
+# no batch gets more than this part of the cost of all files, so workers
+# connecting late still get some
+_MAX_BATCH_FRACTION = 16
+
+# seconds a worker keeps trying to connect to the coordinator
+CONNECT_TIMEOUT = 60
+
+# workers a file can lose before it is given up on
+_MAX_LOST = 3
+
+
+class AuthKeyRequired(Exception):
+    """
+    Raised when listening on or connecting to an address that is not
+    on the loopback interface without an authentication key.
+    """
+
+
+def available():
+    """
+    @returns: whether checking on several machines is supported
+    @rtype:   bool
+    """
+    return connection is not None
+
+def parseAddress(value, defaultHost='127.0.0.1'):
+    """
+    Parse a host:port address; the host can be left out.
+
+    @type  value: str
+
+    @rtype: tuple of (str, int)
+    @raises ValueError: if the port is not a number
+    """
+    if ':' in value:
+        host, port = value.rsplit(':', 1)
+    else:
+        host, port = '', value
+    return host or defaultHost, int(port)
+
+def getAuthKey():
+    """
+    @returns: the key set in PYCHECKER_AUTHKEY, or None
+    @rtype:   str or None
+    """
+    return os.environ.get('PYCHECKER_AUTHKEY') or None
+
+def _isLoopback(host):
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.error:
+        return 0
+    for info in infos:
+        ip = info[4][0]
+        if not (ip.startswith('127.') or ip == '::1'):
+            return 0
+    return len(infos) > 0
+
+def checkAddress(address, authkey):
+    """
+    Check that the given address can be used with the given key: any
+    address with a key, only loopback addresses without one.
+
+    @type  address: tuple of (str, int)
+    @type  authkey: str or None
+
+    @raises AuthKeyRequired: if the address needs a key
+    """
+    if authkey is None and not _isLoopback(address[0]):
+        raise AuthKeyRequired("PYCHECKER_AUTHKEY must be set to use %s:%d, "
+                              "which is not a loopback address" % address)
+
+def estimateCost(filename):
+    """
+    @returns: an estimate of how long checking the given file takes
+    @rtype:   int
+    """
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+class Coordinator:
+    """
+    Hands out files to check to the workers connecting to it.
+
+    @ivar address: the address workers connect to
+    @type address: tuple of (str, int)
+    """
+
+    def __init__(self, address, cfg, suppressions=None, authkey=None):
+        """
+        @type  address: tuple of (str, int)
+        @param cfg:     the configuration the workers check with
+        @type  cfg:     L{pychecker.Config.Config}
+
+        @raises AuthKeyRequired: if the address needs a key and none is
+                                 given
+        """
+        checkAddress(address, authkey)
+        self.cfg = cfg
+        self.suppressions = suppressions
+        self._listener = connection.Listener(address, authkey=authkey)
+        self.address = self._listener.address
+
+        # workers check with an unlimited number of warnings, we limit
+        # once we have all of them
+        self._workerCfg = copy.copy(cfg)
+        self._workerCfg.coordinatorAddress = ''
+        self._workerCfg.jobs = 0
+        self._workerCfg.limit = 0
+        # the paths of the coordinator's checkout; workers make their
+        # own from the files they are given
+        self._workerCfg.files = {}
+
+        self._condition = threading.Condition()
+        self._closed = 0
+
+    def close(self):
+        self._condition.acquire()
+        self._closed = 1
+        self._condition.notifyAll()
+        self._condition.release()
+
+        # wake up the thread waiting for workers
+        try:
+            wakeup = socket.create_connection(self.address)
+            wakeup.close()
+        except socket.error:
+            pass
+        self._listener.close()
+
+    def _accept(self):
+        while 1:
+            try:
+                worker = self._listener.accept()
+            except (IOError, EOFError, socket.error,
+                    connection.AuthenticationError), e:
+                if self._closed:
+                    return
+                utils.debug('distributed: refused a worker: %s', e)
+                continue
+            if self._closed:
+                worker.close()
+                return
+
+            thread = threading.Thread(target=self._serve, args=(worker, ))
+            thread.setDaemon(1)
+            thread.start()
+
+    def _takeBatch(self):
+        """
+        Wait until there are files to check, and take a batch of them.
+
+        @returns: the indexes of the files, or None once all files are
+                  checked
+        @rtype:   list of int or None
+        """
+        self._condition.acquire()
+        try:
+            while not self._pending:
+                if self._closed or len(self._collected) == len(self._files):
+                    return None
+                self._condition.wait()
+
+            remaining = 0
+            for cost, index in self._pending:
+                remaining += cost
+            target = min(remaining / (2 * self._workers),
+                         self._totalCost / _MAX_BATCH_FRACTION)
+
+            batch = []
+            batchCost = 0
+            while self._pending and (not batch or batchCost < target):
+                cost, index = self._pending[0]
+                # a file that was checked by a worker that went away is
+                # checked alone, so the others are not given up with it
+                lost = self._lost.has_key(index)
+                if batch and lost:
+                    break
+                self._pending.pop(0)
+                batch.append(index)
+                batchCost += cost
+                if lost:
+                    break
+            utils.debug('distributed: batch of %d files, cost %d of %d',
+                len(batch), batchCost, remaining)
+            return batch
+        finally:
+            self._condition.release()
+
+    def _finishBatch(self, batch, results):
+        self._condition.acquire()
+        for index, warnings in zip(batch, results):
+            self._collected[index] = warnings
+            progress.checked(len(warnings))
+        self._condition.notifyAll()
+        self._condition.release()
+
+    def _requeue(self, batch):
+        self._condition.acquire()
+        for index in batch:
+            lost = self._lost.get(index, 0) + 1
+            self._lost[index] = lost
+            if lost >= _MAX_LOST:
+                utils.debug('distributed: giving up on %s',
+                    self._files[index])
+                self._collected[index] = [_notProcessed(self._files[index],
+                                                        lost)]
+                progress.checked(1)
+                continue
+            self._pending.append((self._costs[index], index))
+        self._pending.sort()
+        self._pending.reverse()
+        self._condition.notifyAll()
+        self._condition.release()
+
+    def _serve(self, worker):
+        """
+        Have the given worker check batches until all files are checked,
+        or the worker goes away.
+        """
+        self._condition.acquire()
+        self._workers += 1
+        self._condition.release()
+
+        batch = None
+        try:
+            try:
+                worker.send((_CONFIG, (self._workerCfg, self.suppressions,
+                                       self._files)))
+                while 1:
+                    batch = self._takeBatch()
+                    if batch is None:
+                        worker.send((_STOP, None))
+                        break
+                    worker.send((_BATCH,
+                                 [self._files[index] for index in batch]))
+                    results = worker.recv()
+                    if len(results) != len(batch):
+                        utils.debug('distributed: worker sent %d results '
+                            'for %d files', len(results), len(batch))
+                        break
+                    self._finishBatch(batch, results)
+                    batch = None
+            except (IOError, EOFError, socket.error), e:
+                utils.debug('distributed: lost a worker: %s', e)
+        finally:
+            self._condition.acquire()
+            self._workers -= 1
+            self._condition.release()
+            if batch is not None:
+                self._requeue(batch)
+            worker.close()
+
+    def checkFiles(self, files):
+        """
+        Check the given files on the workers connecting to us, and wait
+        until all of them are checked.
+
+        The warnings are returned in the order of the files given, so the
+        result does not depend on which worker checked which file.
+
+        @type  files: list of str
+
+        @rtype: list of L{pychecker.Warning.Warning}
+        """
+        utils.initConfig(self.cfg)
+        try:
+            self._files = files
+            self._costs = [estimateCost(filename) for filename in files]
+            self._totalCost = 0
+            for cost in self._costs:
+                self._totalCost += cost
+            # largest first
+            self._pending = zip(self._costs, range(len(files)))
+            self._pending.sort()
+            self._pending.reverse()
+            self._collected = {}
+            # index -> number of workers that went away checking the file
+            self._lost = {}
+            self._workers = 0
+
+            thread = threading.Thread(target=self._accept)
+            thread.setDaemon(1)
+            thread.start()
+
+            self._condition.acquire()
+            try:
+                while len(self._collected) < len(files):
+                    # wake up once in a while, so we can be interrupted
+                    self._condition.wait(1.0)
+            finally:
+                self._condition.release()
+
+            warnings = []
+            for index in range(len(files)):
+                warnings.extend(self._collected[index])
+            utils.debug('distributed: found %d warnings in %d files',
+                len(warnings), len(files))
+            warnings = warn.limitWarnings(warnings, self.cfg)
+            return warnings
+        finally:
+            utils.popConfig()
+
+
+def _notProcessed(filename, lost):
+    err = msgs.Internal("NOT PROCESSED, %d WORKERS WENT AWAY CHECKING IT"
+                        % lost)
+    return Warning(filename, 1, err)
+
+def checkFiles(files, cfg, suppressions=None):
+    """
+    Check the given files on the workers connecting to
+    cfg.coordinatorAddress.
+
+    @type  files: list of str
+    @type  cfg:   L{pychecker.Config.Config}
+
+    @rtype: list of L{pychecker.Warning.Warning}
+    """
+    coordinator = Coordinator(parseAddress(cfg.coordinatorAddress), cfg,
+                              suppressions, getAuthKey())
+    if not cfg.quiet:
+        sys.stderr.write("Waiting for workers on %s:%d\n" %
+                         coordinator.address)
+    try:
+        return coordinator.checkFiles(files)
+    finally:
+        coordinator.close()
+
+def _connect(address, authkey, timeout):
+    deadline = time.time() + timeout
+    while 1:
+        try:
+            return connection.Client(address, authkey=authkey)
+        except socket.error:
+            # the coordinator might not be listening yet
+            if time.time() > deadline:
+                raise
+            time.sleep(0.5)
+
+def work(address, authkey=None, printProcessing=False,
+         timeout=CONNECT_TIMEOUT):
+    """
+    Check the batches of files the coordinator at the given address
+    hands out, until it has no more.
+
+    @type  address: tuple of (str, int)
+    @param timeout: how long to keep trying to connect, in seconds
+    @type  timeout: float
+
+    @raises AuthKeyRequired: if the address needs a key and none is given
+    """
+    from pychecker import check
+
+    checkAddress(address, authkey)
+    coordinator = _connect(address, authkey, timeout)
+    try:
+        message, (cfg, suppressions, allFiles) = coordinator.recv()
+        # for --only, as findFiles does
+        for filename in allFiles:
+            cfg.files[os.path.abspath(filename)] = 1
+        while 1:
+            try:
+                message, files = coordinator.recv()
+            except EOFError:
+                break
+            if message == _STOP:
+                break
+
+            results = []
+            for filename in files:
+                try:
+                    warnings = check._check([filename], cfg, suppressions,
+                                            printProcessing)
+                except (SystemExit, KeyboardInterrupt):
+                    raise
+                except:
+                    exc = traceback.format_exception(*sys.exc_info())
+                    warnings = [Warning(filename, 1,
+                                        msgs.CHECKER_BROKEN % "".join(exc))]
+                results.append(warnings)
+            coordinator.send(results)
+    finally:
+        coordinator.close()
+
+def runWorker(cfg):
+    """
+    Work for the coordinator at cfg.workerAddress.
+
+    @type cfg: L{pychecker.Config.Config}
+
+    @returns: the exit status
+    @rtype:   int
+    """
+    address = parseAddress(cfg.workerAddress)
+    try:
+        work(address, getAuthKey(), printProcessing=True)
+    except (socket.error, EOFError, IOError, AuthKeyRequired,
+            connection.AuthenticationError), e:
+        sys.stderr.write("Unable to work for the coordinator on %s:%d:\n"
+                         "  %s\n" % (address + (e, )))
+        return 101
+    return 0
@@ -0,0 +1,411 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+The control flow graph of a code object.
+
+The graph is built once per code object, from its decoded
+L{OP.Instructions}, in a few linear passes.  It is what tells which code
+can be run, how many ways there are through a function, which returns
+can be reached and which local variables can be set at an instruction.
+
+Exceptions are followed from each block in a try to the except or finally
+handling it, but do not count as branches.  A finally only goes on to the
+code after it when the code it protects can get to its end.
+"""
+
+import array
+import bisect
+
+from pychecker import OP
+
+_STORE_FAST = OP._is('STORE_FAST')
+_SETUP_EXCEPT = OP._is('SETUP_EXCEPT')
+_SETUP_FINALLY = OP._is('SETUP_FINALLY')
+_SETUP_WITH = OP._is('SETUP_WITH')
+_UNCONDITIONAL_JUMP = OP._is('JUMP_FORWARD', 'JUMP_ABSOLUTE', 'CONTINUE_LOOP')
+_JUMP_IF_FALSE = OP._is('JUMP_IF_FALSE', 'POP_JUMP_IF_FALSE',
+                        'JUMP_IF_FALSE_OR_POP')
+_JUMP_IF_TRUE = OP._is('JUMP_IF_TRUE', 'POP_JUMP_IF_TRUE',
+                       'JUMP_IF_TRUE_OR_POP')
+
+# what the compiler leaves after code that does not go on
+_FILLER = OP._is('POP_BLOCK', 'JUMP_FORWARD', 'JUMP_ABSOLUTE', 'END_FINALLY',
+                 'NOP')
+
+# kinds of blocks set up
+_LOOP = 'loop'
+_EXCEPT = 'except'
+_FINALLY = 'finally'
+_WITH = 'with'
+
+_CO_VARARGS = 0x04
+_CO_VARKEYWORDS = 0x08
+
+
+class Block:
+    """
+    A basic block: instructions that are always run one after the other.
+
+    @ivar start:      instruction number of the first instruction
+    @type start:      int
+    @ivar end:        instruction number after the last instruction
+    @type end:        int
+    @ivar successors: numbers of the blocks run after this one
+    @type successors: list of int
+    @ivar handlers:   numbers of the blocks run when this one raises an
+                      exception, or for a finally
+    @type handlers:   list of int
+    """
+
+    def __init__(self, start) :
+        self.start = start
+        self.end = start
+        self.successors = []
+        self.handlers = []
+
+    def addSuccessor(self, block) :
+        if block not in self.successors :
+            self.successors.append(block)
+
+
+class Graph:
+    """
+    The control flow graph of a code object.
+
+    @ivar instructions: the instructions of the code object
+    @type instructions: L{OP.Instructions}
+    @ivar blocks:       the blocks, in the order of the code
+    @type blocks:       list of L{Block}
+    @ivar blockOf:      instruction number -> block number
+    @type blockOf:      array of int
+    @ivar reachable:    block number -> whether the block can be run
+    @type reachable:    list of int (used as bool)
+    """
+
+    def __init__(self, instructions) :
+        self.instructions = instructions
+        self.blocks = []
+        self.blockOf = None
+        self.reachable = []
+        # block number -> dict of the local variables set before it
+        self._setIn = None
+        # block number -> local variable -> instruction number of its
+        # first store in the block
+        self._firstSet = None
+        # instruction numbers of the None pushed before going into a finally
+        self._finallyEntries = {}
+
+        if instructions.count :
+            self._findBlocks()
+            self._addEdges()
+            self._findReachable()
+
+    def _findBlocks(self) :
+        instructions = self.instructions
+        count = instructions.count
+        ops, labels, positions = instructions.ops, instructions.labels, \
+                                 instructions.positions
+
+        leaders = [0] * (count + 1)
+        leaders[0] = 1
+        for position in range(count) :
+            label = labels[position]
+            if label >= 0 :
+                leaders[positions[label]] = 1
+                leaders[position + 1] = 1
+            elif OP.RETURN_VALUE(ops[position]) or \
+                 OP.RAISE_VARARGS(ops[position]) or \
+                 OP.BREAK_LOOP(ops[position]) or \
+                 OP.END_FINALLY(ops[position]) :
+                leaders[position + 1] = 1
+
+        blocks = self.blocks
+        self.blockOf = blockOf = array.array('l', [0]) * count
+        for position in range(count) :
+            if leaders[position] :
+                blocks.append(Block(position))
+            blocks[-1].end = position + 1
+            blockOf[position] = len(blocks) - 1
+
+    def _addEdges(self) :
+        instructions = self.instructions
+        count = instructions.count
+        ops, labels, operands = instructions.ops, instructions.labels, \
+                                instructions.operands
+        positions, blockOf = instructions.positions, self.blockOf
+
+        # (kind, instruction number of the target) of the blocks set up
+        setup = []
+        # (kind, instruction number of the handler) of the excepts and
+        # finallys entered, waiting for their END_FINALLY
+        handling = []
+        # (END_FINALLY block, block before the finally, block after it)
+        # of finallys going on only when the code they protect gets to
+        # their start
+        self._finallys = []
+
+        for block in self.blocks :
+            number = blockOf[block.start]
+            while setup and setup[-1][1] <= block.start :
+                kind, target = setup.pop()
+                if kind != _LOOP :
+                    handling.append((kind, target))
+            handler = _innermost(setup, (_EXCEPT, _FINALLY, _WITH))
+            if handler is not None :
+                block.handlers.append(blockOf[handler])
+
+            last = block.end - 1
+            op, label = ops[last], labels[last]
+            following = None
+            if block.end < count :
+                following = blockOf[block.end]
+            if label >= 0 :
+                target = blockOf[positions[label]]
+
+            if _SETUP_EXCEPT(op) :
+                setup.append((_EXCEPT, positions[label]))
+                block.addSuccessor(target)
+            elif _SETUP_FINALLY(op) or _SETUP_WITH(op) :
+                kind = _SETUP_WITH(op) and _WITH or _FINALLY
+                setup.append((kind, positions[label]))
+                self._finallyEntries[positions[label] - 1] = 1
+                block.handlers.append(target)
+            elif OP.SETUP_LOOP(op) :
+                setup.append((_LOOP, positions[label]))
+            elif OP.RETURN_VALUE(op) or OP.RAISE_VARARGS(op) :
+                following = None
+            elif OP.BREAK_LOOP(op) :
+                following = None
+                loop = _innermost(setup, (_LOOP, ))
+                if loop is not None :
+                    block.addSuccessor(blockOf[loop])
+            elif OP.END_FINALLY(op) :
+                kind = None
+                if handling :
+                    kind, target = handling.pop()
+                if kind == _EXCEPT :
+                    # only reached when no except matched, to raise again
+                    following = None
+                elif kind == _FINALLY and following is not None :
+                    self._finallys.append((number, blockOf[target - 1],
+                                           following))
+                    following = None
+            elif label >= 0 :
+                if _UNCONDITIONAL_JUMP(op) :
+                    following = None
+                elif last > block.start and OP.LOAD_CONST(ops[last - 1]) :
+                    # a condition on a constant, like while 1:
+                    if operands[last - 1] :
+                        jumps = _JUMP_IF_TRUE(op)
+                    else :
+                        jumps = _JUMP_IF_FALSE(op)
+                    if jumps :
+                        following = None
+                    elif _JUMP_IF_TRUE(op) or _JUMP_IF_FALSE(op) :
+                        target = None
+                if target is not None :
+                    block.addSuccessor(target)
+
+            if following is not None :
+                block.addSuccessor(following)
+
+    def _findReachable(self) :
+        blocks = self.blocks
+        reachable = self.reachable = [0] * len(blocks)
+        self._reach(0)
+
+        # a finally goes on after its END_FINALLY when the code before it
+        # gets there; look again when that made more code reachable
+        finallys = self._finallys
+        while finallys :
+            waiting = []
+            for end, before, following in finallys :
+                if reachable[end] and reachable[before] :
+                    blocks[end].addSuccessor(following)
+                    self._reach(following)
+                else :
+                    waiting.append((end, before, following))
+            if len(waiting) == len(finallys) :
+                break
+            finallys = waiting
+        del self._finallys
+
+    def _reach(self, number) :
+        blocks, reachable = self.blocks, self.reachable
+        if reachable[number] :
+            return
+        reachable[number] = 1
+        todo = [number]
+        while todo :
+            block = blocks[todo.pop()]
+            for number in block.successors + block.handlers :
+                if not reachable[number] :
+                    reachable[number] = 1
+                    todo.append(number)
+
+    def _blockAt(self, index) :
+        # the block of the instruction the byte offset is in
+        position = bisect.bisect_right(self.instructions.offsets, index) - 1
+        return self.blockOf[position]
+
+    def isReachable(self, index) :
+        """
+        @param index: a byte offset in the code
+        @type  index: int
+
+        @rtype:   int (used as bool)
+        @returns: whether the instruction at the offset can be run
+        """
+        if not self.blocks :
+            return 0
+        return self.reachable[self._blockAt(index)]
+
+    def complexity(self) :
+        """
+        Returns the cyclomatic complexity: one more than the number of
+        decisions taken in the code that can be run.  A loop, if, and, or
+        and except each take one.
+
+        @rtype: int
+        """
+        decisions = 0
+        for number in range(len(self.blocks)) :
+            if self.reachable[number] :
+                successors = len(self.blocks[number].successors)
+                if successors > 1 :
+                    decisions = decisions + successors - 1
+        return decisions + 1
+
+    def unreachable(self) :
+        """
+        Returns the byte offsets where code that can never be run starts.
+
+        Leaves out what the compiler adds after code that does not go on,
+        like the jump over an else or the return None at the end.
+
+        @rtype: list of int
+        """
+        instructions = self.instructions
+        ops, offsets = instructions.ops, instructions.offsets
+        result = []
+        previous = 1
+        for number in range(len(self.blocks)) :
+            reachable = self.reachable[number]
+            if previous and not reachable :
+                position = self.blocks[number].start
+                while position < instructions.count and \
+                      not self.reachable[self.blockOf[position]] :
+                    if not (_FILLER(ops[position]) or
+                            self._finallyEntries.has_key(position) or
+                            self._isImplicitReturn(position)) :
+                        result.append(offsets[position])
+                        break
+                    position = position + 1
+            previous = reachable
+        return result
+
+    def _isImplicitReturn(self, position) :
+        # the return None the compiler adds at the end of the code,
+        # or its RETURN_VALUE; it does not start a line
+        instructions = self.instructions
+        if OP.RETURN_VALUE(instructions.ops[position]) :
+            position = position - 1
+        if position != instructions.count - 2 or \
+           not OP.LOAD_CONST(instructions.ops[position]) or \
+           instructions.operands[position] is not None :
+            return 0
+        offset = instructions.offsets[position]
+        return instructions.lineNum(offset) == \
+               instructions.lineNum(offset - 1)
+
+    def maybeSet(self, name, position) :
+        """
+        Tells whether a local variable can have been set when the given
+        instruction is run, by an argument or by a store on some way to it.
+        Code that can not be run is taken to have everything set.
+
+        @param name:     name of the local variable
+        @type  name:     str
+        @param position: instruction number
+        @type  position: int
+
+        @rtype: int (used as bool)
+        """
+        number = self.blockOf[position]
+        if not self.reachable[number] :
+            return 1
+        if self._setIn is None :
+            self._findSet()
+        if self._setIn[number].has_key(name) :
+            return 1
+        first = self._firstSet[number].get(name)
+        if first is not None and first < position :
+            return 1
+        return 0
+
+    def _findSet(self) :
+        instructions = self.instructions
+        blocks = self.blocks
+
+        # the local variables each block sets, and where first
+        stored = self._firstSet = []
+        for block in blocks :
+            names = {}
+            for position in range(block.start, block.end) :
+                if _STORE_FAST(instructions.ops[position]) :
+                    name = instructions.operands[position]
+                    if not names.has_key(name) :
+                        names[name] = position
+            stored.append(names)
+
+        setIn = self._setIn = []
+        for block in blocks :
+            setIn.append({})
+        code = instructions.code
+        argcount = code.co_argcount
+        if code.co_flags & _CO_VARARGS :
+            argcount = argcount + 1
+        if code.co_flags & _CO_VARKEYWORDS :
+            argcount = argcount + 1
+        for name in code.co_varnames[:argcount] :
+            setIn[0][name] = 1
+
+        todo = range(len(blocks))
+        todo.reverse()
+        queued = [1] * len(blocks)
+        while todo :
+            number = todo.pop()
+            queued[number] = 0
+            setOut = setIn[number].copy()
+            setOut.update(stored[number])
+            block = blocks[number]
+            for successor in block.successors + block.handlers :
+                names = setIn[successor]
+                added = 0
+                for name in setOut.keys() :
+                    if not names.has_key(name) :
+                        names[name] = 1
+                        added = 1
+                if added and not queued[successor] :
+                    queued[successor] = 1
+                    todo.append(successor)
+
+
+def _innermost(setup, kinds) :
+    # the target of the innermost block set up of one of the kinds
+    for index in range(len(setup) - 1, -1, -1) :
+        if setup[index][0] in kinds :
+            return setup[index][1]
+    return None
+
+def graph(instructions) :
+    """
+    Returns the L{Graph} of the instructions, building it the first time.
+
+    @type  instructions: L{OP.Instructions}
+    @rtype:              L{Graph}
+    """
+    if instructions.graph is None :
+        instructions.graph = Graph(instructions)
+    return instructions.graph
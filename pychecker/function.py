@@ -222,14 +222,33 @@ def create_from_file(file, filename, module):
     #   if python compiled the file, it will be at the end
     file.seek(0)
 
-    # Read in the source file, see py_compile.compile() for games w/src str
-    codestr = file.read()
+    return create_from_code(compile_source(file.read(), filename), module)
+
+def create_from_code(code, module):
+    """
+    @type  code: L{types.CodeType}
+
+    @returns: a function that represents the __main__ entry point of the
+              module compiled to the given code
+    @rtype: L{Function}
+    """
+    return Function(FakeFunction('__main__', code, module.__dict__))
+
+def compile_source(codestr, filename):
+    """
+    Compile the source of a module.
+
+    @type  codestr:  str
+    @type  filename: str
+
+    @rtype: L{types.CodeType}
+    """
+    # see py_compile.compile() for games w/src str
     codestr = string.replace(codestr, "\r\n", "\n")
     codestr = string.replace(codestr, "\r", "\n")
     if codestr and codestr[-1] != '\n':
         codestr = codestr + '\n'
-    code = compile(codestr, filename, 'exec')
-    return Function(FakeFunction('__main__', code, module.__dict__))
+    return compile(codestr, filename, 'exec')
 
 def _co_flags_equal(o1, o2) :
     return (o1.co_flags & _CO_FLAGS_MASK) == (o2.co_flags & _CO_FLAGS_MASK)
@@ -0,0 +1,248 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Measure how long importing each module takes, for --import-profile.
+
+The modules pychecker loads itself go through L{loadModule}.  The imports
+done by the code of those modules go through __import__, which is
+replaced while profiling, so the imports they trigger are timed too.
+
+For each module, the report shows the cumulative time spent loading it,
+the self time without the modules it imported in turn, which modules
+triggered the import, and whether it was found as a sibling, in the
+directory of the module being checked instead of on sys.path.
+"""
+
+import os
+import sys
+import imp
+import time
+import __builtin__
+
+# the importer of the files given on the command line
+COMMAND_LINE = '(command line)'
+
+_profile = None
+
+
+class Entry:
+    """
+    What was measured for one module.
+
+    @ivar name:       the name of the module
+    @type name:       str
+    @ivar calls:      how many times the module was loaded
+    @type calls:      int
+    @ivar cumulative: seconds spent loading, including nested imports
+    @type cumulative: float
+    @ivar self:       seconds spent loading, without nested imports
+    @type self:       float
+    @ivar importers:  names of the modules that triggered the import
+    @type importers:  dict of str -> 1
+    @ivar sibling:    whether the module was found next to the module
+                      being checked
+    @type sibling:    int (used as bool)
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.cumulative = 0.0
+        self.self = 0.0
+        self.importers = {}
+        self.sibling = 0
+
+    def add(self, other):
+        self.calls += other.calls
+        self.cumulative += other.cumulative
+        self.self += other.self
+        self.importers.update(other.importers)
+        self.sibling = self.sibling or other.sibling
+
+
+class Profile:
+    """
+    Times module loads, keeping a stack of the loads in progress so
+    nested imports are not counted in the self time of their importer.
+
+    @ivar entries: module name -> what was measured for it
+    @type entries: dict of str -> L{Entry}
+    """
+
+    def __init__(self):
+        self.entries = {}
+        # [name, moduleDir, start time, seconds spent in nested loads]
+        self._stack = []
+        self._import = None
+
+    def install(self):
+        self._import = __builtin__.__import__
+        __builtin__.__import__ = self._timedImport
+
+    def uninstall(self):
+        if __builtin__.__import__ == self._timedImport:
+            __builtin__.__import__ = self._import
+
+    def _enter(self, name, moduleDir):
+        self._stack.append([name, moduleDir, time.time(), 0.0])
+
+    def _leave(self, importer, filename, record=1):
+        name, moduleDir, start, nested = self._stack.pop()
+        elapsed = time.time() - start
+        if not record:
+            # nothing was loaded; the time counts for the enclosing load
+            return
+
+        if self._stack:
+            self._stack[-1][3] += elapsed
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = self.entries[name] = Entry(name)
+        entry.calls += 1
+        entry.cumulative += elapsed
+        entry.self += elapsed - nested
+        entry.importers[importer or COMMAND_LINE] = 1
+        siblingDir = self._siblingDir()
+        if filename and siblingDir is not None:
+            siblingDir = os.path.join(os.path.abspath(siblingDir), '')
+            if os.path.abspath(filename).startswith(siblingDir):
+                entry.sibling = 1
+
+    def _siblingDir(self):
+        """
+        @returns: the directory of the module being loaded that siblings
+                  are found in, if any
+        """
+        for name, moduleDir, start, nested in self._stack[::-1]:
+            if moduleDir is not None:
+                return moduleDir
+        return None
+
+    def loadModule(self, name, handle, filename, smt, moduleDir, importer):
+        self._enter(name, moduleDir)
+        try:
+            module = imp.load_module(name, handle, filename, smt)
+        finally:
+            self._leave(importer, filename)
+        return module
+
+    def _timedImport(self, name, *args, **kwargs):
+        if sys.modules.has_key(name):
+            return self._import(name, *args, **kwargs)
+
+        if args:
+            importGlobals = args[0]
+        else:
+            importGlobals = kwargs.get('globals')
+        importer = None
+        if importGlobals:
+            importer = importGlobals.get('__name__')
+        if importer and importer.startswith('pychecker.'):
+            # our own imports are not what the user wants to know about
+            return self._import(name, *args, **kwargs)
+
+        count = len(sys.modules)
+        self._enter(name, None)
+        try:
+            module = self._import(name, *args, **kwargs)
+        except:
+            self._leave(importer, None, len(sys.modules) != count)
+            raise
+
+        loaded = len(sys.modules) != count
+        filename = None
+        if loaded:
+            # implicit relative imports give the name in the package
+            if importer and not sys.modules.has_key(name):
+                if importGlobals.has_key('__path__'):
+                    package = importer
+                else:
+                    package = importer[:importer.rfind('.') + 1][:-1]
+                fullName = '%s.%s' % (package, name)
+                if package and sys.modules.has_key(fullName):
+                    self._stack[-1][0] = name = fullName
+            filename = getattr(sys.modules.get(name), '__file__', None)
+        self._leave(importer, filename, loaded)
+        return module
+
+    def report(self, stream):
+        """
+        Write the entries, slowest first.
+        """
+        entries = self.entries.values()
+        entries.sort(lambda a, b: cmp(b.cumulative, a.cumulative) or
+                     cmp(a.name, b.name))
+        stream.write('\nImport profile...\n\n')
+        stream.write('%10s %10s %5s  %-7s  %-30s %s\n' % (
+            'cumulative', 'self', 'calls', 'sibling', 'module',
+            'imported by'))
+        for entry in entries:
+            importers = entry.importers.keys()
+            importers.sort()
+            stream.write('%10.3f %10.3f %5d  %-7s  %-30s %s\n' % (
+                entry.cumulative, entry.self, entry.calls,
+                entry.sibling and 'yes' or 'no', entry.name,
+                ', '.join(importers)))
+
+
+def start():
+    """
+    Start timing imports.
+    """
+    global _profile
+    _profile = Profile()
+    _profile.install()
+
+def stop(stream=None):
+    """
+    Stop timing imports, and write the report.
+
+    @param stream: where to write the report to, defaults to stderr
+    """
+    global _profile
+    if _profile is None:
+        return
+    _profile.uninstall()
+    _profile.report(stream or sys.stderr)
+    _profile = None
+
+def loadModule(name, handle, filename, smt, moduleDir=None, importer=None):
+    """
+    Load a module like imp.load_module does, timing it if profiling.
+
+    @param moduleDir: the directory the module was found in, if not on
+                      sys.path
+    @param importer:  the name of the module that triggered the import
+    """
+    if _profile is None:
+        return imp.load_module(name, handle, filename, smt)
+    return _profile.loadModule(name, handle, filename, smt, moduleDir,
+                               importer)
+
+def collect():
+    """
+    Return what was measured since profiling started or since the last
+    call, and start again.
+
+    @rtype: dict of str -> L{Entry}, or None
+    """
+    if _profile is None:
+        return None
+    entries = _profile.entries
+    _profile.entries = {}
+    return entries
+
+def merge(entries):
+    """
+    Add what another process measured.
+
+    @param entries: what L{collect} returned in the other process
+    """
+    if _profile is None or not entries:
+        return
+    for name, entry in entries.items():
+        if _profile.entries.has_key(name):
+            _profile.entries[name].add(entry)
+        else:
+            _profile.entries[name] = entry
@@ -0,0 +1,161 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Collect counters and timers for a run, and write them in the Prometheus
+textfile format with --metrics-file.
+
+The code doing the work reports what it does with the functions of this
+module, which do nothing unless collecting was started.  Worker processes
+send what they collected back with their results; see L{collect} and
+L{merge}.
+"""
+
+import os
+import time
+
+from pychecker import utils
+
+# name, type and help of the metrics written
+_METRICS = [
+    ('files_checked_total', 'counter', 'Files checked.'),
+    ('modules_loaded_total', 'counter',
+     'Modules loaded for the files checked, including their imports.'),
+    ('modules_checked_total', 'counter', 'Modules analyzed.'),
+    ('import_seconds_total', 'counter', 'Time spent importing modules.'),
+    ('analysis_seconds_total', 'counter', 'Time spent analyzing modules.'),
+    ('instructions_dispatched_total', 'counter',
+     'Byte code instructions dispatched through CodeChecks.DISPATCH.'),
+    ('warnings_total', 'counter',
+     'Warnings found, before they are limited, by level.'),
+    ('cache_hits_total', 'counter', 'Files whose warnings were cached.'),
+    ('cache_misses_total', 'counter', 'Files not found in the cache.'),
+    ('run_seconds', 'gauge', 'Duration of the run.'),
+    ('peak_rss_bytes', 'gauge',
+     'Peak resident memory size of pychecker and of its largest worker.'),
+]
+
+# (name, labels) -> value while collecting
+_values = None
+_start = None
+
+
+def start():
+    """
+    Start collecting.
+    """
+    global _values, _start
+    _values = {}
+    _start = time.time()
+
+def add(name, value=1, labels=()):
+    """
+    Add to a counter.
+
+    @type  name:   str
+    @param labels: pairs of label name and value
+    @type  labels: tuple of (str, str)
+    """
+    if _values is not None:
+        key = (name, labels)
+        _values[key] = _values.get(key, 0) + value
+
+def addWarnings(warnings):
+    """
+    Count the given warnings by level.
+
+    @type warnings: list of L{pychecker.Warning.Warning}
+    """
+    if _values is None:
+        return
+    for warning in warnings:
+        level = warning.record()['class'] or str(warning.level)
+        add('warnings_total', 1, (('level', level.lower()), ))
+
+def collect():
+    """
+    Return what was collected since collecting started or since the last
+    call, and start again.
+
+    @rtype: dict or None
+    """
+    global _values
+    values = _values
+    if values is not None:
+        _values = {}
+    return values
+
+def merge(values):
+    """
+    Add what another process collected.
+
+    @param values: what L{collect} returned in the other process
+    @type  values: dict or None
+    """
+    if values:
+        for (name, labels), value in values.items():
+            add(name, value, labels)
+
+def _formatLabels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(['%s="%s"' % (name, value)
+                              for name, value in labels])
+
+def formatMetrics(values, seconds=None):
+    """
+    Format the given values in the Prometheus text format.
+
+    @type  values:  dict of (str, tuple) -> number
+    @param seconds: the duration of the run
+
+    @rtype: str
+    """
+    values = values.copy()
+    if seconds is not None:
+        values[('run_seconds', ())] = seconds
+    values[('peak_rss_bytes', (('process', 'pychecker'), ))] = \
+        utils.getPeakMemoryUsage() * 1024
+    values[('peak_rss_bytes', (('process', 'worker'), ))] = \
+        utils.getPeakMemoryUsage(children=True) * 1024
+
+    lines = []
+    for name, metricType, description in _METRICS:
+        keys = [key for key in values.keys() if key[0] == name]
+        if not keys and metricType == 'counter' and \
+           name != 'warnings_total':
+            keys = [(name, ())]
+        if not keys:
+            continue
+        keys.sort()
+        lines.append('# HELP pychecker_%s %s' % (name, description))
+        lines.append('# TYPE pychecker_%s %s' % (name, metricType))
+        for key in keys:
+            value = values.get(key, 0)
+            if type(value) == type(0.0):
+                value = '%.6f' % value
+            lines.append('pychecker_%s%s %s' % (name, _formatLabels(key[1]),
+                                                value))
+    return '\n'.join(lines) + '\n'
+
+def stop(path):
+    """
+    Stop collecting, and write what was collected to the given file.
+
+    The file is replaced, so the collector never sees a partial file.
+
+    @type path: str
+    """
+    global _values
+    if _values is None:
+        return
+    data = formatMetrics(_values, time.time() - _start)
+    _values = None
+
+    tmpPath = '%s.%d.tmp' % (path, os.getpid())
+    handle = open(tmpPath, 'w')
+    try:
+        handle.write(data)
+    finally:
+        handle.close()
+    os.rename(tmpPath, path)
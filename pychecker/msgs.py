@@ -19,13 +19,23 @@ class WarningClass:
       self.level += level_offset
 
   def __mod__(self, args):
-    result = UserString.UserString(self.msg % args)
+    result = WarningMessage(self.msg % args)
     result.level = self.level
+    result.template = self
+    result.args = args
     return result
 
   def __str__(self):
     return self.msg
 
+class WarningMessage(UserString.UserString):
+  """
+  A message made from a WarningClass template, remembering the template
+  and the arguments it was made with.
+  """
+  template = None
+  args = ()
+
 class Internal(WarningClass):
   level = 100
 
@@ -50,6 +60,8 @@ class Style(WarningClass):
 TOO_MANY_WARNINGS = WarningClass("%d errors suppressed, use -#/--limit to increase the number of errors displayed")
 CHECKER_BROKEN = Internal("INTERNAL ERROR -- STOPPED PROCESSING FUNCTION --\n\t%s")
 INVALID_CHECKER_ARGS = Internal("Invalid warning suppression arguments --\n\t%s")
+ANALYSIS_TRUNCATED = Internal("Analysis truncated -- function (%s) has more than %d instructions, use --maxinstructions to change the limit")
+MODULE_ANALYSIS_TRUNCATED = Internal("Analysis truncated -- module (%s) took more than %d seconds, use --maxmoduleseconds to change the limit")
 
 NO_MODULE_DOC = Style("No module doc string")
 NO_CLASS_DOC = Style("No doc string for class %s")
@@ -118,6 +130,7 @@ STRING_ITERATION = Warning("Iterating over a string (%s)")
 DONT_RETURN_NONE = Error("%s should not return None, raise an exception if not found")
 IS_LITERAL = Warning("Using is%s %s, may not always work")
 INVALID_FORMAT = Error("Invalid format string, problem starts near: '%s'")
+INVALID_FORMAT_END = Error("Invalid format string, problem starts near: '%s' (end of format string)")
 INVALID_FORMAT_COUNT = Error("Format string argument count (%d) doesn't match arguments (%d)")
 TOO_MANY_STARS_IN_FORMAT = Error("Too many *s in format flags")
 USING_STAR_IN_FORMAT_MAPPING = Error("Can't use * in formats when using a mapping (dictionary), near: '%s'")
@@ -168,10 +181,34 @@ USES_GLOBAL_EXEC = Security("Using the exec statement in global namespace")
 USES_INPUT = Security("Using input() is a security problem, consider using raw_input()")
 
 USING_DEPRECATED_MODULE = Deprecated("%s module is deprecated")
+USING_DEPRECATED_MODULE_INSTEAD = Deprecated("%s module is deprecated, consider using %s")
 USING_DEPRECATED_ATTR = Deprecated("%s is deprecated")
+USING_DEPRECATED_ATTR_INSTEAD = Deprecated("%s is deprecated, consider using %s")
 USING_INSECURE_FUNC = Security("%s() is a security problem")
-USE_INSTEAD = ", consider using %s"
 
 USES_CONST_ATTR = Warning("Passing a constant string to %s, consider direct reference")
 
 BAD_STRING_FIND = Error("string.find() returns an integer, consider checking >= 0 or < 0 for not found")
+
+
+# (class name, template) -> name of the template in this module
+_TEMPLATE_IDS = None
+
+def getTemplateId(template):
+  """
+  Return the name of the given template in this module, which stays the
+  same when the text of the message changes.
+
+  @type  template: L{WarningClass}
+
+  @returns: the name, or None for messages not defined here
+  @rtype:   str or None
+  """
+  global _TEMPLATE_IDS
+  if _TEMPLATE_IDS is None:
+    _TEMPLATE_IDS = {}
+    for name, value in globals().items():
+      if isinstance(value, WarningClass):
+        _TEMPLATE_IDS[(value.__class__.__name__, value.msg)] = name
+  # look up by value, since templates might have been pickled
+  return _TEMPLATE_IDS.get((template.__class__.__name__, template.msg))
@@ -0,0 +1,241 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Check files in parallel using a pool of worker processes.
+
+Each worker imports and checks its share of the files with the normal
+L{pychecker.check._check} code path and sends the warnings back.
+Workers are replaced once their memory use passes a configurable cap,
+since every module imported by earlier files stays loaded in a worker.
+"""
+
+import sys
+import copy
+import select
+import traceback
+
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+from pychecker import utils
+from pychecker import msgs
+from pychecker import warn
+from pychecker import progress
+from pychecker import metrics
+from pychecker import importprofile
+from pychecker.Warning import Warning
+
+# seconds to wait for a result before checking for crashed workers
+_POLL_INTERVAL = 1.0
+
+
+def available():
+    """
+    @returns: whether checking in parallel is supported on this platform
+    @rtype:   bool
+    """
+    return multiprocessing is not None
+
+def _worker(cfg, suppressions, printProcessing, resultCache, connection):
+    """
+    Check the files the parent sends on the connection until told to stop,
+    or until our memory use passes cfg.maxWorkerMemory.
+
+    The parent sends (index, filename) for each file, or None to stop;
+    we send back (warnings, retire, metrics, import profile) for each.
+
+    @type resultCache: L{pychecker.cache.ResultCache} or None
+    @type connection:  L{multiprocessing.Connection}
+    """
+    from pychecker import check
+
+    pid = multiprocessing.current_process().pid
+    maxMemory = cfg.maxWorkerMemory * 1024
+    # forget what the parent collected before forking us
+    metrics.collect()
+    importprofile.collect()
+    while 1:
+        task = connection.recv()
+        if task is None:
+            break
+
+        index, filename = task
+        try:
+            warnings = check._check([filename], cfg, suppressions,
+                                    printProcessing)
+            if resultCache is not None:
+                resultCache.store(filename, warnings)
+        except (SystemExit, KeyboardInterrupt):
+            raise
+        except:
+            exc = traceback.format_exception(*sys.exc_info())
+            warnings = [Warning(filename, 1,
+                                msgs.CHECKER_BROKEN % "".join(exc))]
+
+        retire = maxMemory and utils.getMemoryUsage() > maxMemory
+        connection.send((warnings, retire,
+            metrics.collect(), importprofile.collect()))
+        if retire:
+            utils.debug('parallel: worker %d retiring, memory cap reached',
+                pid)
+            break
+
+def _workerCrashed(filename, exitcode):
+    err = msgs.Internal("NOT PROCESSED, WORKER EXITED WITH CODE %d" % exitcode)
+    return Warning(filename, 1, err)
+
+def _wait(connections, timeout):
+    """
+    Wait until some of the connections can be read from, or have been
+    closed by the worker at the other end.
+
+    @type  connections: dict of int -> L{multiprocessing.Connection}
+    @rtype:             list of int
+    @returns:           the keys of the connections ready
+    """
+    try:
+        byFd = {}
+        for key, connection in connections.items():
+            byFd[connection.fileno()] = key
+        ready = select.select(byFd.keys(), [], [], timeout)[0]
+        return [byFd[fd] for fd in ready]
+    except (select.error, ValueError, TypeError):
+        # no select on pipes here; poll them in turn
+        timeout = timeout / max(len(connections), 1)
+        for key, connection in connections.items():
+            if connection.poll(timeout):
+                return [key]
+        return []
+
+def checkFiles(files, cfg, suppressions=None, printProcessing=False,
+               resultCache=None):
+    """
+    Check the given files using cfg.jobs worker processes.
+
+    The warnings are returned in the order of the files given, so the
+    result does not depend on which worker checked which file.
+
+    Each worker gets its files on a pipe of its own, one at a time, so
+    we always know which file a worker that dies was checking.
+
+    @type  files:       list of str
+    @type  cfg:         L{pychecker.Config.Config}
+    @param resultCache: if given, workers store the warnings for each
+                        file they check in it
+    @type  resultCache: L{pychecker.cache.ResultCache}
+
+    @rtype: list of L{pychecker.Warning.Warning}
+    """
+    utils.initConfig(cfg)
+    try:
+        jobs = min(cfg.jobs, len(files))
+
+        # workers check with an unlimited number of warnings, we limit
+        # once we have all of them
+        workerCfg = copy.copy(cfg)
+        workerCfg.jobs = 0
+        workerCfg.limit = 0
+
+        # pid -> process and the connection to it
+        workers = {}
+        connections = {}
+        # pid -> index of the file it is checking
+        running = {}
+        collected = {}
+        # index of the next file to hand out
+        todo = [0]
+
+        def assign(pid):
+            # record the file before sending it, so a crash can not lose it
+            connection = connections[pid]
+            if todo[0] >= len(files):
+                del connections[pid]
+                try:
+                    connection.send(None)
+                except (IOError, OSError):
+                    pass
+                return
+            index = todo[0]
+            todo[0] = index + 1
+            running[pid] = index
+            try:
+                connection.send((index, files[index]))
+            except (IOError, OSError):
+                # it died; we find out when reading from it
+                pass
+
+        def startWorker():
+            connection, workerConnection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker,
+                args=(workerCfg, suppressions, printProcessing, resultCache,
+                      workerConnection))
+            process.daemon = True
+            process.start()
+            workerConnection.close()
+            workers[process.pid] = process
+            connections[process.pid] = connection
+            utils.debug('parallel: started worker %d', process.pid)
+            assign(process.pid)
+
+        def stopWorker(pid):
+            process = workers.pop(pid)
+            connection = connections.pop(pid, None)
+            if connection is not None:
+                connection.close()
+            process.join()
+            return process
+
+        for _ in range(jobs):
+            startWorker()
+
+        while len(collected) < len(files):
+            ready = _wait(connections, _POLL_INTERVAL)
+            if not ready:
+                # look for workers that died without closing their pipe
+                for pid, process in workers.items():
+                    if connections.has_key(pid) and not process.is_alive():
+                        ready.append(pid)
+
+            for pid in ready:
+                try:
+                    result = connections[pid].recv()
+                except (EOFError, IOError, OSError):
+                    process = stopWorker(pid)
+                    if running.has_key(pid):
+                        index = running.pop(pid)
+                        collected[index] = [_workerCrashed(files[index],
+                                                           process.exitcode)]
+                    if todo[0] < len(files):
+                        startWorker()
+                    continue
+
+                index = running.pop(pid)
+                warnings, retired, values, entries = result
+                collected[index] = warnings
+                progress.checked(len(warnings))
+                metrics.merge(values)
+                importprofile.merge(entries)
+                if retired:
+                    stopWorker(pid)
+                    if todo[0] < len(files):
+                        startWorker()
+                else:
+                    assign(pid)
+
+        for pid in connections.keys():
+            assign(pid)
+        for pid in workers.keys():
+            stopWorker(pid)
+
+        warnings = []
+        for index in range(len(files)):
+            warnings.extend(collected[index])
+
+        utils.debug('parallel: found %d warnings in %d files with %d workers',
+            len(warnings), len(files), jobs)
+        return warn.limitWarnings(warnings, cfg)
+    finally:
+        utils.popConfig()
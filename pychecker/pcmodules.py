@@ -7,13 +7,16 @@ This allows us to differentiate between loaded modules with the same name
 but from different paths, in a way that sys.modules doesn't do.
 """
 
+import os
 import re
 import sys
 import imp
 import types
 import string
 
-from pychecker import utils, function, Config, OP
+from pychecker import utils, function, Config, OP, static, sandbox
+from pychecker import importprofile
+from pychecker import trace
 
 # Constants
 _DEFAULT_MODULE_TOKENS = ('__builtins__', '__doc__', '__file__', '__name__',
@@ -270,12 +273,14 @@ class Class:
         if not hasattr(method, 'func_code') :
             return
 
-        func_code, code, i, maxCode, extended_arg = OP.initFuncCode(method)
+        func_code = method.func_code
+        instructions = OP.decode(func_code)
         stack = []
-        while i < maxCode :
-            op, oparg, i, extended_arg = OP.getInfo(code, i, extended_arg)
+        for position in range(instructions.count) :
+            op = instructions.ops[position]
             if op >= OP.HAVE_ARGUMENT :
-                operand = OP.getOperand(op, func_code, oparg)
+                oparg = instructions.opargs[position]
+                operand = instructions.operands[position]
                 if OP.LOAD_CONST(op) or OP.LOAD_FAST(op) or OP.LOAD_GLOBAL(op):
                     stack.append(operand)
                 elif OP.LOAD_DEREF(op):
@@ -309,15 +314,14 @@ class Class:
         """
         if not self.methods.get(m, None):
             return None
-        funcCode, codeBytes, i, maxCode, extended_arg = \
-                   OP.initFuncCode(self.methods[m].function)
+        instructions = OP.decode(self.methods[m].function.func_code)
         # abstract if the first opcode is RAISE_VARARGS and it raises
         # NotImplementedError
         arg = ""
-        while i < maxCode:
-            op, oparg, i, extended_arg = OP.getInfo(codeBytes, i, extended_arg)
+        for position in range(instructions.count):
+            op = instructions.ops[position]
             if OP.LOAD_GLOBAL(op):
-                arg = funcCode.co_names[oparg]
+                arg = instructions.operands[position]
             elif OP.RAISE_VARARGS(op):
                 # if we saw NotImplementedError sometime before the raise
                 # assume it's related to this raise stmt
@@ -461,7 +465,7 @@ class PyCheckerModule:
             # not yet loaded, so load
             self.modules[alias] = module = PyCheckerModule(name, 0)
             if imp.is_builtin(name) == 0:
-                module.load()
+                module.load(importer=self.moduleName)
             else :
                 # FIXME: probably should be alias ?
                 globalModule = globals().get(name)
@@ -501,11 +505,14 @@ class PyCheckerModule:
 
         return _getPyFile(filename)
 
-    def load(self, allowImportError=False):
+    def load(self, allowImportError=False, importer=None):
         """
         @param allowImportError: if True, do not catch ImportError but
                                  reraise them, so caller can know this module
                                  does not exist.
+        @param importer:         the name of the module importing this one,
+                                 if any
+        @type  importer:         str
         """
         try :
             # there's no need to reload modules we already have if no moduleDir
@@ -520,7 +527,7 @@ class PyCheckerModule:
                         return self._initModule(module)
                     return 1
 
-            return self._initModule(self.setupMainCode())
+            return self._initModule(self.setupMainCode(importer))
         except (SystemExit, KeyboardInterrupt):
             exc_type, exc_value, exc_tb = sys.exc_info()
             raise exc_type, exc_value
@@ -530,6 +537,57 @@ class PyCheckerModule:
             utils.importError(self.moduleName, self.moduleDir)
             return utils.cfg().ignoreImportErrors
 
+    def loadSource(self, source, filename):
+        """
+        Load the module from the given source, instead of from its file.
+
+        @param source:   the text of the module
+        @type  source:   str
+        @param filename: the file name to use for the module
+        @type  filename: str
+        """
+        try :
+            return self._initModule(self.setupSourceCode(source, filename))
+        except (SystemExit, KeyboardInterrupt):
+            exc_type, exc_value, exc_tb = sys.exc_info()
+            raise exc_type, exc_value
+        except Exception, e:
+            utils.importError(self.moduleName, self.moduleDir, source)
+            return utils.cfg().ignoreImportErrors
+
+    def setupSourceCode(self, source, filename):
+        """
+        Like setupMainCode, but compiles the main code from the given
+        source, and runs that code to create the module.
+
+        @rtype: module
+        """
+        if utils.cfg().staticAnalysis:
+            module = static.newModule(self.moduleName, filename)
+        else:
+            module = imp.new_module(self.moduleName)
+            module.__file__ = filename
+            sys.modules[self.moduleName] = module
+        self.python = 1
+
+        # HACK: to make sibling imports work, like setupMainCode
+        if self.moduleDir is not None:
+            oldsyspath = sys.path[:]
+            sys.path.insert(0, self.moduleDir)
+        try:
+            code = function.compile_source(source, filename)
+            if utils.cfg().staticAnalysis:
+                static.populate(module, code)
+            else:
+                exec code in module.__dict__
+            self.mainCode = function.create_from_code(code, module)
+        finally:
+            if self.moduleDir is not None:
+                sys.path = oldsyspath
+                if sys.modules.get(self.moduleName) is module:
+                    del sys.modules[self.moduleName]
+        return module
+
     def initModule(self, module) :
         if not self.module:
             filename = _getPyFile(module.__file__)
@@ -582,12 +640,27 @@ class PyCheckerModule:
             utils.popConfig()
         return 1
 
-    def setupMainCode(self):
+    def setupMainCode(self, importer=None):
         # FIXME: imp.find_module does not work if self.moduleName contains
         # . like when checking flumotion.twisted.credentials
         #(handle, filename, (suffix, mode, type)) = imp.find_module(self.moduleName)
-        handle, filename, smt = utils.findModule(
-            self.moduleName, self.moduleDir)
+        staticAnalysis = utils.cfg().staticAnalysis
+        sandboxed = 0
+        if staticAnalysis:
+            handle, filename, smt = static.findModule(
+                self.moduleName, self.moduleDir)
+            staticAnalysis = smt[-1] == imp.PY_SOURCE
+        else:
+            if utils.cfg().sandboxImports and sandbox.available():
+                # find it without importing the packages it is in
+                handle, filename, smt = static.findModule(
+                    self.moduleName, self.moduleDir)
+                sandboxed = sandbox.isSandboxed(filename, smt)
+                if not sandboxed and handle is not None:
+                    handle.close()
+            if not sandboxed:
+                handle, filename, smt = utils.findModule(
+                    self.moduleName, self.moduleDir)
         # FIXME: if the smt[-1] == imp.PKG_DIRECTORY : load __all__
         # HACK: to make sibling imports work, we add self.moduleDir to sys.path
         # temporarily, and remove it later
@@ -598,13 +671,34 @@ class PyCheckerModule:
         if self.moduleDir is not None:
             oldsyspath = sys.path[:]
             sys.path.insert(0, self.moduleDir)
-        module = imp.load_module(self.moduleName, handle, filename, smt)
+        if staticAnalysis:
+            # build the module from the code instead of running it
+            module = static.newModule(self.moduleName, filename)
+            self.python = 1
+            self._setupMainCode(handle, filename, module)
+            static.populate(module, self.mainCode.function.func_code)
+        elif sandboxed:
+            try:
+                module = sandbox.loadModule(self.moduleName, filename,
+                    self.moduleDir, utils.cfg().sandboxTimeout)
+            except:
+                if handle is not None:
+                    handle.close()
+                if self.moduleDir is not None:
+                    sys.path = oldsyspath
+                raise
+        else:
+            module = importprofile.loadModule(self.moduleName, handle,
+                filename, smt, self.moduleDir, importer)
         if self.moduleDir is not None:
             sys.path = oldsyspath
             # to make sure that subsequent modules with the same moduleName
             # do not persist, and get their namespace clobbered, delete it
             del sys.modules[self.moduleName]
 
+        if staticAnalysis:
+            return module
+
         if filename.endswith('.so'):
             self.python = 0
             return module
@@ -620,8 +714,9 @@ class PyCheckerModule:
                 handle.close()
         except TypeError:
             # compile() expected string without null bytes
-            utils.debug("Could not load function from file %s, module %r" % (
-                filename, module))
+            trace.event(trace.IMPORT, trace.BRIEF,
+                "Could not load function from file %s, module %r",
+                filename, module)
             if handle != None:
                 handle.close()
             raise
@@ -688,6 +783,112 @@ def addPCModule(pcmodule):
     global __pcmodules
     __pcmodules[(pcmodule.moduleName, pcmodule.moduleDir)] = pcmodule
 
+def removePCModule(pcmodule):
+    """
+    Forget the given module, so it gets loaded again when needed.
+
+    @type  pcmodule: L{pychecker.checker.PyCheckerModule}
+    """
+    global __pcmodules
+    key = (pcmodule.moduleName, pcmodule.moduleDir)
+    if __pcmodules.get(key) is pcmodule:
+        del __pcmodules[key]
+
+def getImporters():
+    """
+    Return the reverse dependency graph of all loaded modules, based on
+    the modules they import and the names they import from modules.
+
+    @returns: id of a module -> modules importing it or from it
+    @rtype:   dict of int -> list of L{pychecker.checker.PyCheckerModule}
+    """
+    global __pcmodules
+    importers = {}
+    for pcmodule in __pcmodules.values():
+        others = pcmodule.modules.values() + \
+            [other for line, other in pcmodule.imported.values()]
+        seen = {}
+        for other in others:
+            if not seen.has_key(id(other)):
+                seen[id(other)] = 1
+                importers.setdefault(id(other), []).append(pcmodule)
+    return importers
+
+
+class ModuleTimes:
+    """
+    Remember the modification time of the source of each loaded
+    PyCheckerModule, to know which ones are out of date.
+
+    @ivar times: id of PyCheckerModule -> (PyCheckerModule, path, mtime)
+    @type times: dict of int -> (L{PyCheckerModule}, str, float)
+    """
+
+    def __init__(self):
+        self.times = {}
+
+    def update(self):
+        """
+        Record the modification time of all modules loaded since the
+        last update, and forget about modules that were replaced.
+        """
+        for key, (pcmodule, path, mtime) in self.times.items():
+            if getPCModule(pcmodule.moduleName, pcmodule.moduleDir) \
+                    is not pcmodule:
+                del self.times[key]
+
+        for pcmodule in getPCModules():
+            if self.times.has_key(id(pcmodule)) or pcmodule.module is None:
+                continue
+            path = pcmodule.filename()
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            # absolute, since the cwd might change
+            self.times[id(pcmodule)] = (pcmodule, os.path.abspath(path),
+                                        mtime)
+
+    def invalidate(self):
+        """
+        Forget modules whose source changed, and the modules that import
+        them, directly or not.
+
+        @returns: the forgotten modules
+        @rtype:   list of L{PyCheckerModule}
+        """
+        stale = {}
+        for key, (pcmodule, path, mtime) in self.times.items():
+            try:
+                changed = os.stat(path).st_mtime != mtime
+            except OSError:
+                changed = 1
+            if changed:
+                stale[key] = pcmodule
+
+        if stale:
+            importers = getImporters()
+            todo = stale.values()
+            while todo:
+                pcmodule = todo.pop()
+                for importer in importers.get(id(pcmodule), []):
+                    if not stale.has_key(id(importer)):
+                        stale[id(importer)] = importer
+                        todo.append(importer)
+
+        for key, pcmodule in stale.items():
+            trace.event(trace.IMPORT, trace.BRIEF,
+                        'pcmodules: forgetting changed module %s', pcmodule)
+            removePCModule(pcmodule)
+            module = sys.modules.get(pcmodule.moduleName)
+            if module is not None and module is pcmodule.module:
+                del sys.modules[pcmodule.moduleName]
+            if self.times.has_key(key):
+                del self.times[key]
+
+        return stale.values()
+
+
 def _getPCModulesDict():
     """
     Only to be used for testing.
@@ -0,0 +1,244 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Show how far a long check is.
+
+While a check started with --progress or --progress-file runs, a status
+line with the files done, the modules imported and analyzed per second,
+the warnings found so far, the module being imported or analyzed and
+for how long, and an estimate of the time left is written every so often
+to stderr, or to the status file.
+
+The code doing the work reports what it does with the functions of this
+module, which do nothing unless a L{Progress} was started.
+"""
+
+import os
+import sys
+import time
+import threading
+
+# seconds between updates of the status on a terminal or in a file
+INTERVAL = 1.0
+# seconds between status lines on stderr if it is not a terminal
+LOG_INTERVAL = 10.0
+
+_progress = None
+
+
+def _formatTime(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return '%dh%02dm' % (seconds / 3600, seconds % 3600 / 60)
+    if seconds >= 60:
+        return '%dm%02ds' % (seconds / 60, seconds % 60)
+    return '%ds' % seconds
+
+
+class Progress:
+    """
+    Keeps track of how far a check is, and writes it out every interval.
+
+    A file counts as half done once it is imported, and as done once the
+    modules loaded for it are analyzed.
+
+    @ivar files:    the number of files to check
+    @type files:    int
+    @ivar done:     the number of files done, see above
+    @type done:     float
+    @ivar modules:  the number of modules imported and analyzed
+    @type modules:  int
+    @ivar warnings: the number of warnings found so far, before they are
+                    filtered
+    @type warnings: int
+    """
+
+    def __init__(self, files, stream=None, path=None, interval=None):
+        """
+        @param files:  the number of files to check
+        @type  files:  int
+        @param stream: where to write the status to, if no path is given;
+                       defaults to stderr
+        @param path:   the file to write the status to
+        @type  path:   str
+        """
+        self.files = files
+        self.done = 0.0
+        self.modules = 0
+        self.warnings = 0
+        self.path = path
+        self.stream = stream or sys.stderr
+        self._terminal = path is None and hasattr(self.stream, 'isatty') \
+            and self.stream.isatty()
+        if interval is None:
+            if path is None and not self._terminal:
+                interval = LOG_INTERVAL
+            else:
+                interval = INTERVAL
+        self.interval = interval
+
+        self._start = time.time()
+        # (what, module name, start time) of the current work
+        self._current = None
+        self._importsSinceAnalysis = 0
+        self._moduleWeight = 0.0
+        self._lastLength = 0
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(1)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop updating, and write the final status.
+        """
+        self._stopped.set()
+        self._thread.join()
+        self._current = None
+        self.write()
+        if self._terminal:
+            self.stream.write('\n')
+            self.stream.flush()
+
+    def _run(self):
+        while 1:
+            self._stopped.wait(self.interval)
+            if self._stopped.isSet():
+                break
+            self.write()
+
+    def importing(self, name):
+        self._current = ('importing', name, time.time())
+
+    def imported(self):
+        self._current = None
+        self.done += 0.5
+        self.modules += 1
+        self._importsSinceAnalysis += 1
+
+    def analyzingModules(self, count):
+        # the modules analyzed next were loaded for the files imported
+        # since the last analysis
+        if count:
+            self._moduleWeight = 0.5 * self._importsSinceAnalysis / count
+        self._importsSinceAnalysis = 0
+
+    def analyzing(self, name):
+        self._current = ('analyzing', name, time.time())
+
+    def analyzed(self, warnings):
+        self._current = None
+        self.done += self._moduleWeight
+        self.modules += 1
+        self.warnings += warnings
+
+    def checked(self, warnings):
+        """
+        A file was checked elsewhere, in a worker process.
+        """
+        self.done += 1.0
+        self.modules += 1
+        self.warnings += warnings
+
+    def status(self, now=None):
+        """
+        @rtype: str
+        """
+        if now is None:
+            now = time.time()
+        elapsed = now - self._start
+        done = min(self.done, self.files)
+        parts = ['%d/%d files' % (int(done + 0.001), self.files)]
+        if elapsed > 0:
+            parts.append('%.1f modules/s' % (self.modules / elapsed))
+        parts.append('%d warnings' % self.warnings)
+        if done and done < self.files:
+            left = elapsed * (self.files - done) / done
+            parts.append('ETA %s' % _formatTime(left))
+        current = self._current
+        if current is not None:
+            what, name, started = current
+            parts.append('%s %s (%s)' % (what, name,
+                                         _formatTime(now - started)))
+        return 'pychecker: ' + ', '.join(parts)
+
+    def write(self):
+        line = self.status()
+        if self.path is not None:
+            # replace the file, so readers never see a partial status
+            tmpPath = '%s.%d.tmp' % (self.path, os.getpid())
+            handle = open(tmpPath, 'w')
+            try:
+                handle.write(line + '\n')
+            finally:
+                handle.close()
+            os.rename(tmpPath, self.path)
+        elif self._terminal:
+            # overwrite the previous status
+            padding = max(self._lastLength - len(line), 0)
+            self.stream.write('\r' + line + ' ' * padding)
+            self._lastLength = len(line)
+            self.stream.flush()
+        else:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+def start(files, cfg):
+    """
+    Start showing the progress of checking the given number of files,
+    as asked for in the configuration.
+
+    @type  files: int
+    @type  cfg:   L{pychecker.Config.Config}
+
+    @returns: whether anything is shown
+    @rtype:   bool
+    """
+    global _progress
+    if not cfg.progress and not cfg.progressFile:
+        return False
+    _progress = Progress(files, path=cfg.progressFile or None)
+    _progress.start()
+    return True
+
+def stop():
+    global _progress
+    if _progress is not None:
+        _progress.stop()
+        _progress = None
+
+def showing():
+    """
+    @returns: whether the progress is shown on stderr
+    @rtype:   bool
+    """
+    return _progress is not None and _progress.path is None
+
+def importing(name):
+    if _progress is not None:
+        _progress.importing(name)
+
+def imported():
+    if _progress is not None:
+        _progress.imported()
+
+def analyzingModules(count):
+    if _progress is not None:
+        _progress.analyzingModules(count)
+
+def analyzing(name):
+    if _progress is not None:
+        _progress.analyzing(name)
+
+def analyzed(warnings):
+    if _progress is not None:
+        _progress.analyzed(warnings)
+
+def checked(warnings):
+    if _progress is not None:
+        _progress.checked(warnings)
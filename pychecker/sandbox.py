@@ -0,0 +1,599 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Import modules in a forked child, with a timeout.
+
+A module that hangs or crashes the interpreter when it is imported takes
+pychecker down with it.  With --sandbox, modules that are not part of the
+standard library are imported in a forked child instead.  The child sends
+back a summary of each module it loaded: its tokens, the code objects of
+its functions, and its classes with their attributes.  Stand-in modules
+are built from the summaries, without running any of their code, and
+checked like imported modules.
+
+If the child crashes, or has not answered after --sandbox-timeout
+seconds, it is killed and importing the module fails like for any other
+import error.
+
+Summaries are made of types marshal can handle, so code objects can be
+sent as they are.  The modules loaded by the same child are kept, so the
+imports of a module do not need another child.
+"""
+
+import os
+import sys
+import imp
+import time
+import types
+import errno
+import select
+import signal
+import marshal
+import cPickle
+import exceptions
+import traceback
+
+from pychecker import utils
+from pychecker import static
+from pychecker import trace
+
+# containers with more items than this, or nested deeper, are summarized
+# by their type only
+_MAX_ITEMS = 1000
+_MAX_DEPTH = 4
+
+# types whose values are sent as they are
+_SIMPLE_TYPES = (types.NoneType, types.IntType, types.LongType,
+                 types.FloatType, types.ComplexType, types.StringType,
+                 types.UnicodeType, types.BooleanType)
+
+# module attributes set when the stand-in module is created
+_MODULE_ATTRS = ('__builtins__', '__name__', '__file__', '__path__')
+
+# class attributes that are not copied to the stand-in class
+_CLASS_ATTRS = ('__dict__', '__weakref__', '__module__', '__doc__')
+_DESCRIPTOR_TYPES = (types.MemberDescriptorType, types.GetSetDescriptorType)
+
+# set in __flags__ of the types created by class statements, as opposed
+# to the ones implemented in C
+_HEAPTYPE = 1 << 9
+
+# filename -> (mtime, module name, L{_Batch}), for each module loaded by
+# a child
+_summaries = {}
+
+
+class ForkError(Exception):
+    """
+    Raised when a forked child did not return a result.
+    """
+
+class ForkTimeout(ForkError):
+    """
+    Raised when a forked child did not return a result in time.
+    """
+
+class SandboxError(ImportError):
+    """
+    Raised when importing a module in a child failed.
+    """
+
+
+def available():
+    """
+    @returns: whether modules can be imported in a child
+    @rtype:   bool
+    """
+    return hasattr(os, 'fork')
+
+def forked(function, args=(), timeout=None):
+    """
+    Call the function in a forked child and return its result.
+
+    Whatever the call loads or changes stays in the child, which exits
+    once the result is sent back.
+
+    @param timeout: seconds after which the child is killed, if given
+    @type  timeout: float or None
+
+    @returns: the result of the function, which needs to be picklable
+    @raises ForkError: if the child crashed or failed
+    @raises ForkTimeout: if the child was killed after the timeout
+    """
+    readFd, writeFd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            try:
+                os.close(readFd)
+                # the parent might clean up when terminated, not us
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                data = cPickle.dumps(function(*args),
+                                     cPickle.HIGHEST_PROTOCOL)
+                while data:
+                    data = data[os.write(writeFd, data):]
+                status = 0
+            except:
+                traceback.print_exc()
+        finally:
+            # do not run the cleanup of the parent on the way out
+            os._exit(status)
+
+    os.close(writeFd)
+    chunks = []
+    deadline = None
+    if timeout:
+        deadline = time.time() + timeout
+    killed = 0
+    try:
+        while 1:
+            if deadline is not None:
+                left = deadline - time.time()
+                try:
+                    ready = left > 0 and \
+                        select.select([readFd], [], [], left)[0]
+                except select.error, e:
+                    if e.args[0] == errno.EINTR:
+                        continue
+                    raise
+                if not ready:
+                    os.kill(pid, signal.SIGKILL)
+                    killed = 1
+                    break
+            chunk = os.read(readFd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(readFd)
+        _, status = os.waitpid(pid, 0)
+
+    if killed:
+        raise ForkTimeout("child killed after %d seconds" % timeout)
+    if status != 0:
+        if os.WIFSIGNALED(status):
+            raise ForkError("child killed by signal %d" % os.WTERMSIG(status))
+        raise ForkError("child exited with code %d" % os.WEXITSTATUS(status))
+    return cPickle.loads(''.join(chunks))
+
+
+def _sourceFile(filename):
+    if filename and filename[-1] in 'oc' and filename[-4:-1] == '.py':
+        return filename[:-1]
+    return filename
+
+def _isSandboxedFile(filename):
+    return filename is not None and \
+        not static._isStandardLibrary(_sourceFile(filename))
+
+def _isClass(value):
+    """
+    Return whether the value is a class made by a class statement.
+    """
+    return isinstance(value, types.ClassType) or \
+        isinstance(value, type) and value.__flags__ & _HEAPTYPE
+
+def isSandboxed(filename, smt):
+    """
+    Return whether the module found by imp.find_module is imported in a
+    child; builtin modules and the standard library are not.
+
+    @type smt: tuple of (suffix, mode, type)
+
+    @rtype: bool
+    """
+    return smt[-1] in (imp.PY_SOURCE, imp.PY_COMPILED, imp.C_EXTENSION) \
+        and _isSandboxedFile(filename)
+
+
+class _Summarizer:
+    """
+    Summarizes modules in the child, see L{summarizeImport}.
+
+    @ivar classes: id of the class -> summary of the class
+    @type classes: dict of int -> tuple
+    """
+
+    def __init__(self):
+        self.classes = {}
+
+    def module(self, module):
+        from pychecker import pcmodules
+
+        tokens = []
+        for name, value in module.__dict__.items():
+            if name in _MODULE_ATTRS or pcmodules.EVIL_C_OBJECTS.has_key(
+                    '%s.%s' % (module.__name__, name)):
+                continue
+            tokens.append((name, self.value(value)))
+        return _sourceFile(getattr(module, '__file__', None)), tokens
+
+    def value(self, value, depth=0):
+        """
+        @rtype: tuple of (str, ...)
+        """
+        try:
+            return self._value(value, depth)
+        except (SystemExit, KeyboardInterrupt):
+            raise
+        except:
+            # goofy __getattr__ and the like
+            return ('unknown', None)
+
+    def _value(self, value, depth):
+        valueType = type(value)
+        if valueType in _SIMPLE_TYPES:
+            return ('value', value)
+        if valueType in (types.TupleType, types.ListType, types.DictType):
+            if len(value) > _MAX_ITEMS or depth >= _MAX_DEPTH:
+                return ('unknown', self._external(valueType))
+            if valueType is types.DictType:
+                return ('dict', [(self.value(k, depth + 1),
+                                  self.value(v, depth + 1))
+                                 for k, v in value.items()])
+            return (valueType.__name__,
+                    [self.value(item, depth + 1) for item in value])
+        if isinstance(value, types.ModuleType):
+            return ('module', value.__name__,
+                    _isSandboxedFile(getattr(value, '__file__', None)))
+
+        external = self._external(value)
+        if external is not None:
+            return external
+        if isinstance(value, types.FunctionType):
+            return self._function(value)
+        if _isClass(value):
+            return ('class', self._class(value))
+        if isinstance(value, staticmethod):
+            return ('staticmethod', self.value(value.__func__))
+        if isinstance(value, classmethod):
+            return ('classmethod', self.value(value.__func__))
+        if isinstance(value, property):
+            doc = value.__doc__
+            if type(doc) is not types.StringType:
+                doc = None
+            return ('property', [self.value(value.fget),
+                                 self.value(value.fset),
+                                 self.value(value.fdel)], doc)
+
+        valueClass = getattr(value, '__class__', valueType)
+        if _isClass(valueClass) and self._external(valueClass) is None:
+            return ('instance', self.value(valueClass))
+        return ('unknown', self._external(valueType))
+
+    def _external(self, value):
+        """
+        Return how to get the given function or class in the parent if it
+        comes from a module that is not sandboxed, or None.
+        """
+        if not isinstance(value, (types.FunctionType,
+                                  types.BuiltinFunctionType,
+                                  types.ClassType, type)):
+            return None
+        moduleName = getattr(value, '__module__', None)
+        name = getattr(value, '__name__', None)
+        module = sys.modules.get(moduleName)
+        if module is None or type(name) is not types.StringType or \
+           _isSandboxedFile(getattr(module, '__file__', None)):
+            return None
+        if getattr(module, name, None) is value:
+            return ('external', moduleName, name)
+        # types like NoneType are only found in the types module
+        if isinstance(value, type) and not _isClass(value):
+            for typeName, typeValue in types.__dict__.items():
+                if typeValue is value:
+                    return ('external', 'types', typeName)
+        return None
+
+    def _function(self, function):
+        defaults = function.func_defaults
+        if defaults is not None:
+            defaults = [self.value(default) for default in defaults]
+        return ('function', function.func_code, function.func_name, defaults,
+                len(function.func_closure or ()),
+                function.func_globals.get('__name__'))
+
+    def _class(self, classObject):
+        key = id(classObject)
+        if not self.classes.has_key(key):
+            # the attributes can refer to the class
+            self.classes[key] = None
+            bases = [self.value(base) for base in classObject.__bases__]
+            attrs = []
+            for name, value in classObject.__dict__.items():
+                if name not in _CLASS_ATTRS and \
+                   not isinstance(value, _DESCRIPTOR_TYPES):
+                    attrs.append((name, self.value(value)))
+            doc = classObject.__doc__
+            if type(doc) is not types.StringType:
+                doc = None
+            self.classes[key] = (classObject.__name__,
+                                 getattr(classObject, '__module__', None),
+                                 isinstance(classObject, type), bases,
+                                 attrs, doc)
+        return key
+
+
+def summarizeImport(name, moduleDir=None):
+    """
+    Import the given module like L{pcmodules.PyCheckerModule.load} does,
+    and summarize it and the other sandboxed modules loaded with it.
+
+    This is what the child does.
+
+    @returns: the marshalled result: ('ok', modules, classes), where
+              modules is a dict of module name -> summary; or the
+              exception the import raised, as (type name, args, text)
+    @rtype:   str
+    """
+    before = sys.modules.copy()
+    try:
+        handle, filename, smt = utils.findModule(name, moduleDir)
+        try:
+            imp.load_module(name, handle, filename, smt)
+        finally:
+            if handle is not None:
+                handle.close()
+    except (SystemExit, KeyboardInterrupt):
+        raise
+    except:
+        excType, excValue = sys.exc_info()[:2]
+        args = _Summarizer().value(tuple(getattr(excValue, 'args', ())))
+        return marshal.dumps((getattr(excType, '__name__', str(excType)),
+                              args, utils.safestr(excValue)))
+
+    summarizer = _Summarizer()
+    modules = {}
+    for moduleName, module in sys.modules.items():
+        if module is None or (before.get(moduleName) is module and
+                              moduleName != name):
+            continue
+        if _isSandboxedFile(getattr(module, '__file__', None)):
+            modules[moduleName] = summarizer.module(module)
+    return marshal.dumps(('ok', modules, summarizer.classes))
+
+
+class _Builder:
+    """
+    Builds stand-in modules from what a child sent.
+
+    @ivar batch: what the child sent, and the stand-in classes built from
+                 it so far, shared by all modules the child summarized
+    @type batch: L{_Batch}
+    """
+
+    def __init__(self, batch):
+        self.batch = batch
+
+    def module(self, name, summary):
+        filename, tokens = summary
+        module = static.newModule(name, filename)
+        for tokenName, value in tokens:
+            setattr(module, tokenName, self.value(value))
+        return module
+
+    def value(self, value):
+        kind = value[0]
+        if kind == 'value':
+            return value[1]
+        if kind == 'tuple':
+            return tuple(map(self.value, value[1]))
+        if kind == 'list':
+            return map(self.value, value[1])
+        if kind == 'dict':
+            result = {}
+            for k, v in value[1]:
+                try:
+                    result[self.value(k)] = self.value(v)
+                except TypeError:
+                    pass
+            return result
+        if kind == 'module':
+            return self._module(value[1], value[2])
+        if kind == 'external':
+            return _getAttribute(value[1], value[2])
+        if kind == 'function':
+            return self._function(*value[1:])
+        if kind == 'class':
+            return self._class(value[1])
+        if kind in ('staticmethod', 'classmethod'):
+            function = self.value(value[1])
+            if not isinstance(function, types.FunctionType):
+                return None
+            return {'staticmethod': staticmethod,
+                    'classmethod': classmethod}[kind](function)
+        if kind == 'property':
+            fget, fset, fdel = map(self.value, value[1])
+            return property(fget, fset, fdel, value[2])
+        if kind == 'instance':
+            return _makeInstance(self.value(value[1]))
+        # unknown: an empty value of the same type, if we can make one
+        # without running code from outside the standard library
+        valueType = value[1] and self.value(value[1])
+        if getattr(valueType, '__module__', None) == '__builtin__':
+            try:
+                return valueType()
+            except (SystemExit, KeyboardInterrupt):
+                raise
+            except:
+                pass
+        return _makeInstance(valueType)
+
+    def _module(self, name, sandboxed):
+        """
+        Return the module of the given name, leaving it in sys.modules like
+        importing the module that refers to it would.
+        """
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        if not sandboxed:
+            try:
+                __import__(name)
+                return sys.modules[name]
+            except (SystemExit, KeyboardInterrupt):
+                raise
+            except:
+                pass
+        elif self.batch.modules.has_key(name):
+            return self.module(name, self.batch.modules[name])
+        # what the PyCheckerModule loads for it
+        return types.ModuleType(name)
+
+    def _function(self, code, name, defaults, cells, globalsName):
+        if defaults is not None:
+            defaults = tuple(map(self.value, defaults))
+        closure = None
+        if cells:
+            closure = tuple([static._makeCell() for _ in range(cells)])
+        module = sys.modules.get(globalsName)
+        if module is None and self.batch.modules.has_key(globalsName):
+            module = self._module(globalsName, 1)
+        if module is not None:
+            functionGlobals = module.__dict__
+        else:
+            functionGlobals = {'__name__': globalsName}
+        return types.FunctionType(code, functionGlobals, name, defaults,
+                                  closure)
+
+    def _class(self, key):
+        classObject = self.batch.built.get(key)
+        if classObject is not None:
+            return classObject
+        summary = self.batch.classes.get(key)
+        if summary is None:
+            return None
+        name, moduleName, newStyle, bases, attrs, doc = summary
+
+        bases = tuple([base for base in map(self.value, bases)
+                       if isinstance(base, (types.ClassType, type))])
+        classDict = {'__module__': moduleName, '__doc__': doc}
+        for base in bases:
+            if isinstance(base, type):
+                newStyle = 1
+        if not newStyle:
+            classObject = types.ClassType(name, bases, classDict)
+        else:
+            try:
+                classObject = type(name, bases or (object, ), classDict)
+            except TypeError:
+                # for example, a layout conflict between bases
+                classObject = type(name, (object, ), classDict)
+        self.batch.built[key] = classObject
+
+        for attr, value in attrs:
+            try:
+                setattr(classObject, attr, self.value(value))
+            except (TypeError, AttributeError):
+                pass
+        return classObject
+
+
+class _Batch:
+    """
+    What a child sent back.
+
+    @ivar modules: module name -> summary of the module
+    @type modules: dict of str -> tuple
+    @ivar classes: id of the class in the child -> summary of the class
+    @type classes: dict of int -> tuple
+    @ivar built:   id of the class in the child -> stand-in class
+    @type built:   dict of int -> class
+    """
+
+    def __init__(self, modules, classes):
+        self.modules = modules
+        self.classes = classes
+        self.built = {}
+
+
+def _getAttribute(moduleName, name):
+    """
+    Get the given attribute of a module that is not sandboxed.
+    """
+    try:
+        __import__(moduleName)
+        return getattr(sys.modules[moduleName], name, None)
+    except (SystemExit, KeyboardInterrupt):
+        raise
+    except:
+        return None
+
+def _makeInstance(classObject):
+    """
+    Create an instance of a stand-in class, without calling __init__.
+    """
+    if isinstance(classObject, types.ClassType):
+        return types.InstanceType(classObject)
+    if isinstance(classObject, type):
+        try:
+            return object.__new__(classObject)
+        except TypeError:
+            pass
+    return None
+
+def _raise(name, args, text):
+    """
+    Raise the exception the import raised in the child again, as the same
+    type if it is a builtin exception.
+    """
+    args = _Builder(_Batch({}, {})).value(args)
+    excType = getattr(exceptions, name, None)
+    if isinstance(excType, type) and issubclass(excType, Exception):
+        try:
+            exc = excType(*args)
+        except (TypeError, ValueError):
+            exc = excType(text)
+        raise exc
+    raise SandboxError('%s: %s' % (name, text))
+
+def _mtime(filename):
+    try:
+        return os.path.getmtime(filename)
+    except OSError:
+        return None
+
+def loadModule(name, filename, moduleDir=None, timeout=None):
+    """
+    Import the given module in a child, or use what a child sent for it
+    before, and build a stand-in module for it.
+
+    The stand-in module is registered in sys.modules, like an imported
+    one.
+
+    @param filename: the file the module is loaded from
+    @type  filename: str
+    @param timeout:  seconds the child gets, if limited
+    @type  timeout:  float or None
+
+    @rtype: module
+    @raises SandboxError: if the child crashed or timed out
+    """
+    filename = _sourceFile(filename)
+    entry = _summaries.get(filename)
+    if entry is None or entry[0] != _mtime(filename) or entry[1] != name:
+        trace.event(trace.IMPORT, trace.BRIEF,
+                    'sandbox: importing %s in a child', name)
+        try:
+            result = marshal.loads(forked(summarizeImport, (name, moduleDir),
+                                          timeout))
+        except ForkTimeout:
+            raise SandboxError("importing %s took more than %d seconds" %
+                               (name, timeout))
+        except ForkError, e:
+            raise SandboxError("importing %s failed, %s" % (name, e))
+        if result[0] != 'ok':
+            _raise(*result)
+
+        batch = _Batch(result[1], result[2])
+        for moduleName, (path, tokens) in batch.modules.items():
+            if path is not None:
+                _summaries[path] = (_mtime(path), moduleName, batch)
+        entry = (None, name, batch)
+        if not batch.modules.has_key(name):
+            raise SandboxError("importing %s did not load it" % name)
+
+    mtime, name, batch = entry
+    return _Builder(batch).module(name, batch.modules[name])
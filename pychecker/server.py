@@ -0,0 +1,211 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+A checker daemon that keeps loaded modules around between checks.
+
+Starting python, importing pychecker and loading the modules used by the
+files to check takes most of the time of a check of a single file.
+The daemon started with --server keeps all of that in memory, and checks
+the files it gets from clients started with --connect over a Unix socket.
+
+Modules whose source file changed since they were loaded are forgotten
+before each check, together with the modules that refer to them; see
+L{pcmodules.ModuleTimes}.
+
+With --fork, the daemon only loads pychecker, the builtin modules and the
+modules given with --preload, and checks each request in a forked child
+that exits afterwards.  The child shares what the daemon loaded
+copy-on-write, and nothing the check loads is kept for the next one.
+"""
+
+import os
+import sys
+import errno
+import signal
+import socket
+import marshal
+import cStringIO
+import traceback
+
+from pychecker import utils
+from pychecker import pcmodules
+from pychecker import sandbox
+from pychecker import Config
+
+# how long a client waits for the answer, in seconds
+CLIENT_TIMEOUT = 600
+
+
+def _recvAll(sock):
+    chunks = []
+    while 1:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return ''.join(chunks)
+
+
+def preload(cfg):
+    """
+    Load the modules in cfg.preloadModules that are not loaded yet, so
+    checks do not need to load them.
+
+    @type cfg: L{Config.Config}
+    """
+    for moduleName in cfg.preloadModules:
+        if pcmodules.getPCModule(moduleName) is None:
+            utils.debug('server: preloading %s', moduleName)
+            pcmodules.PyCheckerModule(moduleName, 0).load()
+
+
+def _handle(request, moduleTimes):
+    """
+    Check the files for one client request.
+
+    @param request: dict with the cwd and the command line arguments
+                    of the client
+    @type  request: dict
+
+    @returns: exit status and output
+    @rtype:   tuple of (int, str)
+    """
+    from pychecker import check
+
+    output = cStringIO.StringIO()
+    oldStdout = sys.stdout
+    oldCwd = os.getcwd()
+    sys.stdout = output
+    try:
+        try:
+            os.chdir(request['cwd'])
+            cfg, files, suppressions = Config.setupFromArgs(request['args'])
+            # the client already read these for us
+            cfg.filesFrom = ''
+        except Config.UsageError:
+            return 127, output.getvalue()
+        except SystemExit, e:
+            return e.code or 0, output.getvalue()
+
+        utils.initConfig(cfg)
+        files = list(check.findFiles(files, cfg))
+        moduleTimes.invalidate()
+        if cfg.changedSince:
+            from pychecker import changes
+            try:
+                files = changes.selectFiles(files, cfg)
+            except changes.GitError, e:
+                utils.popConfig()
+                return 101, "Unable to find files changed since %s:\n  %s\n" \
+                    % (cfg.changedSince, e)
+        try:
+            warnings = check._check(files, cfg=cfg,
+                                    suppressions=suppressions)
+        finally:
+            moduleTimes.update()
+            utils.popConfig()
+
+        if not cfg.quiet:
+            output.write("\nWarnings...\n\n")
+        if warnings:
+            check._outputWarnings(warnings, cfg, output)
+            return 1, output.getvalue()
+        if not cfg.quiet:
+            output.write("None\n")
+        return 0, output.getvalue()
+    finally:
+        sys.stdout = oldStdout
+        os.chdir(oldCwd)
+
+def serve(path, cfg):
+    """
+    Check files for clients connecting to the Unix socket at path,
+    until interrupted.
+
+    @type path: str
+    @type cfg:  L{Config.Config}
+    """
+    from pychecker import check
+
+    utils.initConfig(cfg)
+    # load the builtin modules once, for all requests
+    check.fixupBuiltinModules(1)
+    preload(cfg)
+
+    # make sure we clean up the socket when killed
+    def terminate(signum, frame):
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, terminate)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    sock.listen(5)
+    moduleTimes = pcmodules.ModuleTimes()
+    moduleTimes.update()
+    if not cfg.quiet:
+        sys.stderr.write("Listening on %s\n" % path)
+
+    try:
+        while 1:
+            try:
+                connection, _ = sock.accept()
+            except socket.error, e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            try:
+                try:
+                    request = marshal.loads(_recvAll(connection))
+                    if cfg.forkServer:
+                        # load the preloaded modules that changed again
+                        # here, not in every child
+                        moduleTimes.invalidate()
+                        preload(cfg)
+                        moduleTimes.update()
+                        response = sandbox.forked(_handle,
+                                                  (request, moduleTimes))
+                    else:
+                        response = _handle(request, moduleTimes)
+                except (SystemExit, KeyboardInterrupt):
+                    raise
+                except:
+                    response = (2, "Internal error in pychecker server:\n" +
+                                   traceback.format_exc())
+                connection.sendall(marshal.dumps(response))
+            finally:
+                connection.close()
+    finally:
+        sock.close()
+        os.unlink(path)
+        utils.popConfig()
+
+def runClient(path, args):
+    """
+    Have the daemon listening on the Unix socket at path check the files
+    given in args, and print the results.
+
+    @param args: command line arguments, without the program name
+    @type  args: list of str
+
+    @returns: the exit status
+    @rtype:   int
+    """
+    request = {
+        'cwd': os.getcwd(),
+        'args': args,
+    }
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CLIENT_TIMEOUT)
+    try:
+        sock.connect(path)
+        sock.sendall(marshal.dumps(request))
+        sock.shutdown(socket.SHUT_WR)
+        status, output = marshal.loads(_recvAll(sock))
+    finally:
+        sock.close()
+
+    sys.stdout.write(output)
+    return status
@@ -0,0 +1,511 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Build modules from their byte code without executing them.
+
+Normally pychecker imports each module to find its functions, classes
+and variables.  That runs the module's top level code, and that of
+everything it imports.  In static mode, the module's code object is
+walked instead: functions are created from the code objects they are
+made from, classes from the code of their body, and everything else
+stored at module level becomes a variable.  Values that can only be
+known by running code are replaced by None.
+
+Modules from the standard library, builtin modules and C extensions
+are still imported normally.
+"""
+
+import os
+import sys
+import imp
+import types
+import string
+import opcode
+import __builtin__
+
+from pychecker import utils
+from pychecker import OP
+from pychecker import trace
+
+
+class _Unknown:
+    "Marker for a value that can only be known by running code."
+    def __repr__(self):
+        return '<unknown>'
+
+_UNKNOWN = _Unknown()
+
+class _Call:
+    "Marker for the result of calling a function created from byte code."
+    def __init__(self, func):
+        self.func = func
+
+# decorators that we can apply without running user code
+_DECORATORS = (staticmethod, classmethod, property)
+
+# id -> class, for all classes built from byte code
+_classes = {}
+
+_stdlibDirs = None
+
+def _isStandardLibrary(filename):
+    """
+    @rtype: bool
+    """
+    global _stdlibDirs
+    if _stdlibDirs is None:
+        _stdlibDirs = []
+        try:
+            from distutils import sysconfig
+            _stdlibDirs.append(os.path.normcase(os.path.abspath(
+                sysconfig.get_python_lib(standard_lib=1))))
+        except ImportError:
+            pass
+
+    path = os.path.normcase(os.path.abspath(filename))
+    for stdlibDir in _stdlibDirs:
+        if path.startswith(stdlibDir + os.sep):
+            rest = path[len(stdlibDir) + 1:]
+            return not (rest.startswith('site-packages') or
+                        rest.startswith('dist-packages'))
+    return False
+
+def _makeCell():
+    value = None
+    return (lambda: value).func_closure[0]
+
+def _instructions(code):
+    """
+    Yield the operations in the given code object.
+
+    @type code: L{types.CodeType}
+
+    @rtype: generator of (str, int or None)
+    """
+    co_code = code.co_code
+    index, maxCode, extended_arg = 0, len(co_code), 0
+    while index < maxCode:
+        op, oparg, index, extended_arg = OP.getInfo(co_code, index,
+                                                    extended_arg)
+        if op == OP.EXTENDED_ARG:
+            continue
+        yield opcode.opname[op], oparg
+
+
+def findModule(name, moduleDir=None):
+    """
+    Like L{utils.findModule}, but without importing packages to find
+    their path.  A package is found as its __init__.py.
+
+    @type  name:      str
+    @type  moduleDir: str or None
+
+    @returns: (file, filename, (suffix, mode, type)) like imp.find_module
+    """
+    path = sys.path[:]
+    if moduleDir:
+        path.insert(0, moduleDir)
+
+    packages = string.split(name, '.')
+    for p in packages:
+        handle, filename, smt = imp.find_module(p, path)
+        if smt[-1] != imp.PKG_DIRECTORY:
+            if p is not packages[-1]:
+                if handle is not None:
+                    handle.close()
+                raise ImportError, "No module named %s" % packages[-1]
+            return handle, filename, smt
+        path = [filename]
+
+    initFile = os.path.join(filename, '__init__.py')
+    return open(initFile, 'U'), initFile, ('.py', 'U', imp.PY_SOURCE)
+
+def newModule(name, filename):
+    """
+    Create an empty module for the given source file, and register it
+    in sys.modules.
+
+    @rtype: module
+    """
+    module = types.ModuleType(name)
+    module.__file__ = filename
+    module.__builtins__ = __builtin__
+    if os.path.basename(filename) == '__init__.py':
+        module.__path__ = [os.path.dirname(filename)]
+    sys.modules[name] = module
+    return module
+
+def _loadSource(name, filename):
+    """
+    Create a module from the given source file, without executing it.
+
+    @rtype: module
+    """
+    module = newModule(name, filename)
+    try:
+        handle = open(filename, 'U')
+        try:
+            source = handle.read()
+        finally:
+            handle.close()
+        if source and source[-1] != '\n':
+            source = source + '\n'
+        code = compile(source, filename, 'exec')
+    except (IOError, SyntaxError, TypeError), e:
+        trace.event(trace.IMPORT, trace.BRIEF,
+                    'static: cannot compile %s: %s', filename, e)
+        return module
+
+    populate(module, code)
+    return module
+
+def _importModule(name, level, importer):
+    """
+    Find and load the given module, statically if it is not part of
+    the standard library.
+
+    @param name:     the dotted name of the module
+    @type  name:     str
+    @param level:    the level of the import, as given to __import__
+    @type  level:    int
+    @param importer: the module doing the import
+    @type  importer: module
+
+    @returns: the top level package and the module itself, or None
+    @rtype:   tuple of (module, module) or None
+    """
+    importerFile = getattr(importer, '__file__', None) or ''
+    importerDir = os.path.dirname(importerFile)
+    if level > 0:
+        for _ in range(level - 1):
+            importerDir = os.path.dirname(importerDir)
+        path = [importerDir]
+        if not name:
+            packageName = os.path.basename(importerDir)
+            initFile = os.path.join(importerDir, '__init__.py')
+            package = sys.modules.get(packageName)
+            if getattr(package, '__file__', None) != initFile:
+                package = _loadSource(packageName, initFile)
+            return package, package
+    elif level < 0:
+        path = [importerDir] + sys.path
+    else:
+        path = sys.path[:]
+
+    top = parent = None
+    parts = string.split(name, '.')
+    for i in range(len(parts)):
+        part = parts[i]
+        qualifiedName = string.join(parts[:i + 1], '.')
+        module = sys.modules.get(qualifiedName)
+        if module is None:
+            try:
+                handle, filename, smt = imp.find_module(part, path)
+            except ImportError:
+                return None
+            if handle is not None:
+                handle.close()
+
+            kind = smt[-1]
+            if kind == imp.PKG_DIRECTORY:
+                filename = os.path.join(filename, '__init__.py')
+                if not os.path.exists(filename):
+                    kind = None
+            if kind in (imp.PY_SOURCE, imp.PKG_DIRECTORY) and \
+               not _isStandardLibrary(filename):
+                module = _loadSource(qualifiedName, filename)
+            else:
+                try:
+                    __import__(qualifiedName)
+                    module = sys.modules[qualifiedName]
+                except (SystemExit, KeyboardInterrupt):
+                    raise
+                except:
+                    trace.event(trace.IMPORT, trace.BRIEF,
+                                'static: cannot import %s', qualifiedName)
+                    return None
+
+        if parent is not None:
+            setattr(parent, part, module)
+        if top is None:
+            top = module
+        parent = module
+        path = getattr(module, '__path__', None)
+        if path is None and i < len(parts) - 1:
+            return None
+
+    return top, module
+
+def _importName(name, fromlist, level, importer):
+    """
+    Emulate __import__ for the module being built.
+
+    @rtype: module or L{_UNKNOWN}
+    """
+    modules = _importModule(name, level, importer)
+    if modules is None:
+        return _UNKNOWN
+    top, module = modules
+
+    if not fromlist or fromlist is _UNKNOWN:
+        return top
+
+    # submodules need to be imported explicitly
+    if hasattr(module, '__path__'):
+        for fromName in fromlist:
+            if fromName != '*' and not hasattr(module, fromName):
+                if level > 0 and not name:
+                    _importModule(fromName, level, importer)
+                else:
+                    _importModule(module.__name__ + '.' + fromName, 0,
+                                  importer)
+    return module
+
+
+def _bind(namespace, name, value):
+    # keep what we know; we cannot tell which branch of a conditional
+    # definition will be taken, and the first one is usually the one
+    # that matters (try: import x except ImportError: x = None)
+    if value is _UNKNOWN or value is None or isinstance(value, _Call):
+        # do not shadow builtins with something that might never be
+        # stored, like the name in except KeyError, RuntimeError:
+        if value is not None and __builtin__.__dict__.has_key(name):
+            return
+        if not namespace.has_key(name):
+            namespace[name] = None
+        return
+    namespace[name] = value
+
+def _lookup(name, namespace, module):
+    for scope in (namespace, module.__dict__, __builtin__.__dict__):
+        if scope.has_key(name):
+            return scope[name]
+    return _UNKNOWN
+
+def _makeFunction(code, defaults, module):
+    for i in range(len(defaults)):
+        if defaults[i] is _UNKNOWN:
+            defaults[i] = None
+    defaults = tuple(defaults)
+    # the cells are never looked at, only their number matters
+    if code.co_freevars:
+        closure = tuple([_makeCell() for _ in code.co_freevars])
+    else:
+        closure = None
+    return types.FunctionType(code, module.__dict__, code.co_name,
+                              defaults or None, closure)
+
+def _makeClass(name, bases, body, module):
+    classDict = {}
+    if body is not None:
+        _run(body.func_code, classDict, module)
+    classDict['__module__'] = module.__name__
+
+    # do not run user defined metaclasses
+    metaclass = classDict.pop('__metaclass__', None)
+    if classDict.get('__slots__', 0) is None:
+        del classDict['__slots__']
+    bases = tuple([base for base in bases
+                   if isinstance(base, (type, types.ClassType))])
+    newStyle = metaclass is type
+    for base in bases:
+        if isinstance(base, type):
+            newStyle = True
+    if not newStyle:
+        klass = types.ClassType(name, bases, classDict)
+    else:
+        try:
+            klass = type(name, bases or (object, ), classDict)
+        except TypeError:
+            # for example, a layout conflict between bases
+            classDict.pop('__slots__', None)
+            klass = type(name, (object, ), classDict)
+    _classes[id(klass)] = klass
+    return klass
+
+def _makeInstance(klass):
+    """
+    Create an instance of a class we built, without calling __init__.
+
+    @rtype: object or L{_UNKNOWN}
+    """
+    if isinstance(klass, types.ClassType):
+        return types.InstanceType(klass)
+    for base in klass.__mro__:
+        if not _classes.has_key(id(base)):
+            try:
+                return base.__new__(klass)
+            except (SystemExit, KeyboardInterrupt):
+                raise
+            except:
+                return _UNKNOWN
+    return _UNKNOWN
+
+def _pop(stack, count=1):
+    values = []
+    for _ in range(count):
+        if stack:
+            values.insert(0, stack.pop())
+        else:
+            values.insert(0, _UNKNOWN)
+    return values
+
+def _run(code, namespace, module):
+    """
+    Walk the given module or class body code, binding the names it
+    stores in namespace.
+
+    Only a small part of the stack is simulated; any operation not
+    handled here makes us forget the stack.
+
+    @type code:      L{types.CodeType}
+    @type namespace: dict
+    @type module:    module
+    """
+    stack = []
+    for name, oparg in _instructions(code):
+        if name == 'LOAD_CONST':
+            stack.append(code.co_consts[oparg])
+        elif name in ('LOAD_NAME', 'LOAD_GLOBAL'):
+            stack.append(_lookup(code.co_names[oparg], namespace, module))
+        elif name == 'LOAD_ATTR':
+            value = _pop(stack)[0]
+            if isinstance(value, (types.ModuleType, types.ClassType, type)):
+                stack.append(getattr(value, code.co_names[oparg], _UNKNOWN))
+            else:
+                stack.append(_UNKNOWN)
+        elif name in ('STORE_NAME', 'STORE_GLOBAL'):
+            target = namespace
+            if name == 'STORE_GLOBAL':
+                target = module.__dict__
+            _bind(target, code.co_names[oparg], _pop(stack)[0])
+        elif name == 'STORE_ATTR':
+            _pop(stack, 2)
+        elif name == 'BUILD_TUPLE':
+            stack.append(tuple(_pop(stack, oparg)))
+        elif name == 'BUILD_LIST':
+            stack.append(_pop(stack, oparg))
+        elif name == 'BUILD_MAP':
+            stack.append({})
+        elif name == 'STORE_MAP':
+            key, value = _pop(stack, 2)
+            if stack and isinstance(stack[-1], dict):
+                try:
+                    stack[-1][key] = value
+                except TypeError:
+                    pass
+        elif name in ('LOAD_CLOSURE', 'LOAD_LOCALS'):
+            stack.append(_UNKNOWN)
+        elif name == 'MAKE_FUNCTION':
+            funcCode = _pop(stack)[0]
+            defaults = _pop(stack, oparg)
+            if isinstance(funcCode, types.CodeType):
+                stack.append(_makeFunction(funcCode, defaults, module))
+            else:
+                stack.append(_UNKNOWN)
+        elif name == 'MAKE_CLOSURE':
+            funcCode, = _pop(stack)
+            _pop(stack)
+            defaults = _pop(stack, oparg)
+            if isinstance(funcCode, types.CodeType):
+                stack.append(_makeFunction(funcCode, defaults, module))
+            else:
+                stack.append(_UNKNOWN)
+        elif name in ('CALL_FUNCTION', 'CALL_FUNCTION_VAR',
+                      'CALL_FUNCTION_KW', 'CALL_FUNCTION_VAR_KW'):
+            extra = {'CALL_FUNCTION': 0, 'CALL_FUNCTION_VAR': 1,
+                     'CALL_FUNCTION_KW': 1, 'CALL_FUNCTION_VAR_KW': 2}[name]
+            positional, keyword = oparg & 0xFF, oparg >> 8
+            _pop(stack, extra + 2 * keyword)
+            args = _pop(stack, positional)
+            func = _pop(stack)[0]
+            stack.append(_call(func, args, name == 'CALL_FUNCTION' and
+                               not keyword))
+        elif name == 'BUILD_CLASS':
+            className, bases, body = _pop(stack, 3)
+            if not isinstance(className, str):
+                stack.append(_UNKNOWN)
+                continue
+            if not isinstance(bases, tuple):
+                bases = ()
+            if isinstance(body, _Call):
+                body = body.func
+            else:
+                body = None
+            stack.append(_makeClass(className, bases, body, module))
+        elif name == 'IMPORT_NAME':
+            fromlist = _pop(stack)[0]
+            level = -1
+            if utils.pythonVersion() >= utils.PYTHON_2_5:
+                level = _pop(stack)[0]
+                if not isinstance(level, int):
+                    level = -1
+            stack.append(_importName(code.co_names[oparg], fromlist, level,
+                                     module))
+        elif name == 'IMPORT_FROM':
+            fromModule = stack and stack[-1] or _UNKNOWN
+            stack.append(getattr(fromModule, code.co_names[oparg], _UNKNOWN))
+        elif name == 'IMPORT_STAR':
+            fromModule = _pop(stack)[0]
+            if isinstance(fromModule, types.ModuleType):
+                names = getattr(fromModule, '__all__', None)
+                if not isinstance(names, (list, tuple)):
+                    names = [n for n in dir(fromModule) if n[:1] != '_']
+                for starName in names:
+                    if isinstance(starName, str):
+                        _bind(namespace, starName,
+                              getattr(fromModule, starName, _UNKNOWN))
+        elif name == 'DUP_TOP':
+            stack.extend(_pop(stack) * 2)
+        elif name == 'POP_TOP':
+            _pop(stack)
+        elif name == 'ROT_TWO':
+            a, b = _pop(stack, 2)
+            stack.extend([b, a])
+        elif name == 'ROT_THREE':
+            a, b, c = _pop(stack, 3)
+            stack.extend([c, a, b])
+        elif name == 'UNPACK_SEQUENCE':
+            _pop(stack)
+            stack.extend([_UNKNOWN] * oparg)
+        elif name in ('GET_ITER', 'FOR_ITER'):
+            stack.append(_UNKNOWN)
+        elif name in ('SETUP_LOOP', 'SETUP_EXCEPT', 'SETUP_FINALLY',
+                      'POP_BLOCK', 'JUMP_FORWARD', 'JUMP_ABSOLUTE', 'NOP'):
+            pass
+        else:
+            stack = []
+
+def _call(func, args, simple):
+    """
+    Return what we know about the result of calling func with args.
+    """
+    if not simple:
+        return _UNKNOWN
+
+    # the class body function, called right before BUILD_CLASS
+    if not args and isinstance(func, types.FunctionType):
+        return _Call(func)
+
+    if not args and _classes.has_key(id(func)):
+        return _makeInstance(func)
+
+    if len(args) == 1 and isinstance(args[0], (types.FunctionType,
+                                               types.ClassType, type)):
+        if func in _DECORATORS:
+            return func(args[0])
+        # assume that other decorators return what they decorate
+        return args[0]
+    return _UNKNOWN
+
+def populate(module, code):
+    """
+    Fill the namespace of module from its code, without executing it.
+
+    @type module: module
+    @type code:   L{types.CodeType}
+    """
+    trace.event(trace.IMPORT, trace.BRIEF,
+                'static: building module %s from byte code', module.__name__)
+    _run(code, module.__dict__, module)
@@ -0,0 +1,168 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Trace what pychecker does, with -d, --trace and --trace-file.
+
+Events have a category and a level, and are only formatted when the
+current configuration traces their category at that level.  Code run
+often, like for every instruction, tests L{tracing} before building the
+arguments of an event, so tracing costs nothing when it is off:
+
+    if trace.tracing and trace.on(trace.DIS, trace.DETAIL):
+        trace.event(trace.DIS, trace.DETAIL, 'DIS  %d %s', offset, name)
+
+What is traced follows the current configuration; L{pychecker.utils}
+calls L{configure} whenever that changes, so -d in a __pychecker__
+string traces that function only.
+"""
+
+import os
+import sys
+import time
+
+try:
+    import json
+except ImportError:
+    try:
+        import simplejson as json
+    except ImportError:
+        json = None
+
+# categories
+DIS = 'dis'             # every instruction analyzed
+CHECK = 'check'         # modules, classes and functions analyzed
+IMPORT = 'import'       # modules found and imported
+SUPPRESS = 'suppress'   # suppressions and __pychecker__ options
+WARNING = 'warning'     # warnings added
+RUN = 'run'             # everything else: caching, workers, ...
+
+CATEGORIES = (DIS, CHECK, IMPORT, SUPPRESS, WARNING, RUN)
+
+# levels
+BRIEF = 1
+DETAIL = 2
+
+# whether the current configuration traces anything
+tracing = 0
+
+# category -> level traced with the current configuration
+_levels = {}
+# path of the file events go to, or None for stdout
+_path = None
+# (path, pid) -> open file; a forked child opens the file again
+_files = {}
+# (debug, trace) -> levels, so configuring again is cheap
+_parsed = {}
+
+
+def parse(specs):
+    """
+    Parse the categories to trace, each optionally followed by :level.
+
+    @param specs: category[:level] strings; all for every category
+    @type  specs: list of str
+
+    @rtype: dict of str -> int
+    @raises ValueError: for an unknown category or level
+    """
+    levels = {}
+    for spec in specs:
+        spec = spec.strip()
+        if not spec:
+            continue
+        category, level = spec, BRIEF
+        if ':' in spec:
+            category, level = spec.split(':', 1)
+            level = int(level)
+            if level not in (BRIEF, DETAIL):
+                raise ValueError('invalid trace level %d' % level)
+        if category == 'all':
+            categories = CATEGORIES
+        elif category in CATEGORIES:
+            categories = (category, )
+        else:
+            raise ValueError('unknown trace category %s' % category)
+        for category in categories:
+            levels[category] = max(levels.get(category, 0), level)
+    return levels
+
+def configure(cfg):
+    """
+    Trace what the given configuration asks for: everything with -d,
+    or the categories of --trace.
+
+    @type cfg: L{pychecker.Config.Config} or None
+    """
+    global tracing, _levels, _path
+    if cfg is None:
+        tracing, _levels = 0, {}
+        return
+
+    key = (cfg.debug, tuple(cfg.trace))
+    levels = _parsed.get(key)
+    if levels is None:
+        if cfg.debug:
+            levels = parse(['all:%d' % DETAIL])
+        else:
+            try:
+                levels = parse(cfg.trace)
+            except ValueError:
+                # Config checked the command line, ignore the rest
+                levels = {}
+        levels = _parsed[key] = levels
+    _levels = levels
+    _path = cfg.traceFile or None
+    tracing = len(levels) > 0
+
+def on(category, level=BRIEF):
+    """
+    @rtype: int (used as bool)
+    @returns: whether events of the category at the level are traced
+    """
+    return _levels.get(category, 0) >= level
+
+def _format(formatString, args):
+    if not args:
+        return formatString
+    if '%' in formatString:
+        return formatString % args
+    args = [isinstance(a, str) and a or repr(a) for a in args]
+    return formatString + " " + " ".join(args)
+
+def _file(path):
+    key = (path, os.getpid())
+    handle = _files.get(key)
+    if handle is None:
+        # workers append to the same file
+        handle = _files[key] = open(path, 'a')
+    return handle
+
+def event(category, level, formatString, *args):
+    """
+    Trace an event, if the category is traced at the level.
+
+    The message is formatString % args if formatString has a %, or else
+    formatString followed by the args, strings as they are and other
+    objects by their repr.
+
+    @type category: str
+    @type level:    int
+    """
+    if _levels.get(category, 0) < level:
+        return
+    message = _format(formatString, args)
+    if _path is None:
+        print "DEBUG:", message
+        return
+
+    record = {'time': time.time(), 'pid': os.getpid(),
+              'category': category, 'level': level, 'message': message}
+    if json is not None:
+        line = json.dumps(record, sort_keys=True)
+    else:
+        line = '%(time).6f %(pid)d %(category)s %(level)d %(message)s' % \
+               record
+    handle = _file(_path)
+    handle.write(line + '\n')
+    handle.flush()
@@ -18,6 +18,8 @@ import types
 
 from pychecker import msgs
 from pychecker import Config
+from pychecker import importprofile
+from pychecker import trace
 from pychecker.Warning import Warning
 
 
@@ -40,13 +42,19 @@ def cfg() :
 
 def initConfig(cfg) :
     _cfg.append(cfg)
+    trace.configure(cfg)
 
 def pushConfig() :
+    # a copy traces the same
     newCfg = copy.copy(cfg())
     _cfg.append(newCfg)
 
 def popConfig() :
     del _cfg[-1]
+    if _cfg:
+        trace.configure(_cfg[-1])
+    else:
+        trace.configure(None)
 
 
 def shouldUpdateArgs(operand) :
@@ -73,14 +81,16 @@ def updateCheckerArgs(argStr, func, lastLineNum, warnings):
         argList = string.split(argStr)
         # if func is code, might trigger
         # TypeError: code.__cmp__(x,y) requires y to be a 'code', not a 'str'
-        if argList and not type(func) == str:
-            debug('func %r: pychecker args %r', func, argStr)
+        if argList and not type(func) == str and trace.tracing:
+            trace.event(trace.SUPPRESS, trace.BRIEF,
+                        'func %r: pychecker args %r', func, argStr)
         # don't require long options to start w/--, we can add that for them
         for i in range(0, len(argList)):
             if argList[i][0] != '-':
                 argList[i] = '--' + argList[i]
 
         cfg().processArgs(argList)
+        trace.configure(cfg())
         return 1
     except Config.UsageError, detail:
         # this gets triggered when parsing a bad __pychecker__ declaration
@@ -90,16 +100,10 @@ def updateCheckerArgs(argStr, func, lastLineNum, warnings):
                        
 
 def debug(formatString, *args):
-    if cfg().debug:
-        if args:
-            if '%' in formatString:
-                message = formatString % args
-            else:
-                args = [isinstance(a, str) and a or repr(a) for a in args]
-                message = formatString + " " + " ".join(args)
-        else:
-            message = formatString
-        print "DEBUG:", message
+    """
+    Trace an event of the run; see L{trace.event}.
+    """
+    trace.event(trace.RUN, trace.BRIEF, formatString, *args)
 
 
 PYTHON_1_5 = 0x10502
@@ -141,6 +145,54 @@ def safestr(value):
       return unicode(value)
 
 
+def getMemoryUsage():
+    """
+    Return the resident memory size of the current process, in kilobytes.
+    Falls back to the peak resident size if the current one is unknown.
+
+    @rtype: int
+    """
+    try:
+        handle = open('/proc/self/statm')
+        try:
+            pages = int(string.split(handle.read())[1])
+        finally:
+            handle.close()
+        return pages * (os.sysconf('SC_PAGE_SIZE') / 1024)
+    except (IOError, IndexError, ValueError, AttributeError, OSError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Mac OS X reports bytes instead of kilobytes
+    if sys.platform == 'darwin':
+        usage = usage / 1024
+    return usage
+
+def getPeakMemoryUsage(children=False):
+    """
+    Return the peak resident memory size of the current process, or of
+    the largest of its children that were waited for, in kilobytes.
+
+    @rtype: int
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    if children:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    else:
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Mac OS X reports bytes instead of kilobytes
+    if sys.platform == 'darwin':
+        usage = usage / 1024
+    return usage
+
+
 def _q_file(f):
     # crude hack!!!
     # imp.load_module requires a real file object, so we can't just
@@ -185,7 +237,8 @@ def findModule(name, moduleDir=None) :
         if smt[-1] == imp.PKG_DIRECTORY :
             try :
                 # package found - read path info from init file
-                m = imp.load_module(p, handle, filename, smt)
+                m = importprofile.loadModule(p, handle, filename, smt,
+                                             moduleDir, name)
             finally :
                 if handle is not None :
                     handle.close()
@@ -196,7 +249,8 @@ def findModule(name, moduleDir=None) :
             if m.__name__ != p :
                 try :
                     handle, filename, smt = _q_find_module(m.__name__, path)
-                    m = imp.load_module(p, handle, filename, smt)
+                    m = importprofile.loadModule(p, handle, filename, smt,
+                                                 moduleDir, name)
                 finally :
                     if handle is not None :
                         handle.close()
@@ -217,7 +271,13 @@ def findModule(name, moduleDir=None) :
     return handle, filename, smt
 
 
-def _getLineInFile(moduleName, moduleDir, linenum):
+def _getLineInFile(moduleName, moduleDir, linenum, source=None):
+    if source is not None:
+        try:
+            return string.rstrip(source.split('\n')[linenum - 1])
+        except IndexError:
+            return ''
+
     line = ''
     handle, filename, smt = findModule(moduleName, moduleDir)
     if handle is None:
@@ -230,7 +290,7 @@ def _getLineInFile(moduleName, moduleDir, linenum):
     handle.close()
     return line
 
-def importError(moduleName, moduleDir=None):
+def importError(moduleName, moduleDir=None, source=None):
     exc_type, exc_value, tb = sys.exc_info()
 
     # First, try to get a nice-looking name for this exception type.
@@ -250,7 +310,7 @@ def importError(moduleName, moduleDir=None):
         # the output and make it consistent for all versions of Python
         e = exc_value
         msg = '%s (%s, line %d)' % (e.msg, e.filename, e.lineno)
-        line = _getLineInFile(moduleName, moduleDir, e.lineno)
+        line = _getLineInFile(moduleName, moduleDir, e.lineno, source)
         offset = e.offset
         if type(offset) is not types.IntType:
             offset = 0
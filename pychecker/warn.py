@@ -14,6 +14,7 @@ import string
 import types
 import traceback
 import imp
+import time
 import re
 
 from pychecker import OP
@@ -25,8 +26,20 @@ from pychecker import pcmodules
 from pychecker import msgs
 from pychecker import utils
 from pychecker import CodeChecks
+from pychecker import progress
+from pychecker import metrics
+from pychecker import trace
 from pychecker.Warning import Warning
 
+# instructions analyzed between looks at the clock for --maxmoduleseconds
+_CLOCK_INTERVAL = 1000
+
+# when the analysis of the current module has to stop, whether it did,
+# and whether the analysis of any code in the module was truncated
+_deadline = None
+_expired = 0
+_truncated = 0
+
 
 def cfg() :
     return utils.cfg()
@@ -144,15 +157,48 @@ def _checkComplex(code, maxValue, value, func, err) :
         code.addWarning(err % (func.function.__name__, value), line)
 
 
+def _budgetExceeded(code, codeSource, instructions, maxInstructions) :
+    """
+    Return whether the analysis of the code has to stop, because it is
+    too long or the module took too long; warn the first time.
+    """
+    global _expired, _truncated
+    if _expired :
+        pass
+    elif maxInstructions and instructions >= maxInstructions :
+        code.addWarning(msgs.ANALYSIS_TRUNCATED %
+                        (code.func_code.co_name, maxInstructions))
+    elif _deadline is not None and time.time() > _deadline :
+        _expired = 1
+        code.addWarning(msgs.MODULE_ANALYSIS_TRUNCATED %
+                        (codeSource.module.moduleName, cfg().maxModuleSeconds))
+    else :
+        return 0
+    code.truncated = _truncated = 1
+    return 1
+
 def _checkCode(code, codeSource) :
+    dispatched = 0
+    instructions = checkpoint = 0
+    maxInstructions = cfg().maxInstructions
     while code.index < code.maxCode :
+        if instructions == checkpoint :
+            if _budgetExceeded(code, codeSource, instructions,
+                               maxInstructions) :
+                break
+            checkpoint = instructions + _CLOCK_INTERVAL
+            if maxInstructions :
+                checkpoint = min(checkpoint, maxInstructions)
+        instructions += 1
         op, oparg, operand = code.popNextOp()
         dispatch_func = CodeChecks.DISPATCH[op]
         if dispatch_func is not None :
+            dispatched += 1
             try :
                 dispatch_func(oparg, operand, codeSource, code)
             except NotImplementedError :
                 raise NotImplementedError('No DISPATCH member for op %r' % op)
+    metrics.add('instructions_dispatched_total', dispatched)
 
 def _name_unused(var) :
     if var in cfg().unusedNames :
@@ -178,7 +224,8 @@ def _handleNestedCode(func_code, code, codeSource):
     """
     nested = not (codeSource.main or codeSource.in_class)
     if func_code.co_name == utils.LAMBDA or nested:
-        utils.debug(' handling nested code %s under %r for %r',
+        trace.event(trace.CHECK, trace.BRIEF,
+            ' handling nested code %s under %r for %r',
             func_code.co_name, codeSource.func, code.func)
         varnames = None
         if nested and func_code.co_name != utils.LAMBDA:
@@ -202,36 +249,52 @@ def _handleNestedCode(func_code, code, codeSource):
         code.returnValues = returnValues
 
 def _findUnreachableCode(code) :
-    # code after RETURN or RAISE is unreachable unless there's a branch to it
-    unreachable = {}
-    terminals = code.returnValues[:-1] + code.raiseValues
-    terminals.sort(lambda a, b: cmp(a[2], b[2]))
-    for line, dummy, i in terminals :
-        if not code.branches.has_key(i) :
-            unreachable[i] = line
-
-    # find the index of the last return
-    lastLine = lastItem = lastIndex = None
-    if code.returnValues:
-        lastLine, lastItem, lastIndex = code.returnValues[-1]
-    if len(code.returnValues) >= 2 :
-        lastIndex = code.returnValues[-2][2]
-    if code.raiseValues :
-        lastIndex = max(lastIndex, code.raiseValues[-1][2])
-
-    # remove last return if it's unreachable AND implicit
-    if unreachable.get(lastIndex) == lastLine and lastItem and \
-           lastItem.isImplicitNone():
-        del code.returnValues[-1]
-        del unreachable[lastIndex]
+    # returns in code that can never be run do not return anything
+    graph = code.getGraph()
+    returnValues = []
+    for value in code.returnValues :
+        if graph.isReachable(value[2] - 1) :
+            returnValues.append(value)
+    code.returnValues = returnValues
 
     if cfg().unreachableCode :
-        for index in unreachable.keys() :
-            try :
-                if not OP.JUMP_FORWARD(ord(code.bytes[index])) :
-                    code.addWarning(msgs.CODE_UNREACHABLE, unreachable[index])
-            except IndexError :
-                pass
+        for index in graph.unreachable() :
+            code.addWarning(msgs.CODE_UNREACHABLE,
+                            code.instructions.lineNum(index))
+
+
+def _checkCodeWarnings(code, func, main, in_class) :
+    """
+    Add the warnings that need all of the code of a function analyzed.
+    """
+    if cfg().checkReturnValues :
+        _checkReturnWarnings(code)
+
+    if cfg().localVariablesUsed :
+        for var, line in code.unusedLocals.items() :
+            if line is not None and line > 0 and _name_unused(var) :
+                code.addWarning(msgs.UNUSED_LOCAL % var, line)
+
+    if cfg().argumentsUsed :
+        op = code.getFirstOp()
+        if not (OP.RAISE_VARARGS(op) or OP.RETURN_VALUE(op)) :
+            for var, line in code.unusedLocals.items() :
+                _checkUnusedParam(var, line, func, code)
+
+    # Check code complexity: a branch for each decision taken
+    branches = code.getGraph().complexity() - 1
+    lines = (code.getLastLineNum() - code.func_code.co_firstlineno)
+    returns = len(code.returnValues)
+    if not main and not in_class :
+        args = code.func_code.co_argcount
+        localCount = len(code.func_code.co_varnames) - args
+        _checkComplex(code, cfg().maxArgs, args, func, msgs.TOO_MANY_ARGS)
+        _checkComplex(code, cfg().maxLocals, localCount, func,
+            msgs.TOO_MANY_LOCALS)
+        _checkComplex(code, cfg().maxLines, lines, func, msgs.FUNC_TOO_LONG)
+    _checkComplex(code, cfg().maxReturns, returns, func, msgs.TOO_MANY_RETURNS)
+    _checkComplex(code, cfg().maxBranches, branches, func,
+        msgs.TOO_MANY_BRANCHES)
 
 
 def _checkFunction(module, func, classObject=None, main=0, in_class=0):
@@ -263,7 +326,7 @@ def _checkFunction(module, func, classObject=None, main=0, in_class=0):
 
     try :
         _checkCode(code, codeSource)
-        if not in_class :
+        if not in_class and not code.truncated :
             _findUnreachableCode(code)
 
         # handle lambdas and nested functions
@@ -284,37 +347,9 @@ def _checkFunction(module, func, classObject=None, main=0, in_class=0):
             exc_list[index] = string.replace(exc_list[index], "\n", "\n\t")
         code.addWarning(msgs.CHECKER_BROKEN % string.join(exc_list, ""))
 
-    if cfg().checkReturnValues :
-        _checkReturnWarnings(code)
-
-    if cfg().localVariablesUsed :
-        for var, line in code.unusedLocals.items() :
-            if line is not None and line > 0 and _name_unused(var) :
-                code.addWarning(msgs.UNUSED_LOCAL % var, line)
-
-    if cfg().argumentsUsed :
-        op = code.getFirstOp()
-        if not (OP.RAISE_VARARGS(op) or OP.RETURN_VALUE(op)) :
-            for var, line in code.unusedLocals.items() :
-                _checkUnusedParam(var, line, func, code)
-
-    # Check code complexity:
-    #   loops should be counted as one branch, but there are typically 3
-    #   branches in byte code to setup a loop, so subtract off 2/3's of them
-    #    / 2 to approximate real branches
-    branches = (len(code.branches.keys()) - (2 * code.loops)) / 2
-    lines = (code.getLineNum() - code.func_code.co_firstlineno)
-    returns = len(code.returnValues)
-    if not main and not in_class :
-        args = code.func_code.co_argcount
-        localCount = len(code.func_code.co_varnames) - args
-        _checkComplex(code, cfg().maxArgs, args, func, msgs.TOO_MANY_ARGS)
-        _checkComplex(code, cfg().maxLocals, localCount, func,
-            msgs.TOO_MANY_LOCALS)
-        _checkComplex(code, cfg().maxLines, lines, func, msgs.FUNC_TOO_LONG)
-    _checkComplex(code, cfg().maxReturns, returns, func, msgs.TOO_MANY_RETURNS)
-    _checkComplex(code, cfg().maxBranches, branches, func,
-        msgs.TOO_MANY_BRANCHES)
+    # what was not analyzed could use, return or branch anywhere
+    if not code.truncated :
+        _checkCodeWarnings(code, func, main, in_class)
 
     if not (main or in_class) :
         utils.popConfig()
@@ -525,7 +560,28 @@ def removeWarnings(warnings, blacklist, std_lib, cfg):
     @param std_lib:   list of standard library directories
     @type  std_lib:   list of str or None
     """
-    utils.debug('filtering %d warnings with blacklist', len(warnings))
+    trace.event(trace.SUPPRESS, trace.BRIEF,
+                'filtering %d warnings with blacklist', len(warnings))
+
+    filterWarnings(warnings, blacklist, std_lib, cfg)
+    limitWarnings(warnings, cfg)
+
+    trace.event(trace.SUPPRESS, trace.BRIEF,
+                'kept %d warnings with blacklist', len(warnings))
+
+    return warnings
+
+def filterWarnings(warnings, blacklist, std_lib, cfg):
+    """
+    Remove the warnings for blacklisted files, the standard library or
+    files not given on the command line, and the warnings below the
+    requested level.
+
+    @param blacklist: list of absolute paths not to warn for
+    @type  blacklist: str
+    @param std_lib:   list of standard library directories
+    @type  std_lib:   list of str or None
+    """
 
     if std_lib is not None:
         std_lib = [normalize_path(p) for p in std_lib]
@@ -559,29 +615,54 @@ def removeWarnings(warnings, blacklist, std_lib, cfg):
         if cfg.level and warnings[index].level < cfg.level:
             del warnings[index]
 
-    if cfg.limit:
-        # sort by severity first, then normal sort (by file/line)
-        warnings.sort(lambda a, b: cmp(a.level, b.level) or cmp(a, b))
+    return warnings
 
-        # strip duplicates
-        lastWarning = None
-        for index in range(len(warnings)-1, -1, -1):
-            warning = warnings[index]
+def limitWarnings(warnings, cfg):
+    """
+    Strip duplicates and keep only the cfg.limit most severe warnings,
+    adding a warning about how many were suppressed.
 
-            # remove duplicate warnings
-            if lastWarning is not None and cmp(lastWarning, warning) == 0:
-                del warnings[index]
-            else:
-                lastWarning = warning
+    This is also used to merge warnings that were found separately,
+    for example by different worker processes.
 
-        num_ignored = len(warnings) - cfg.limit
-        if num_ignored > 0:
-            del warnings[:-cfg.limit]
-            msg = msgs.TOO_MANY_WARNINGS % num_ignored
-            warnings.append(Warning('', 0, msg))
+    @type  warnings: list of L{Warning}
+    @type  cfg:      L{pychecker.Config.Config}
+    """
+    if not cfg.limit:
+        return warnings
+
+    # sort by severity first, then normal sort (by file/line)
+    warnings.sort(lambda a, b: cmp(a.level, b.level) or cmp(a, b))
+
+    # strip duplicates
+    lastWarning = None
+    for index in range(len(warnings)-1, -1, -1):
+        warning = warnings[index]
+
+        # remove duplicate warnings
+        if lastWarning is not None and cmp(lastWarning, warning) == 0:
+            del warnings[index]
+        else:
+            lastWarning = warning
 
-    utils.debug('kept %d warnings with blacklist', len(warnings))
+    num_ignored = len(warnings) - cfg.limit
+    if num_ignored > 0:
+        del warnings[:-cfg.limit]
+        msg = msgs.TOO_MANY_WARNINGS % num_ignored
+        warnings.append(Warning('', 0, msg))
+
+    return warnings
+
+def uniqueWarnings(warnings):
+    """
+    Sort the warnings by file and line, and strip duplicates.
 
+    @type  warnings: list of L{Warning}
+    """
+    warnings.sort()
+    for index in range(len(warnings) - 1, 0, -1):
+        if cmp(warnings[index - 1], warnings[index]) == 0:
+            del warnings[index]
     return warnings
 
 
@@ -645,7 +726,7 @@ def _findFunctionWarnings(module, globalRefs, warnings, suppressions) :
     """
     for func in module.functions.values() :
         func_code = func.function.func_code
-        utils.debug("function:", func_code)
+        trace.event(trace.CHECK, trace.BRIEF, "function:", func_code)
 
         name = '%s.%s' % (module.moduleName, func.function.__name__)
         suppress = getSuppression(name, suppressions, warnings)
@@ -686,7 +767,7 @@ def _findClassWarnings(module, c, class_code,
                        that have been used ?
     @type  globalRefs: dict of str -> str
     """
-    utils.debug("class:", class_code)
+    trace.event(trace.CHECK, trace.BRIEF, "class:", class_code)
     try:
         className = utils.safestr(c.classObject)
     except TypeError:
@@ -715,7 +796,8 @@ def _findClassWarnings(module, c, class_code,
         if method == None :
             continue
         func_code = method.function.func_code
-        utils.debug("class %s: method:" % className, func_code)
+        trace.event(trace.CHECK, trace.BRIEF, "class %s: method: %r",
+                    className, func_code)
 
         try:
             name = utils.safestr(c.classObject) + '.' + method.function.func_name
@@ -829,6 +911,106 @@ def _findClassWarnings(module, c, class_code,
         utils.popConfig()
 
 
+def _findModuleWarnings(module, suppressions, warnings):
+    """
+    Add the warnings found in the given module to warnings.
+
+    @type  module:   L{pychecker.checker.PyCheckerModule}
+    @type  warnings: list of L{Warning}
+    """
+    global _deadline, _expired, _truncated
+    if module.moduleName in cfg().blacklist :
+        return
+
+    _deadline = None
+    if cfg().maxModuleSeconds :
+        _deadline = time.time() + cfg().maxModuleSeconds
+    _expired = _truncated = 0
+
+    modSuppress = getSuppression(module.moduleName, suppressions, warnings)
+    globalRefs, classCodes = {}, {}
+
+    # mainCode can be null if there was a syntax error
+    if module.mainCode != None :
+        trace.event(trace.CHECK, trace.BRIEF, "module:", module)
+        before = len(warnings)
+        funcInfo = _updateFunctionWarnings(module, module.mainCode,
+                                           None, warnings, globalRefs, 1)
+
+        if before != len(warnings):
+            trace.event(trace.CHECK, trace.BRIEF,
+            "module: %r __main__ triggered %d warnings", module,
+                len(warnings) - before)
+
+        for code in funcInfo[1] :
+            classCodes[code.co_name] = code
+
+    before = len(warnings)
+    _findFunctionWarnings(module, globalRefs, warnings, suppressions)
+    if before != len(warnings):
+        trace.event(trace.CHECK, trace.BRIEF,
+            "module: %r functions triggered %d warnings", module,
+            len(warnings) - before)
+
+    before = len(warnings)
+    for c in module.classes.values():
+        _findClassWarnings(module, c, classCodes.get(c.name),
+                           globalRefs, warnings, suppressions)
+    if before != len(warnings):
+        trace.event(trace.CHECK, trace.BRIEF,
+            "module: %r classes triggered %d warnings", module,
+            len(warnings) - before)
+
+    if cfg().noDocModule and \
+       module.module != None and module.module.__doc__ == None:
+        warnings.append(Warning(module.filename(), 1, msgs.NO_MODULE_DOC))
+        trace.event(trace.CHECK, trace.BRIEF,
+            "module: %r module doc triggered 1 warning", module)
+
+    # the code not analyzed could use any of them
+    if _truncated:
+        trace.event(trace.CHECK, trace.BRIEF,
+            "module: %r analysis truncated, not looking for unused "
+            "variables and imports", module)
+
+    before = len(warnings)
+    if not _truncated and \
+       (cfg().allVariablesUsed or cfg().privateVariableUsed):
+        prefix = None
+        if not cfg().allVariablesUsed:
+            prefix = "_"
+        for ignoreVar in cfg().variablesToIgnore + cfg().unusedNames:
+            globalRefs[ignoreVar] = ignoreVar
+        warnings.extend(_getUnused(module, globalRefs, module.variables,
+                                   msgs.VAR_NOT_USED, prefix))
+    if before != len(warnings):
+        trace.event(trace.CHECK, trace.BRIEF,
+            "module: %r unused variables triggered %d warnings",
+            module, len(warnings) - before)
+
+    before = len(warnings)
+    if not _truncated and cfg().importUsed:
+        if module.moduleName != utils.INIT or cfg().packageImportUsed:
+            # always ignore readline module, if [raw_]input() is used
+            if globalRefs.has_key('input') or \
+               globalRefs.has_key('raw_input'):
+                globalRefs['readline'] = 0
+            warnings.extend(_getUnused(module, globalRefs, module.modules,
+                                       msgs.IMPORT_NOT_USED))
+    if before != len(warnings):
+        trace.event(trace.CHECK, trace.BRIEF,
+            "module: %r unused imports triggered %d warnings",
+            module, len(warnings) - before)
+
+    # we have to do this here, b/c checkFunction doesn't popConfig for
+    # classes this allows us to have __pychecker__ apply to all methods
+    # when defined at class scope
+    if module.mainCode != None:
+        utils.popConfig()
+    if modSuppress is not None:
+        utils.popConfig()
+    _deadline = None
+
 def find(moduleList, initialCfg, suppressions=None):
     "Return a list of warnings found in the module list"
 
@@ -836,93 +1018,73 @@ def find(moduleList, initialCfg, suppressions=None):
         suppressions = {}, {}
 
     utils.initConfig(initialCfg)
-    utils.debug('Finding warnings in %d modules' % len(moduleList))
+    trace.event(trace.CHECK, trace.BRIEF, 'Finding warnings in %d modules',
+                len(moduleList))
 
     warnings = []
-    before = 0
-
+    start = time.time()
+    progress.analyzingModules(len(moduleList))
     for module in moduleList :
-        if module.moduleName in cfg().blacklist :
-            continue
-
-        modSuppress = getSuppression(module.moduleName, suppressions, warnings)
-        globalRefs, classCodes = {}, {}
-
-        # mainCode can be null if there was a syntax error
-        if module.mainCode != None :
-            utils.debug("module:", module)
-            before = len(warnings)
-            funcInfo = _updateFunctionWarnings(module, module.mainCode,
-                                               None, warnings, globalRefs, 1)
-
-            if before != len(warnings):
-                utils.debug("module: %r __main__ triggered %d warnings", module,
-                    len(warnings) - before)
-
-            for code in funcInfo[1] :
-                classCodes[code.co_name] = code
-
+        progress.analyzing(module.moduleName)
         before = len(warnings)
-        _findFunctionWarnings(module, globalRefs, warnings, suppressions)
-        if before != len(warnings):
-            utils.debug("module: %r functions triggered %d warnings", module,
-                len(warnings) - before)
+        _findModuleWarnings(module, suppressions, warnings)
+        progress.analyzed(len(warnings) - before)
+    metrics.add('analysis_seconds_total', time.time() - start)
+    metrics.add('modules_checked_total', len(moduleList))
 
-        before = len(warnings)
-        for c in module.classes.values():
-            _findClassWarnings(module, c, classCodes.get(c.name),
-                               globalRefs, warnings, suppressions)
-        if before != len(warnings):
-            utils.debug("module: %r classes triggered %d warnings", module,
-                len(warnings) - before)
+    std_lib = None
+    if cfg().ignoreStandardLibrary:
+        std_lib = getStandardLibraries()
 
-        if cfg().noDocModule and \
-           module.module != None and module.module.__doc__ == None:
-            warnings.append(Warning(module.filename(), 1, msgs.NO_MODULE_DOC))
-            utils.debug("module: %r module doc triggered 1 warning")
+    ret = removeWarnings(warnings, getBlackList(cfg().blacklist), std_lib,
+                          cfg())
+    trace.event(trace.CHECK, trace.BRIEF, 'Found %d warnings in %d modules',
+                len(ret), len(moduleList))
+    return ret
 
-        before = len(warnings)
-        if cfg().allVariablesUsed or cfg().privateVariableUsed:
-            prefix = None
-            if not cfg().allVariablesUsed:
-                prefix = "_"
-            for ignoreVar in cfg().variablesToIgnore + cfg().unusedNames:
-                globalRefs[ignoreVar] = ignoreVar
-            warnings.extend(_getUnused(module, globalRefs, module.variables,
-                                       msgs.VAR_NOT_USED, prefix))
-        if before != len(warnings):
-            utils.debug("module: %r unused variables triggered %d warnings",
-                module, len(warnings) - before)
+def iterFind(moduleList, initialCfg, suppressions=None):
+    """
+    Generate the warnings found in each module of the module list, as soon
+    as the module is analyzed.
 
-        before = len(warnings)
-        if cfg().importUsed:
-            if module.moduleName != utils.INIT or cfg().packageImportUsed:
-                # always ignore readline module, if [raw_]input() is used
-                if globalRefs.has_key('input') or \
-                   globalRefs.has_key('raw_input'):
-                    globalRefs['readline'] = 0
-                warnings.extend(_getUnused(module, globalRefs, module.modules,
-                                           msgs.IMPORT_NOT_USED))
-        if before != len(warnings):
-            utils.debug("module: %r unused imports triggered %d warnings",
-                module, len(warnings) - before)
+    For each module, (module, None) is generated before it is analyzed,
+    and (module, warnings) once it is.  The warnings are filtered like
+    L{find} does, and sorted and stripped of duplicates for each module,
+    but not limited.
 
-        # we have to do this here, b/c checkFunction doesn't popConfig for
-        # classes this allows us to have __pychecker__ apply to all methods
-        # when defined at class scope
-        if module.mainCode != None:
-            utils.popConfig()
-        if modSuppress is not None:
-            utils.popConfig()
+    @type  moduleList: list of L{pychecker.checker.PyCheckerModule}
+    @type  initialCfg: L{pychecker.Config.Config}
 
+    @rtype: generator of (L{pychecker.checker.PyCheckerModule},
+                          list of L{Warning} or None)
+    """
+    if suppressions is None :
+        suppressions = {}, {}
+
+    utils.initConfig(initialCfg)
+    blacklist = getBlackList(cfg().blacklist)
     std_lib = None
     if cfg().ignoreStandardLibrary:
         std_lib = getStandardLibraries()
+    utils.popConfig()
 
-    ret = removeWarnings(warnings, getBlackList(cfg().blacklist), std_lib,
-                          cfg())
-    utils.debug('Found %d warnings in %d modules' % (len(ret), len(moduleList)))
-    return ret
+    progress.analyzingModules(len(moduleList))
+    for module in moduleList :
+        yield module, None
+
+        # only keep our config pushed while analyzing, not while the
+        # caller handles the warnings
+        utils.initConfig(initialCfg)
+        progress.analyzing(module.moduleName)
+        start = time.time()
+        warnings = []
+        _findModuleWarnings(module, suppressions, warnings)
+        metrics.add('analysis_seconds_total', time.time() - start)
+        metrics.add('modules_checked_total')
+        progress.analyzed(len(warnings))
+        filterWarnings(warnings, blacklist, std_lib, cfg())
+        utils.popConfig()
+        yield module, uniqueWarnings(warnings)
 
 
 if 0:
@@ -0,0 +1,187 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+"""
+Keep checking files as they change.
+
+After checking all files once, the files and the modules they import
+are watched for changes.  When one changes, only the files that are
+affected by the change are checked again: the changed file itself and
+the files importing it, directly or not.
+
+Changes are found by polling the modification times, or by waiting for
+inotify events if pyinotify is available.
+"""
+
+import os
+import sys
+import time
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+from pychecker import utils
+from pychecker import pcmodules
+
+# seconds between polls for changes
+POLL_INTERVAL = 1.0
+
+
+class Watcher:
+    """
+    Check files, and check them again when they or their imports change.
+
+    @ivar files:    the files to check
+    @type files:    list of str
+    @ivar warnings: the current warnings for each file
+    @type warnings: dict of str -> list of L{pychecker.Warning.Warning}
+    """
+
+    def __init__(self, files, cfg, suppressions=None, stream=None):
+        """
+        @type  files:  list of str
+        @type  cfg:    L{pychecker.Config.Config}
+        @param stream: where to print warnings to, defaults to stdout
+        """
+        self.files = files
+        self.cfg = cfg
+        self.suppressions = suppressions
+        self.stream = stream or sys.stdout
+        self.warnings = {}
+
+        self._moduleTimes = pcmodules.ModuleTimes()
+        # file -> mtime, for files that could not be loaded
+        self._fileTimes = {}
+
+    def _mtime(self, filename):
+        try:
+            return os.stat(filename).st_mtime
+        except OSError:
+            return None
+
+    def _getPCModule(self, filename):
+        from pychecker import check
+        for moduleName, moduleDir in check.getModules([filename]):
+            return pcmodules.getPCModule(moduleName, moduleDir)
+        return None
+
+    def check(self, files, printProcessing=False):
+        """
+        Check the given files, and record their warnings.
+
+        @type files: list of str
+        """
+        from pychecker import check
+
+        for filename in files:
+            self._fileTimes[filename] = self._mtime(filename)
+            self.warnings[filename] = check._check([filename], self.cfg,
+                self.suppressions, printProcessing)
+        self._moduleTimes.update()
+
+    def changed(self):
+        """
+        Return the files that need to be checked again, because they or
+        one of the modules they import changed.
+
+        @rtype: list of str
+        """
+        checked = [(filename, self._getPCModule(filename))
+                   for filename in self.files]
+
+        stale = {}
+        for pcmodule in self._moduleTimes.invalidate():
+            stale[id(pcmodule)] = 1
+
+        changed = []
+        for filename, pcmodule in checked:
+            if stale.has_key(id(pcmodule)):
+                changed.append(filename)
+            elif self._fileTimes.get(filename) != self._mtime(filename):
+                # files that could not be loaded are not in ModuleTimes
+                if pcmodule is not None:
+                    pcmodules.removePCModule(pcmodule)
+                changed.append(filename)
+        return changed
+
+    def printWarnings(self, files=None):
+        """
+        Print the current warnings for the given files, or for all files.
+        """
+        from pychecker import check
+        from pychecker import warn
+
+        if files is None:
+            files = self.files
+        warnings = []
+        for filename in files:
+            warnings.extend(self.warnings.get(filename, []))
+        warnings = warn.limitWarnings(warnings, self.cfg)
+
+        if not self.cfg.quiet:
+            self.stream.write("\nWarnings...\n\n")
+        if warnings:
+            check._outputWarnings(warnings, self.cfg, self.stream)
+        elif not self.cfg.quiet:
+            self.stream.write("None\n")
+        self.stream.flush()
+
+    def _waitForChange(self, timeout):
+        """
+        Wait until something might have changed.
+        """
+        if pyinotify is None:
+            time.sleep(timeout)
+            return
+
+        if not hasattr(self, '_notifier'):
+            manager = pyinotify.WatchManager()
+            self._notifier = pyinotify.Notifier(manager,
+                pyinotify.ProcessEvent(), timeout=int(timeout * 1000))
+            self._watchedDirs = {}
+            self._manager = manager
+        mask = pyinotify.IN_MODIFY | pyinotify.IN_CLOSE_WRITE | \
+               pyinotify.IN_MOVED_TO | pyinotify.IN_CREATE | \
+               pyinotify.IN_DELETE
+        for pcmodule, path, mtime in self._moduleTimes.times.values():
+            directory = os.path.dirname(path)
+            if not self._watchedDirs.has_key(directory):
+                self._watchedDirs[directory] = 1
+                self._manager.add_watch(directory, mask)
+        if self._notifier.check_events():
+            self._notifier.read_events()
+            self._notifier.process_events()
+
+    def run(self, interval=POLL_INTERVAL):
+        """
+        Check all files, then keep checking changed files until
+        interrupted.
+        """
+        self.check(self.files, printProcessing=True)
+        self.printWarnings()
+        while 1:
+            self._waitForChange(interval)
+            changed = self.changed()
+            if not changed:
+                continue
+            utils.debug('watch: checking %d changed files', len(changed))
+            if not self.cfg.quiet:
+                self.stream.write("\nChanged: %s\n" % ", ".join(changed))
+            self.check(changed)
+            self.printWarnings(changed)
+
+
+def watch(files, cfg, suppressions=None):
+    """
+    Check the given files, and keep checking them as they change, until
+    interrupted.
+
+    @type files: list of str
+    @type cfg:   L{pychecker.Config.Config}
+    """
+    try:
+        Watcher(files, cfg, suppressions).run()
+    except KeyboardInterrupt:
+        pass
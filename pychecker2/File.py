@@ -3,8 +3,10 @@ from pychecker2.util import parents
 from compiler import ast
 
 class File:
-    def __init__(self, name):
+    def __init__(self, name, source=None):
         self.name = name
+        # the text to check instead of the contents of the file
+        self.source = source
         self.parseTree = None
         self.scopes = {}
         self.root_scope = None
@@ -3,7 +3,7 @@ from pychecker2.Warning import Warning
 from pychecker2.Options import BoolOpt
 from pychecker2 import symbols
 
-from compiler import parseFile, walk
+from compiler import parse, parseFile, walk
 import parser
 
 def _parent_link(node):
@@ -25,12 +25,18 @@ class ParseCheck(Check):
     
     def check(self, file, unused_checker):
         try:
-            file.parseTree = parseFile(file.name)
+            if file.source is None:
+                file.parseTree = parseFile(file.name)
+            else:
+                # parseFile adds a newline too
+                file.parseTree = parse(file.source + "\n")
             # link each node to it's parent
             _parent_link(file.parseTree)
             file.parseTree.parent = None
         except parser.ParserError, detail:
             file.warning(1, self.syntaxErrors, detail.args[0])
+        except SyntaxError, detail:
+            file.warning(detail.lineno or 1, self.syntaxErrors, detail.msg)
         except IOError, detail:
             file.warning(0, self.syntaxErrors, detail.strerror)
         if not file.parseTree:
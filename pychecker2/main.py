@@ -3,6 +3,7 @@ from os.path import dirname, realpath
 sys.path.append(dirname(dirname(realpath(sys.argv[0]))))
 
 from pychecker2.Check import CheckList
+from pychecker2.File import File
 
 from pychecker2 import Options
 from pychecker2 import ParseChecks
@@ -63,6 +64,23 @@ def create_checklist(options):
         checker.get_options(options)
     return CheckList(checks)
 
+def check_sources(sources, options=None):
+    """Check the given (filename, text) pairs without reading the files,
+    and return the checked File objects, holding the warnings"""
+    if options is None:
+        options = Options.Options()
+    checker = create_checklist(options)
+    files = []
+    for name, text in sources:
+        f = File(name, text)
+        checker.check_file(f)
+        files.append(f)
+    return files
+
+def check_source(text, filename, options=None):
+    "Check text as the contents of filename, and return the checked File"
+    return check_sources([(filename, text)], options)[0]
+
 def main():
     import cPickle
     
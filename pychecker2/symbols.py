@@ -10,7 +10,12 @@
 """Module symbol-table generator"""
 
 from compiler import ast
-from compiler.consts import SC_LOCAL, SC_GLOBAL, SC_FREE, SC_CELL, SC_UNKNOWN
+from compiler.consts import SC_LOCAL, SC_FREE, SC_CELL, SC_UNKNOWN
+try:
+    from compiler.consts import SC_GLOBAL
+except ImportError:
+    # Python 2.7 tells implicit and explicit globals apart
+    from compiler.consts import SC_GLOBAL_IMPLICIT as SC_GLOBAL
 from compiler.misc import mangle
 import types
 
@@ -6,7 +6,7 @@ from pychecker2.File import File
 class UnknownTestCase(TestSupport.WarningTester):
     def testParseError(self):
         self.warning('===\n', 1, ParseChecks.ParseCheck.syntaxErrors,
-                     'could not parse string')
+                     'invalid syntax')
         f = File('no-such-file')
         self.checklist.check_file(f)
         self.warning_file(f, 0, ParseChecks.ParseCheck.syntaxErrors,
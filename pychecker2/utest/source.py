@@ -0,0 +1,19 @@
+from pychecker2 import TestSupport
+from pychecker2 import ParseChecks
+from pychecker2 import VariableChecks
+from pychecker2 import main
+
+class SourceTestCase(TestSupport.WarningTester):
+    def testCheckSource(self):
+        # the file does not need to exist
+        f = main.check_source('def f(): print a', 'no-such-file.py')
+        self.assertEqual(f.name, 'no-such-file.py')
+        self.warning_file(f, 1, VariableChecks.UnknownCheck.unknown, 'a')
+
+    def testCheckSources(self):
+        files = main.check_sources([('good.py', 'def f(): return 1\n'),
+                                    ('bad.py', '===\n')])
+        self.assertEqual([f.name for f in files], ['good.py', 'bad.py'])
+        self.assertEqual(files[0].warnings, [])
+        self.warning_file(files[1], 1, ParseChecks.ParseCheck.syntaxErrors,
+                          'invalid syntax')
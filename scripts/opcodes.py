@@ -1,13 +1,102 @@
 # -*- Mode: Python -*-
 # vi:si:et:sw=4:sts=4:ts=4
 
+"""
+Generate the opcode tables of the running Python for pychecker.OP.
+
+Run this from the main directory as
+  python scripts/opcodes.py
+to write pychecker/opcodes<major><minor>.py, or as
+  python scripts/opcodes.py --list
+to print the opcodes by number, like the files in doc/opcodes.
+
+No constant is written per opcode.  Which opcodes exist changes between
+versions (SET_LINENO, FOR_LOOP, JUMP_IF_FALSE and POP_JUMP_IF_FALSE), so
+pychecker.OP would still have to look every one of them up by name, and
+versions without generated tables only have dis.opmap anyway.  OP does
+these lookups once at import; checking code only indexes lists and
+dicts with the opcode numbers.
+"""
+
+import os
+import sys
 import dis
 
-res = []
+# the lists of opcodes taking a given kind of argument
+_KINDS = ('hasname', 'haslocal', 'hasconst', 'hascompare', 'hasfree',
+          'hasjrel', 'hasjabs')
+
+_HEADER = '''# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+# Generated by scripts/opcodes.py from Python %(version)s, do not edit.
+
+"""
+Opcode tables for Python %(majorMinor)s.
+"""
+
+HAVE_ARGUMENT = %(HAVE_ARGUMENT)d
+EXTENDED_ARG = %(EXTENDED_ARG)d
+
+# comparison operators, indexed by the argument of COMPARE_OP
+cmp_op = %(cmp_op)r
+
+# name -> opcode
+opmap = {
+'''
+
+_KINDS_COMMENT = '''
+# opcodes whose argument is an index into co_names, co_varnames,
+# co_consts, cmp_op or the cells, or is a relative or absolute jump target
+'''
+
+def _byNumber():
+    res = []
+    for name, number in dis.opmap.items():
+        res.append((number, name))
+    res.sort()
+    return res
+
+def _listing():
+    lines = []
+    for number, name in _byNumber():
+        lines.append("%4d %s" % (number, name))
+    return '\n'.join(lines) + '\n'
+
+def _tables():
+    version = sys.version.split()[0]
+    lines = [_HEADER % {
+        'version': version,
+        'majorMinor': '%d.%d' % sys.version_info[:2],
+        'HAVE_ARGUMENT': dis.HAVE_ARGUMENT,
+        'EXTENDED_ARG': dis.EXTENDED_ARG,
+        'cmp_op': tuple(dis.cmp_op),
+        }]
+    for number, name in _byNumber():
+        lines.append("    %r: %d,\n" % (name, number))
+    lines.append('}\n')
+
+    lines.append(_KINDS_COMMENT)
+    for kind in _KINDS:
+        ops = list(getattr(dis, kind, []))
+        ops.sort()
+        lines.append('%s = %r\n' % (kind, tuple(ops)))
+    return ''.join(lines)
+
+def main(args):
+    if args[1:] == ['--list']:
+        sys.stdout.write(_listing())
+        return 0
+    if args[1:]:
+        sys.stderr.write('usage: %s [--list]\n' % args[0])
+        return 2
 
-for name, number in dis.opmap.items():
-    res.append((number, name))
+    path = os.path.join('pychecker', 'opcodes%d%d.py' % sys.version_info[:2])
+    handle = open(path, 'w')
+    handle.write(_tables())
+    handle.close()
+    print 'wrote %s' % path
+    return 0
 
-res.sort()
-for number, name in res:
-    print "%4d %s" % (number, name)
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,8 @@
+Processing module C (input/getmodule/A/C.py)...
+Processing module C (input/getmodule/B/C.py)...
+
+Warnings...
+
+input/getmodule/A/C.py:4: Imported module (time) not used
+
+input/getmodule/B/C.py:4: Imported module (os) not used
@@ -0,0 +1,24 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+import os
+
+TABLE = {
+    'a': 1,
+    'b': 2,
+    'c': 3,
+}
+
+def short():
+    return MISSING
+
+def table():
+    result = []
+    result.append(TABLE['a'])
+    result.append(TABLE['b'])
+    result.append(TABLE['c'])
+    result.append(TABLE['a'] + TABLE['b'])
+    result.append(TABLE['b'] + TABLE['c'])
+    result.append(TABLE['c'] + TABLE['a'])
+    result.append(os.sep)
+    return result
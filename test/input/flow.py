@@ -0,0 +1,92 @@
+'tests for the control flow graph'
+
+def deadAfterReturn(a):
+    'doc'
+    return a
+    print a
+
+def deadAfterRaise(a):
+    'doc'
+    if a:
+        raise ValueError(a)
+        print a
+    return 1
+
+def ifElseReturns(a):
+    'doc'
+    if a:
+        return 1
+    else:
+        return 2
+
+def tryReturns(a):
+    'doc'
+    try:
+        return a.b
+    except AttributeError:
+        return 2
+
+def tryFinally(a):
+    'doc'
+    try:
+        return a.b
+    finally:
+        print a
+
+def foreverLoop(a):
+    'doc'
+    while 1:
+        a = a + 1
+    return a
+
+def foreverBreak(a):
+    'doc'
+    while 1:
+        if a:
+            break
+        a = a + 1
+    return a
+
+def setInLoop(n):
+    'doc'
+    for i in range(n):
+        if i:
+            print last
+        last = i
+
+def setInOneBranch(a):
+    'doc'
+    if a:
+        b = 1
+    else:
+        print b
+    return a
+
+def setInTry(a):
+    'doc'
+    try:
+        b = a.c
+        a.d()
+    except AttributeError:
+        print b
+
+def branchy(a, b, c):
+    'doc'
+    if a and b:
+        return 1
+    for i in c:
+        if i:
+            continue
+        while i > 1:
+            i = i - 1
+    try:
+        c.x()
+    except (ValueError, TypeError):
+        pass
+    return a or b
+
+def returnsInDeadCode(a):
+    'doc'
+    return 1
+    return 2
+    return 3
@@ -0,0 +1,7 @@
+'''
+A module killing the process importing it, like a crashing C extension.
+'''
+
+import os
+
+os._exit(3)
@@ -0,0 +1,15 @@
+'d'
+
+def nested(a):
+    'the lambda must not reset the line count'
+    f = lambda x: x
+    a = a + 1
+    a = a + 1
+    a = a + 1
+    a = a + 1
+    a = a + 1
+    return f(a)
+
+def short(a):
+    'd'
+    return a
@@ -0,0 +1,34 @@
+'''
+A module that cannot be imported, only checked statically.
+'''
+
+import os
+from os import path as ospath
+
+VALUE = 1
+NAMES = ['a', 'b']
+
+def helper(a, b=2):
+    return a + b + VALUE
+
+class Base:
+    'base class'
+    def method(self):
+        unused = ospath.join('a', 'b')
+        return VALUE
+
+class Derived(Base):
+    'derived class'
+    def other(self):
+        return self.missing
+
+    def create(cls):
+        return cls()
+    create = classmethod(create)
+
+try:
+    import _static_noexec_missing
+except ImportError:
+    _static_noexec_missing = None
+
+raise RuntimeError('this module should never be run')
@@ -0,0 +1,55 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for stopping the analysis of functions and modules that take too long.
+'''
+
+import os
+import unittest
+import common
+
+from pychecker import check
+from pychecker import warn
+from pychecker import Config
+
+class BudgetTestCase(common.TestCase):
+    def test_budget(self):
+        self.check('budget')
+
+    def test_max_instructions(self):
+        self.check('budget', '--maxinstructions 30')
+
+class _Clock:
+    """
+    A clock that moves a minute each time it is looked at.
+    """
+    def __init__(self):
+        self.now = 0
+
+    def time(self):
+        self.now += 60
+        return self.now
+
+class ModuleSecondsTestCase(common.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        self.time = warn.time
+        warn.time = _Clock()
+
+    def tearDown(self):
+        warn.time = self.time
+        os.chdir(self.cwd)
+
+    def test_max_module_seconds(self):
+        config = Config.Config()
+        config.maxModuleSeconds = 30
+        warnings = check._check(['input/budget.py'], config)
+        self.assertEquals([warning.format() for warning in warnings], [
+            'input/budget.py:4: Analysis truncated -- module (budget) took '
+            'more than 30 seconds, use --maxmoduleseconds to change the '
+            'limit'])
+
+if __name__ == '__main__':
+    unittest.main()
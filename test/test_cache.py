@@ -0,0 +1,234 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for the cache of warnings between runs.
+'''
+
+import os
+import shutil
+import socket
+import cPickle
+import tempfile
+import unittest
+import threading
+import BaseHTTPServer
+import common
+
+from pychecker import cache
+from pychecker import Config
+
+_MAIN = '''
+import cachedep
+
+def main():
+    value = cachedep.VALUE
+'''
+
+_DEP = '''
+VALUE = 1
+'''
+
+class FingerprintTestCase(common.TestCase):
+    def test_same(self):
+        self.assertEquals(cache.fingerprint(Config.Config()),
+            cache.fingerprint(Config.Config()))
+
+    def test_option(self):
+        config = Config.Config()
+        config.unreachableCode = 1
+        self.assertNotEquals(cache.fingerprint(Config.Config()),
+            cache.fingerprint(config))
+
+    def test_ignored(self):
+        config = Config.Config()
+        config.limit = 3
+        config.jobs = 4
+        self.assertEquals(cache.fingerprint(Config.Config()),
+            cache.fingerprint(config))
+
+    def test_suppressions(self):
+        suppressions = ({'cachemain': 'no-local'}, {})
+        self.assertNotEquals(cache.fingerprint(Config.Config()),
+            cache.fingerprint(Config.Config(), suppressions))
+
+class ResultCacheTestCase(common.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cacheDir = os.path.join(self.tmpdir, 'cache')
+        self.main = self._write('cachemain.py', _MAIN)
+        self.dep = self._write('cachedep.py', _DEP)
+
+        self.config = Config.Config()
+        self.config.quiet = 1
+        self.config.cacheDir = self.cacheDir
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, source):
+        path = os.path.join(self.tmpdir, name)
+        handle = open(path, 'w')
+        handle.write(source)
+        handle.close()
+        return path
+
+    def _resultCache(self):
+        return cache.ResultCache(self.cacheDir,
+            cache.fingerprint(self.config))
+
+    def test_cache(self):
+        resultCache = self._resultCache()
+        self.assertEquals(resultCache.lookup(self.main), None)
+
+        warnings = cache.checkFiles([self.main], self.config)
+        self.assertEquals(len(warnings), 1)
+        self.assertEquals(len(os.listdir(self.cacheDir)), 1)
+
+        cached = resultCache.lookup(self.main)
+        self.assertEquals([w.format() for w in cached],
+            [w.format() for w in warnings])
+        self.assertEquals(resultCache.hits, 1)
+
+        # changing the source of an import invalidates the entry
+        self._write('cachedep.py', _DEP + 'OTHER = 2\n')
+        self.assertEquals(resultCache.lookup(self.main), None)
+
+        # so does changing the configuration
+        self._write('cachedep.py', _DEP)
+        self.failUnless(resultCache.lookup(self.main))
+        self.config.unusedLocalTuple = 1
+        self.assertEquals(self._resultCache().lookup(self.main), None)
+
+    def test_record(self):
+        warnings = cache.checkFiles([self.main], self.config)
+        cached = self._resultCache().lookup(self.main)
+        self.assertEquals([w.record() for w in cached],
+            [w.record() for w in warnings])
+
+    def test_pickle(self):
+        # only plain data is read from the cache, never a pickle
+        resultCache = self._resultCache()
+        cache.checkFiles([self.main], self.config)
+        key = os.listdir(self.cacheDir)[0]
+        entry = {'dependencies': [], 'warnings': []}
+        resultCache.backend.put(key, cPickle.dumps(entry))
+        self.assertEquals(resultCache.lookup(self.main), None)
+
+class _CacheServer(BaseHTTPServer.HTTPServer):
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           _CacheRequestHandler)
+        self.entries = {}
+
+class _CacheRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        data = self.server.entries.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self):
+        length = int(self.headers['Content-Length'])
+        self.server.entries[self.path] = self.rfile.read(length)
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class SharedCacheTestCase(common.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        self.config = Config.Config()
+        self.config.quiet = 1
+
+        self.server = _CacheServer()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.setDaemon(1)
+        self.thread.start()
+        self.url = 'http://%s:%d/cache/' % self.server.server_address
+
+    def tearDown(self):
+        self._stopServer()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def _stopServer(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _checkout(self, name):
+        # the same sources in another place; not the modules of the
+        # other tests, which stay loaded
+        path = os.path.join(self.tmpdir, name)
+        os.mkdir(path)
+        for source, filename in ((_MAIN, 'sharedmain.py'),
+                                 (_DEP, 'shareddep.py')):
+            handle = open(os.path.join(path, filename), 'w')
+            handle.write(source.replace('cachedep', 'shareddep'))
+            handle.close()
+        os.chdir(path)
+
+    def _shared(self, location):
+        self.config.cacheDir = location
+        self._checkout('first')
+        warnings = cache.checkFiles(['sharedmain.py'], self.config)
+        self.assertEquals(len(warnings), 1)
+
+        self._checkout('second')
+        resultCache = cache.ResultCache(location,
+            cache.fingerprint(self.config))
+        cached = resultCache.lookup('sharedmain.py')
+        self.assertEquals([w.format() for w in cached],
+            [w.format() for w in warnings])
+
+        # the imports are looked at in the new place
+        handle = open('shareddep.py', 'a')
+        handle.write('OTHER = 2\n')
+        handle.close()
+        self.assertEquals(resultCache.lookup('sharedmain.py'), None)
+
+    def test_directory(self):
+        self._shared(os.path.join(self.tmpdir, 'cache'))
+
+    def test_http(self):
+        self._shared(self.url)
+        self.assertEquals(len(self.server.entries), 1)
+        self.failUnless(self.server.entries.keys()[0].startswith('/cache/'))
+
+    def test_http_down(self):
+        self._stopServer()
+        backend = cache.getBackend(self.url)
+        self.assertEquals(backend.get('missing'), None)
+        backend.put('missing', 'data')
+
+    def test_http_broken(self):
+        # a server that closes the connection without answering
+        self._stopServer()
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(5)
+        def close():
+            for i in range(2):
+                listener.accept()[0].close()
+        thread = threading.Thread(target=close)
+        thread.setDaemon(1)
+        thread.start()
+
+        backend = cache.getBackend('http://%s:%d/' % listener.getsockname())
+        self.assertEquals(backend.get('missing'), None)
+        backend.put('missing', 'data')
+        thread.join()
+        listener.close()
+
+if __name__ == '__main__':
+    unittest.main()
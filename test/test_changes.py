@@ -0,0 +1,92 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for checking only the files affected by changes since a revision.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import common
+
+from pychecker import changes
+from pychecker import check
+from pychecker import utils
+from pychecker import Config
+
+class ChangesTestCase(common.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+
+        self._write('chbase.py', 'def f():\n    return 1\n')
+        self._write('chuser.py', 'import chbase\n\nvalue = chbase.f()\n')
+        self._write('chfrom.py', 'from chbase import f\n\nvalue = f()\n')
+        self._write('chindirect.py', 'import chuser\n\nvalue = chuser.value\n')
+        self._write('chother.py', 'def g():\n    return 2\n')
+        self.files = ['chbase.py', 'chfrom.py', 'chindirect.py',
+                      'chother.py', 'chuser.py']
+
+        self.config = Config.Config()
+        self.config.changedSince = 'HEAD'
+        utils.initConfig(self.config)
+
+    def tearDown(self):
+        utils.popConfig()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, source):
+        handle = open(name, 'w')
+        handle.write(source)
+        handle.close()
+
+    def _git(self, *args):
+        changes._git(['-c', 'user.name=test', '-c', 'user.email=test@test']
+                     + list(args))
+
+    def test_selectFiles(self):
+        selected = changes.selectFiles(self.files, self.config,
+            [os.path.join(self.tmpdir, 'chbase.py')])
+        self.assertEquals(selected,
+            ['chbase.py', 'chfrom.py', 'chindirect.py', 'chuser.py'])
+
+        selected = changes.selectFiles(self.files, self.config,
+            [os.path.join(self.tmpdir, 'chuser.py')])
+        self.assertEquals(selected, ['chindirect.py', 'chuser.py'])
+
+        # the files and their sibling imports do not stay loaded
+        for name in ['chbase', 'chuser', 'chfrom', 'chindirect', 'chother']:
+            self.failIf(sys.modules.has_key(name), name)
+
+    def test_changedFiles(self):
+        try:
+            self._git('init', '-q')
+        except changes.GitError:
+            # FIXME: no skip support
+            return
+        self._git('add', '.')
+        self._git('commit', '-q', '-m', 'initial')
+        self.assertEquals(changes.changedFiles('HEAD'), [])
+
+        self._write('chbase.py', 'def f():\n    return 3\n')
+        self._write('chnew.py', 'import chother\n')
+        self._write('README', 'not python\n')
+        realdir = os.path.realpath(self.tmpdir)
+        self.assertEquals(changes.changedFiles('HEAD'), [
+            os.path.join(realdir, 'chbase.py'),
+            os.path.join(realdir, 'chnew.py')])
+
+        files = list(check.findFiles(['.'], self.config))
+        self.assertEquals(changes.selectFiles(files, self.config), [
+            './chbase.py', './chfrom.py', './chindirect.py', './chnew.py',
+            './chuser.py'])
+
+        self.assertRaises(changes.GitError, changes.changedFiles, 'nosuchrev')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for checking files on workers connecting to a coordinator.
+'''
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import threading
+import subprocess
+import common
+
+from multiprocessing import connection
+
+from pychecker import check
+from pychecker import distributed
+from pychecker import Config
+
+_FILES = [
+    'input/unused_import.py',
+    'input/test_global.py',
+    'input/nested.py',
+    'input/getmodule/A/C.py',
+    'input/getmodule/B/C.py',
+    'input/starimport.py',
+    'input/test_slice.py',
+    'input/test_dict.py',
+]
+
+class DistributedTestCase(common.TestCase):
+    def setUp(self):
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.checker = os.path.join(os.path.dirname(self.testdir),
+                                    'pychecker', 'checker.py')
+        self.cwd = os.getcwd()
+        os.chdir(self.testdir)
+        self.files = _FILES
+        self.config = Config.Config()
+        self.config.limit = 0
+        # workers print what they check as told by the coordinator
+        self.config.quiet = 1
+        self.coordinator = distributed.Coordinator(('127.0.0.1', 0),
+                                                   self.config,
+                                                   authkey='secret')
+        self.workers = []
+
+    def tearDown(self):
+        self.coordinator.close()
+        for worker in self.workers:
+            worker.wait()
+        os.chdir(self.cwd)
+
+    def _startWorker(self, cwd=None):
+        env = os.environ.copy()
+        env['PYCHECKER_AUTHKEY'] = 'secret'
+        env['PYTHONPATH'] = os.path.dirname(self.testdir)
+        worker = subprocess.Popen([sys.executable, self.checker, '-Q',
+            '--worker', '%s:%d' % self.coordinator.address],
+            env=env, cwd=cwd or self.testdir, close_fds=True)
+        self.workers.append(worker)
+
+    def _assertWarnings(self, warnings, args=[]):
+        # checked in a process of its own, like the workers do
+        output = subprocess.Popen([sys.executable, self.checker, '-Q',
+            '--limit', '0', '--format', 'jsonl'] + args + self.files,
+            cwd=self.testdir, stdout=subprocess.PIPE).communicate()[0]
+        expected = ['%(file)s:%(line)d' % json.loads(line)
+                    for line in output.splitlines()]
+        expected.sort()
+        found = ['%s:%d' % (warning.file, warning.line)
+                 for warning in warnings]
+        found.sort()
+        self.assertEquals(found, expected)
+
+    def test_workers(self):
+        for _ in range(3):
+            self._startWorker()
+        self._assertWarnings(self.coordinator.checkFiles(self.files))
+        for worker in self.workers:
+            self.assertEquals(worker.wait(), 0)
+
+    def test_lost_worker(self):
+        result = []
+        thread = threading.Thread(target=lambda:
+            result.append(self.coordinator.checkFiles(self.files)))
+        thread.start()
+
+        # a worker going away with a batch leaves it to the others
+        lost = connection.Client(self.coordinator.address, authkey='secret')
+        self.assertEquals(lost.recv()[0], distributed._CONFIG)
+        message, files = lost.recv()
+        self.assertEquals(message, distributed._BATCH)
+        self.failUnless(files)
+        self._startWorker()
+        lost.close()
+        thread.join()
+
+        self._assertWarnings(result[0])
+
+    def test_lost_workers(self):
+        # every worker checking killself.py exits; it is given up on
+        # once it took a few of them, and the others are still checked
+        self.files = _FILES + ['input/killself.py']
+        for _ in range(distributed._MAX_LOST + 1):
+            self._startWorker()
+        warnings = self.coordinator.checkFiles(self.files)
+        lost = [warning for warning in warnings
+                if warning.file == 'input/killself.py']
+        self.assertEquals(len(lost), 1)
+        self.failUnless('NOT PROCESSED' in lost[0].format())
+
+        self.files = _FILES
+        self._assertWarnings([warning for warning in warnings
+                              if warning not in lost])
+        codes = [worker.wait() for worker in self.workers]
+        self.assertEquals(codes.count(3), distributed._MAX_LOST)
+
+    def test_other_root(self):
+        # a worker in a checkout somewhere else still finds the files
+        # it is given to be the ones to warn about with --only
+        self.coordinator.close()
+        self.config.only = 1
+        files = list(check.findFiles(self.files, self.config))
+        self.coordinator = distributed.Coordinator(('127.0.0.1', 0),
+                                                   self.config,
+                                                   authkey='secret')
+        root = tempfile.mkdtemp()
+        try:
+            shutil.copytree(os.path.join(self.testdir, 'input'),
+                            os.path.join(root, 'input'))
+            self._startWorker(root)
+            warnings = self.coordinator.checkFiles(files)
+        finally:
+            shutil.rmtree(root)
+        self.failUnless(warnings)
+        self._assertWarnings(warnings, ['--only'])
+
+    def test_checkAddress(self):
+        distributed.checkAddress(('127.0.0.1', 8123), None)
+        distributed.checkAddress(('localhost', 8123), None)
+        distributed.checkAddress(('0.0.0.0', 8123), 'secret')
+        self.assertRaises(distributed.AuthKeyRequired,
+                          distributed.checkAddress, ('0.0.0.0', 8123), None)
+        self.assertRaises(distributed.AuthKeyRequired,
+                          distributed.Coordinator, ('0.0.0.0', 0),
+                          self.config)
+
+    def test_insecure_worker(self):
+        env = os.environ.copy()
+        env.pop('PYCHECKER_AUTHKEY', None)
+        env['PYTHONPATH'] = os.path.dirname(self.testdir)
+        process = subprocess.Popen([sys.executable, self.checker,
+            '--worker', '0.0.0.0:8123'], env=env, cwd=self.testdir,
+            stderr=subprocess.PIPE)
+        error = process.communicate()[1]
+        self.assertEquals(process.returncode, 101)
+        self.failUnless('PYCHECKER_AUTHKEY' in error, error)
+
+    def test_parseAddress(self):
+        self.assertEquals(distributed.parseAddress('example.com:8123'),
+                          ('example.com', 8123))
+        self.assertEquals(distributed.parseAddress('8123'),
+                          ('127.0.0.1', 8123))
+        self.assertRaises(ValueError, distributed.parseAddress, 'host:port')
+
+if not distributed.available():
+    del DistributedTestCase
+
+if __name__ == '__main__':
+    unittest.main()
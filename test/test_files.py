@@ -0,0 +1,76 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for finding the files to check.
+'''
+
+import os
+import commands
+import unittest
+import common
+
+from pychecker import check
+from pychecker import Config
+
+class FindFilesTestCase(common.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(os.path.dirname(__file__))
+        self.config = Config.Config()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def find(self, args):
+        return list(check.findFiles(args, self.config))
+
+    def test_file(self):
+        self.assertEquals(self.find(['input/nested.py']), ['input/nested.py'])
+        self.failUnless(self.config.files.has_key(
+            os.path.abspath('input/nested.py')))
+
+    def test_directory(self):
+        self.assertEquals(self.find(['input/getmodule']), [
+            'input/getmodule/__init__.py',
+            'input/getmodule/A/C.py',
+            'input/getmodule/A/__init__.py',
+            'input/getmodule/B/C.py',
+            'input/getmodule/B/__init__.py',
+        ])
+
+    def test_exclude(self):
+        self.config.excludes = ['B', '__init__.py']
+        self.assertEquals(self.find(['input/getmodule']),
+            ['input/getmodule/A/C.py'])
+
+        self.config.excludes = ['input/getmodule/A/*']
+        self.assertEquals(self.find(['input/getmodule/A/C.py']), [])
+
+    def test_lazy(self):
+        # the first file is generated before the others are looked for
+        def args():
+            yield 'input/does_not_exist'
+            raise AssertionError('looked past the first file')
+        files = check.findFiles(args(), self.config)
+        self.assertEquals(files.next(), 'input/does_not_exist')
+        self.assertRaises(AssertionError, files.next)
+
+class DirectoryTestCase(common.TestCase):
+    def test_getmodule(self):
+        self.checkMultiple('test_getmodule', ['getmodule'],
+            '--exclude __init__.py')
+
+    def test_files_from(self):
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        checker = os.path.join(os.path.dirname(testdir), 'pychecker',
+                               'checker.py')
+        output = commands.getoutput(
+            "cd %s; printf 'input/getmodule/A/C.py\\0input/getmodule/B/C.py' | "
+            "python %s -Q --files-from -" % (testdir, checker))
+        self.assertEquals(output,
+            "input/getmodule/A/C.py:4: Imported module (time) not used\n\n"
+            "input/getmodule/B/C.py:4: Imported module (os) not used")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for checking modules as they are imported, with import pychecker.checker
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+import common
+
+_APP = '''import pychecker.checker
+import hookmod
+import hookmod
+print "app ran"
+'''
+
+_MODULE = '''import os
+
+def f():
+    return missing
+'''
+
+class ImportHookTestCase(common.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._write('hookapp.py', _APP)
+        self._write('hookmod.py', _MODULE)
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        self.env = os.environ.copy()
+        self.env['PYTHONPATH'] = os.path.dirname(testdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, source):
+        handle = open(os.path.join(self.tmpdir, name), 'w')
+        handle.write(source)
+        handle.close()
+
+    def _run(self, args):
+        self.env['PYCHECKER'] = args
+        process = subprocess.Popen([sys.executable, 'hookapp.py'],
+            cwd=self.tmpdir, env=self.env,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+        return [line for line in output.splitlines()
+                if line.find('hookmod') != -1 or line == 'app ran']
+
+    def test_inline(self):
+        self.assertEquals(self._run(''), [
+            '[system path]/hookmod.py:1: Imported module (os) not used',
+            '[system path]/hookmod.py:4: No global (missing) found',
+            'app ran'])
+
+    def test_deferred_exit(self):
+        # nothing is checked before the application is done
+        self.assertEquals(self._run('--deferred exit'), [
+            'app ran',
+            '[system path]/hookmod.py:1: Imported module (os) not used',
+            '[system path]/hookmod.py:4: No global (missing) found'])
+
+    def test_deferred_thread(self):
+        output = self._run('--deferred thread')
+        self.assertEquals(len(output), 3)
+        self.failUnless('app ran' in output)
+        self.failUnless('[system path]/hookmod.py:4: '
+                        'No global (missing) found' in output)
+
+if __name__ == '__main__':
+    unittest.main()
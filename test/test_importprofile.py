@@ -0,0 +1,105 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for profiling the imports of the modules checked.
+'''
+
+import os
+import sys
+import unittest
+import subprocess
+import StringIO
+import common
+
+from pychecker import importprofile
+
+class ProfileTestCase(common.TestCase):
+    def test_nested(self):
+        profile = importprofile.Profile()
+        profile._enter('outer', '/src')
+        profile._enter('inner', None)
+        profile._enter('cached', None)
+        # nothing was loaded, so this is not an entry
+        profile._leave('inner', None, record=0)
+        profile._leave('outer', '/src/inner.py')
+        profile._leave(None, '/src/outer.py')
+
+        outer = profile.entries['outer']
+        inner = profile.entries['inner']
+        self.failIf(profile.entries.has_key('cached'))
+        self.assertEquals(outer.calls, 1)
+        self.assertEquals(outer.importers.keys(), [importprofile.COMMAND_LINE])
+        self.assertEquals(inner.importers.keys(), ['outer'])
+        self.failUnless(outer.cumulative >= inner.cumulative)
+        self.failUnless(outer.self <= outer.cumulative - inner.cumulative
+                        + 0.001)
+        # found next to the module being checked
+        self.assertEquals(inner.sibling, 1)
+        self.assertEquals(outer.sibling, 0)
+
+        stream = StringIO.StringIO()
+        profile.report(stream)
+        lines = stream.getvalue().split('\n')
+        self.assertEquals(lines[1], 'Import profile...')
+        self.assertEquals(lines[4].split(None, 5)[3:],
+                          ['no', 'outer', importprofile.COMMAND_LINE])
+        self.assertEquals(lines[5].split(None, 5)[3:],
+                          ['yes', 'inner', 'outer'])
+
+    def test_merge(self):
+        self.assertEquals(importprofile.collect(), None)
+
+        importprofile.start()
+        try:
+            entry = importprofile.Entry('profiled')
+            entry.calls = 1
+            entry.cumulative = entry.self = 0.5
+            entry.importers['profiler'] = 1
+            importprofile.merge({'profiled': entry})
+            other = importprofile.Entry('profiled')
+            other.calls = 1
+            other.cumulative = other.self = 0.25
+            other.importers['other'] = 1
+            other.sibling = 1
+            importprofile.merge({'profiled': other})
+
+            entries = importprofile.collect()
+            self.assertEquals(importprofile.collect(), {})
+        finally:
+            importprofile.stop(StringIO.StringIO())
+
+        entry = entries['profiled']
+        self.assertEquals(entry.calls, 2)
+        self.assertEquals(entry.cumulative, 0.75)
+        self.assertEquals(entry.sibling, 1)
+        importers = entry.importers.keys()
+        importers.sort()
+        self.assertEquals(importers, ['other', 'profiler'])
+
+class ImportProfileTestCase(common.TestCase):
+    def test_report(self):
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        checker = os.path.join(os.path.dirname(testdir),
+                               'pychecker', 'checker.py')
+        process = subprocess.Popen([sys.executable, checker, '-Q',
+            '--import-profile', 'input/starimport.py'], cwd=testdir,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, errors = process.communicate()
+
+        self.failUnless('\nImport profile...\n' in errors, errors)
+        rows = {}
+        for line in errors.split('\n'):
+            fields = line.split(None, 5)
+            if len(fields) >= 6 and fields[0][0].isdigit():
+                rows[fields[4]] = fields
+        self.assertEquals(rows['starimport'][3:],
+                          ['no', 'starimport', importprofile.COMMAND_LINE])
+        # starimport gets it from its own directory
+        self.assertEquals(rows['starimportfrom'][3:],
+                          ['yes', 'starimportfrom', 'starimport'])
+        self.assertEquals(rows['gettext'][3:],
+                          ['no', 'gettext', 'starimportfrom'])
+
+if __name__ == '__main__':
+    unittest.main()
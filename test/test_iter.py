@@ -0,0 +1,65 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for generating the warnings module by module.
+'''
+
+import os
+import unittest
+import common
+
+from pychecker import check
+from pychecker import utils
+from pychecker import Config
+
+class IterWarningsTestCase(common.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        self.config = Config.Config()
+        self.files = ['input/unused_import.py', 'input/nested.py']
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_warnings(self):
+        warnings = [warning.format()
+                    for warning in check.iter_warnings(self.files,
+                                                       self.config)]
+        self.assertEquals(warnings, [
+            'input/unused_import.py:4: Imported module (sys) not used',
+            'input/unused_import.py:6: Imported module (path) not used',
+            'input/unused_import.py:8: Imported module (sax) not used',
+            'input/unused_import.py:10: Imported module (dom) not used',
+            'input/nested.py:12: Local variable (result) not used'])
+
+    def test_events(self):
+        events = []
+        for event, value in check.iter_warnings(self.files, self.config,
+                                                events=True):
+            if event == check.WARNING:
+                events.append((event, value.line))
+            else:
+                events.append((event, value.moduleName))
+        self.assertEquals(events, [
+            (check.MODULE_START, 'unused_import'),
+            (check.WARNING, 4),
+            (check.WARNING, 6),
+            (check.WARNING, 8),
+            (check.WARNING, 10),
+            (check.MODULE_END, 'unused_import'),
+            (check.MODULE_START, 'nested'),
+            (check.WARNING, 12),
+            (check.MODULE_END, 'nested')])
+
+    def test_stop(self):
+        depth = len(utils._cfg)
+        warnings = check.iter_warnings(self.files, self.config)
+        self.assertEquals(warnings.next().line, 4)
+        warnings.close()
+        # nothing is left loaded for the next files, or pushed
+        self.assertEquals(len(utils._cfg), depth)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for the JSON Lines output of warnings.
+'''
+
+import pickle
+import unittest
+import common
+
+from pychecker import msgs
+from pychecker import check
+from pychecker import Config
+from pychecker.Warning import Warning
+
+_FILES = [
+    'unused_import.py',
+    'test_global.py',
+]
+
+class RecordTestCase(common.TestCase):
+    def test_template(self):
+        err = msgs.USING_DEPRECATED_ATTR_INSTEAD % ('string.atof', 'float')
+        warning = Warning('a.py', 3, err)
+        self.assertEquals(warning.record(), {
+            'file': 'a.py',
+            'line': 3,
+            'level': msgs.Deprecated.level,
+            'class': 'Deprecated',
+            'id': 'USING_DEPRECATED_ATTR_INSTEAD',
+            'template': '%s is deprecated, consider using %s',
+            'args': ['string.atof', 'float'],
+        })
+        # the text is the same as it used to be
+        self.assertEquals(str(err),
+            'string.atof is deprecated, consider using float')
+
+    def test_noArgs(self):
+        record = Warning('a.py', 1, msgs.NO_MODULE_DOC).record()
+        self.assertEquals(record['id'], 'NO_MODULE_DOC')
+        self.assertEquals(record['class'], 'Style')
+        self.assertEquals(record['args'], [])
+
+    def test_single(self):
+        record = Warning('a.py', 1, msgs.IMPORT_NOT_USED % 'os').record()
+        self.assertEquals(record['args'], ['os'])
+
+    def test_notDefined(self):
+        record = Warning('a.py', 1, msgs.Internal('SOMETHING')).record()
+        self.assertEquals(record['id'], None)
+        self.assertEquals(record['class'], 'Internal')
+        self.assertEquals(record['template'], 'SOMETHING')
+
+    def test_formatEnd(self):
+        # the record makes the same text as the warning
+        warnings = check.check_source("def f(a):\n    return 'a %' % a\n",
+                                      'a.py', Config.Config())
+        self.assertEquals(len(warnings), 1)
+        record = warnings[0].record()
+        self.assertEquals(record['id'], 'INVALID_FORMAT_END')
+        self.assertEquals(record['template'] % tuple(record['args']),
+                          str(warnings[0].err))
+
+    def test_pickled(self):
+        warning = Warning('a.py', 1, msgs.IMPORT_NOT_USED % 'os')
+        warning = pickle.loads(pickle.dumps(warning))
+        self.assertEquals(warning.record()['id'], 'IMPORT_NOT_USED')
+
+class OutputTestCase(common.TestCase):
+    def test_jsonl(self):
+        self.checkMultiple('test_jsonl', _FILES, '--format jsonl')
+
+    def test_jsonl_stream(self):
+        self.checkMultiple('test_jsonl', _FILES,
+            '--format jsonl --stream --limit 3')
+
+if __name__ == '__main__':
+    unittest.main()
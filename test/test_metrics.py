@@ -0,0 +1,96 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for writing the metrics of a run.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+import common
+
+from pychecker import metrics
+
+_FILES = ['input/unused_import.py', 'input/nested.py']
+
+class MetricsTestCase(common.TestCase):
+    def test_collect(self):
+        metrics.add('files_checked_total')
+        self.assertEquals(metrics.collect(), None)
+
+        metrics.start()
+        try:
+            metrics.add('files_checked_total', 2)
+            metrics.add('files_checked_total')
+            values = metrics.collect()
+            self.assertEquals(values, {('files_checked_total', ()): 3})
+            self.assertEquals(metrics.collect(), {})
+
+            metrics.merge(values)
+            metrics.merge(None)
+            text = metrics.formatMetrics(metrics.collect(), 1.5)
+        finally:
+            metrics.stop(os.devnull)
+
+        self.failUnless('# TYPE pychecker_files_checked_total counter\n'
+                        'pychecker_files_checked_total 3\n' in text, text)
+        self.failUnless('pychecker_run_seconds 1.500000\n' in text, text)
+        self.failUnless('pychecker_cache_hits_total 0\n' in text, text)
+
+class MetricsFileTestCase(common.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.testdir = os.path.dirname(os.path.abspath(__file__))
+        self.checker = os.path.join(os.path.dirname(self.testdir),
+                                    'pychecker', 'checker.py')
+        self.path = os.path.join(self.tmpdir, 'pychecker.prom')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _run(self, args):
+        subprocess.Popen([sys.executable, self.checker, '-Q',
+            '--metrics-file', self.path] + args + _FILES, cwd=self.testdir,
+            stdout=subprocess.PIPE).communicate()
+        values = {}
+        for line in open(self.path).readlines():
+            if line[0] != '#':
+                name, value = line.split()
+                values[name] = float(value)
+        return values
+
+    def test_metrics_file(self):
+        values = self._run([])
+        self.assertEquals(values['pychecker_files_checked_total'], 2)
+        self.assertEquals(values['pychecker_modules_checked_total'], 2)
+        self.assertEquals(values['pychecker_warnings_total{level="unused"}'],
+                          5)
+        self.failUnless(values['pychecker_instructions_dispatched_total'])
+        self.failUnless(
+            values['pychecker_peak_rss_bytes{process="pychecker"}'])
+        self.assertEquals(os.listdir(self.tmpdir), ['pychecker.prom'])
+
+        # the workers send theirs back
+        jobs = self._run(['--jobs', '2'])
+        for name in ('pychecker_files_checked_total',
+                     'pychecker_modules_checked_total',
+                     'pychecker_instructions_dispatched_total',
+                     'pychecker_warnings_total{level="unused"}'):
+            self.assertEquals(jobs[name], values[name])
+
+    def test_cache(self):
+        cacheDir = os.path.join(self.tmpdir, 'cache')
+        values = self._run(['--cache', cacheDir])
+        self.assertEquals(values['pychecker_cache_misses_total'], 2)
+        values = self._run(['--cache', cacheDir])
+        self.assertEquals(values['pychecker_cache_hits_total'], 2)
+        self.assertEquals(values['pychecker_files_checked_total'], 0)
+        self.assertEquals(values['pychecker_warnings_total{level="unused"}'],
+                          5)
+
+if __name__ == '__main__':
+    unittest.main()
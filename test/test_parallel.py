@@ -0,0 +1,57 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for checking files in parallel worker processes.
+'''
+
+import unittest
+import common
+
+from pychecker import parallel
+from pychecker import utils
+from pychecker import Config
+
+_FILES = [
+    'unused_import.py',
+    'test_global.py',
+    'nested.py',
+    'getmodule/A/C.py',
+    'getmodule/B/C.py',
+]
+
+class ParallelTestCase(common.TestCase):
+    '''
+    Test that checking in parallel gives the same output as checking
+    serially.
+    '''
+    def test_jobs(self):
+        self.checkMultiple('test_parallel', _FILES, '-Q --jobs 3')
+
+    def test_jobs_limit(self):
+        self.checkMultiple('test_parallel', _FILES, '-Q --jobs 3 --limit 3')
+
+    def test_jobs_maxworkermem(self):
+        # every worker retires after its first file
+        self.checkMultiple('test_parallel', _FILES,
+            '-Q --jobs 2 --maxworkermem 1')
+
+    def test_jobs_crash(self):
+        # the worker importing killself.py exits at once; its file is
+        # reported, and the other files are still checked
+        self.checkMultiple('test_parallel_crash',
+            ['killself.py', 'unused_import.py', 'nested.py'], '-Q --jobs 2')
+
+class ConfigTestCase(common.TestCase):
+    def test_error(self):
+        # the configuration is popped even if checking fails
+        depth = len(utils._cfg)
+        self.assertRaises(TypeError, parallel.checkFiles, None,
+                          Config.Config())
+        self.assertEquals(len(utils._cfg), depth)
+
+if not parallel.available():
+    del ParallelTestCase
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for showing how far a check is.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+import StringIO
+import common
+
+from pychecker import progress
+
+class ProgressTestCase(common.TestCase):
+    def test_status(self):
+        stream = StringIO.StringIO()
+        shown = progress.Progress(4, stream=stream)
+        start = shown._start
+        self.assertEquals(shown.status(start),
+            'pychecker: 0/4 files, 0 warnings')
+
+        shown.importing('first')
+        self.assertEquals(shown.status(start + 2.5),
+            'pychecker: 0/4 files, 0.0 modules/s, 0 warnings, '
+            'importing first (2s)')
+        shown.imported()
+        shown.importing('second')
+        shown.imported()
+
+        # three modules were loaded for the two files
+        shown.analyzingModules(3)
+        for name in ('first', 'second', 'third'):
+            shown.analyzing(name)
+            shown.analyzed(2)
+        self.assertEquals(shown.status(start + 10),
+            'pychecker: 2/4 files, 0.5 modules/s, 6 warnings, ETA 10s')
+
+        shown.checked(1)
+        shown.checked(0)
+        self.assertEquals(shown.status(start + 130),
+            'pychecker: 4/4 files, 0.1 modules/s, 7 warnings')
+
+        # not a terminal, so one line per update
+        shown.write()
+        shown.write()
+        lines = stream.getvalue().split('\n')
+        self.assertEquals(len(lines), 3)
+        self.failUnless(lines[0].startswith('pychecker: 4/4 files, '))
+        self.failUnless(lines[0].endswith(', 7 warnings'))
+
+    def test_disabled(self):
+        # reporting without a Progress started does nothing
+        progress.importing('module')
+        progress.imported()
+        progress.checked(1)
+        self.failIf(progress.showing())
+
+class ProgressFileTestCase(common.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_progress_file(self):
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        checker = os.path.join(os.path.dirname(testdir), 'pychecker',
+                               'checker.py')
+        path = os.path.join(self.tmpdir, 'status')
+        output = subprocess.Popen([sys.executable, checker,
+            '--progress-file', path, 'input/unused_import.py',
+            'input/nested.py'], cwd=testdir,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()
+        status = open(path).read()
+        self.failUnless(status.startswith(
+            'pychecker: 2/2 files, '), status)
+        self.failUnless(status.endswith(', 5 warnings\n'), status)
+        self.assertEquals(os.listdir(self.tmpdir), ['status'])
+        # the processing messages are still shown on stderr
+        self.failUnless('Processing module nested' in output[1], output[1])
+
+if __name__ == '__main__':
+    unittest.main()
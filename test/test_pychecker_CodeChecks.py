@@ -37,5 +37,9 @@ class OpcodesTestCase(common.TestCase):
     def test_INPLACE_TRUE_DIVIDE(self):
         self.check('future_divide')
 
+class ComplexityTestCase(common.TestCase):
+    def test_maxlines(self):
+        self.check('maxlines', '--maxlines 5')
+
 if __name__ == '__main__':
     unittest.main()
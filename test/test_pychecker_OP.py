@@ -0,0 +1,137 @@
+# -*- Mode: Python; test-case-name: test.test_pychecker_OP -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests related to pychecker.OP
+'''
+
+import sys
+import unittest
+import common
+
+from pychecker import OP
+
+def _function(a, b):
+    if a:
+        return [b.c for b in range(a)]
+    while b:
+        b = b - 1
+    return 'done'
+
+class TablesTestCase(common.TestCase):
+    '''
+    Test that the generated opcode tables are those of this Python.
+    '''
+    def testTables(self):
+        if not common.canImport('dis'):
+            # FIXME: no skip support
+            return
+
+        import dis
+        self.assertEquals(OP.opmap, dis.opmap)
+        self.assertEquals(OP.HAVE_ARGUMENT, dis.HAVE_ARGUMENT)
+        self.assertEquals(OP.EXTENDED_ARG, dis.EXTENDED_ARG)
+        self.assertEquals(list(OP._CMP_OP), list(dis.cmp_op))
+        for op in range(256):
+            self.assertEquals(OP._HAS_NAME[op], op in dis.hasname)
+            self.assertEquals(OP._HAS_JREL[op], op in dis.hasjrel)
+            self.assertEquals(OP._HAS_JABS[op], op in dis.hasjabs)
+            self.assertEquals(OP.name[op], dis.opname[op])
+
+    def testGenerated(self):
+        module = 'pychecker.opcodes%d%d' % sys.version_info[:2]
+        if not common.canImport(module):
+            # FIXME: no skip support
+            return
+        self.failUnless(OP._tables is sys.modules[module])
+
+    def testPredicates(self):
+        self.failUnless(OP.LOAD_GLOBAL(OP.opmap['LOAD_GLOBAL']))
+        self.failIf(OP.LOAD_GLOBAL(OP.opmap['LOAD_NAME']))
+        self.failUnless(OP.POP_TOP(OP.opmap['POP_TOP']))
+        # not an opcode in this version of Python
+        self.failIf(OP.LINE_NUM(127))
+        self.failIf(OP._is('NO_SUCH_OPCODE')(0))
+
+class InstructionsTestCase(common.TestCase):
+    '''
+    Test that decoding a code object once gives what decoding it
+    instruction by instruction does.
+    '''
+    def _decodeSlowly(self, code):
+        result = []
+        co_code = code.co_code
+        i = extended_arg = 0
+        while i < len(co_code):
+            start = i
+            op, oparg, i, extended_arg = OP.getInfo(co_code, i, extended_arg)
+            operand = label = None
+            if op >= OP.HAVE_ARGUMENT:
+                operand = OP.getOperand(op, code, oparg)
+                label = OP.getLabel(op, oparg, i)
+            result.append((start, op, oparg, operand, label))
+        return result
+
+    def _decodeQuickly(self, instructions):
+        result = []
+        for position in range(instructions.count):
+            label = instructions.labels[position]
+            if label < 0:
+                label = None
+            result.append((instructions.offsets[position],
+                           instructions.ops[position],
+                           instructions.opargs[position],
+                           instructions.operands[position], label))
+        return result
+
+    def testDecode(self):
+        code = _function.func_code
+        instructions = OP.decode(code)
+        self.assertEquals(self._decodeQuickly(instructions),
+                          self._decodeSlowly(code))
+        self.assertEquals(instructions.offsets[-1], len(code.co_code))
+
+        # decoded once
+        self.failUnless(OP.decode(code) is instructions)
+
+        # until they are cleared
+        OP.clearDecoded()
+        self.failIf(OP.decode(code) is instructions)
+
+    def testExtendedArg(self):
+        names = ', '.join(['n%d' % i for i in range(70000)])
+        code = compile('%s = 1\nn69999 = 2\n' % names, '<extended>', 'exec')
+        instructions = OP.decode(code)
+        self.assertEquals(self._decodeQuickly(instructions),
+                          self._decodeSlowly(code))
+        self.failUnless(OP.EXTENDED_ARG in instructions.ops.tolist())
+        self.failUnless('n69999' in instructions.operands)
+
+    def testInfo(self):
+        code = _function.func_code
+        instructions = OP.decode(code)
+        co_code = code.co_code
+        # also in the middle of an instruction
+        for index in range(len(co_code) - 2):
+            self.assertEquals(instructions.info(index),
+                              OP.getInfo(co_code, index, 0)[0:3])
+        self.assertRaises(IndexError, instructions.info, len(co_code))
+
+    def testLineNum(self):
+        code = compile('a = 1\n' + '\n' * 300 + 'b = 2\nc = 3\n' * 200,
+                       '<lines>', 'exec')
+        instructions = OP.decode(code)
+        co_lnotab = code.co_lnotab
+        for index in range(-1, len(code.co_code) + 1):
+            lineno = code.co_firstlineno
+            addr = 0
+            for lnotab_index in range(0, len(co_lnotab), 2):
+                addr = addr + ord(co_lnotab[lnotab_index])
+                if addr > index:
+                    break
+                lineno = lineno + ord(co_lnotab[lnotab_index+1])
+            self.assertEquals(instructions.lineNum(index), lineno)
+        self.assertEquals(instructions.lineNum(len(code.co_code) - 1), 701)
+
+if __name__ == '__main__':
+    unittest.main()
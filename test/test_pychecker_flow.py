@@ -0,0 +1,134 @@
+# -*- Mode: Python; test-case-name: test.test_pychecker_flow -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests related to pychecker.flow
+'''
+
+import unittest
+import common
+
+from pychecker import OP
+from pychecker import flow
+
+def _straight(a):
+    b = a + 1
+    return b
+
+def _conditions(a, b):
+    if a and b:
+        return 1
+    for c in b:
+        while c:
+            c = c - 1
+    return 2
+
+def _forever(a):
+    while 1:
+        a = a + 1
+    return a
+
+def _finally(a):
+    try:
+        return a.b
+    finally:
+        a.c()
+
+def _setLater(n, *args, **kwargs):
+    for i in range(n):
+        if i:
+            print last
+        last = i
+    if n:
+        first = 1
+    else:
+        print first
+
+def _setInTry(a):
+    try:
+        b = a.c
+    except AttributeError:
+        print b
+
+class GraphTestCase(common.TestCase):
+    def _graph(self, function):
+        return flow.graph(OP.decode(function.func_code))
+
+    def _position(self, function, op, operand):
+        instructions = OP.decode(function.func_code)
+        for position in range(instructions.count):
+            if instructions.ops[position] == OP.opmap[op] and \
+               instructions.operands[position] == operand:
+                return position
+        self.fail('no %s %s' % (op, operand))
+
+    def testBuiltOnce(self):
+        graph = self._graph(_straight)
+        self.failUnless(self._graph(_straight) is graph)
+        self.assertEquals(len(graph.blocks), 1)
+
+    def testComplexity(self):
+        self.assertEquals(self._graph(_straight).complexity(), 1)
+        # and, if, for and while
+        self.assertEquals(self._graph(_conditions).complexity(), 5)
+        # an except, and the test whether it matches
+        self.assertEquals(self._graph(_setInTry).complexity(), 3)
+
+    def testUnreachable(self):
+        self.assertEquals(self._graph(_straight).unreachable(), [])
+        self.assertEquals(self._graph(_conditions).unreachable(), [])
+        # the return after the loop
+        graph = self._graph(_forever)
+        code = _forever.func_code.co_code
+        loop = code.find(chr(OP.opmap['LOAD_FAST']))
+        after = code.rfind(chr(OP.opmap['LOAD_FAST']))
+        self.failUnless(graph.isReachable(loop))
+        self.failIf(graph.isReachable(after))
+        self.assertEquals(graph.unreachable(), [after])
+
+    def testFinally(self):
+        # the finally runs, but does not go on to the return None
+        graph = self._graph(_finally)
+        length = len(_finally.func_code.co_code)
+        position = self._position(_finally, 'LOAD_ATTR', 'c')
+        self.failUnless(graph.isReachable(
+            graph.instructions.offsets[position]))
+        self.failIf(graph.isReachable(length - 1))
+        self.assertEquals(graph.unreachable(), [])
+
+    def testMaybeSet(self):
+        graph = self._graph(_setLater)
+        # set in the previous iteration of the loop
+        self.failUnless(graph.maybeSet('last',
+            self._position(_setLater, 'LOAD_FAST', 'last')))
+        # only set when not going this way
+        self.failIf(graph.maybeSet('first',
+            self._position(_setLater, 'LOAD_FAST', 'first')))
+        # arguments
+        for name in ('n', 'args', 'kwargs'):
+            self.failUnless(graph.maybeSet(name, 0))
+        self.failIf(graph.maybeSet('i', 0))
+
+        # set before the exception
+        graph = self._graph(_setInTry)
+        self.failUnless(graph.maybeSet('b',
+            self._position(_setInTry, 'LOAD_FAST', 'b')))
+
+    def testMaybeSetInBlock(self):
+        # set earlier in the same block, but not at or after the load
+        graph = self._graph(_straight)
+        store = self._position(_straight, 'STORE_FAST', 'b')
+        self.failIf(graph.maybeSet('b', store))
+        self.failUnless(graph.maybeSet('b', store + 1))
+        self.failUnless(graph.maybeSet('b',
+            self._position(_straight, 'LOAD_FAST', 'b')))
+
+class FlowTestCase(common.TestCase):
+    def test_unreachable(self):
+        self.check('flow', '--unreachable')
+
+    def test_maxbranches(self):
+        self.check('flow', '--maxbranches 7 --maxreturns 1')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for importing modules in a sandboxed child.
+'''
+
+import os
+import sys
+import time
+import signal
+import shutil
+import tempfile
+import unittest
+import subprocess
+import common
+
+from pychecker import sandbox
+from pychecker import utils
+from pychecker import Config
+
+_SANDBOXED = '''
+import os
+import sandboxdep
+
+LIMIT = 10
+NAMES = ['a', 'b']
+TABLE = dict([(i, str(i)) for i in range(5000)])
+
+class Base(sandboxdep.Dep):
+    'doc'
+    def run(self, count=LIMIT):
+        return count
+
+    def helper():
+        return 1
+    helper = staticmethod(helper)
+
+    def _getName(self):
+        return os.sep
+    name = property(_getName)
+
+instance = Base()
+
+def function(a, b=None, *args):
+    return a
+'''
+
+_SANDBOXED_DEP = '''
+class Dep(object):
+    pass
+'''
+
+_CRASH = '''
+import os
+import signal
+os.kill(os.getpid(), signal.SIGSEGV)
+'''
+
+_HANG = '''
+import time
+time.sleep(60)
+'''
+
+_GOOD = '''
+import os
+
+def unused():
+    return 1
+'''
+
+def _crash():
+    os.kill(os.getpid(), signal.SIGSEGV)
+
+class ForkedTestCase(common.TestCase):
+    def test_timeout(self):
+        start = time.time()
+        self.assertRaises(sandbox.ForkTimeout, sandbox.forked,
+                          time.sleep, (10, ), 0.5)
+        self.failUnless(time.time() - start < 5)
+
+    def test_crash(self):
+        self.assertRaises(sandbox.ForkError, sandbox.forked, _crash)
+
+    def test_error(self):
+        def fail():
+            raise ValueError('failing on purpose')
+        stderr = sys.stderr
+        sys.stderr = open(os.devnull, 'w')
+        try:
+            self.assertRaises(sandbox.ForkError, sandbox.forked, fail)
+        finally:
+            sys.stderr = stderr
+
+class _TemporaryModulesTestCase(common.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, source):
+        handle = open(os.path.join(self.tmpdir, name), 'w')
+        handle.write(source)
+        handle.close()
+
+class LoadModuleTestCase(_TemporaryModulesTestCase):
+    def setUp(self):
+        _TemporaryModulesTestCase.setUp(self)
+        self._write('sandboxed.py', _SANDBOXED)
+        self._write('sandboxdep.py', _SANDBOXED_DEP)
+        sys.path.insert(0, self.tmpdir)
+        utils.initConfig(Config.Config())
+
+    def tearDown(self):
+        utils.popConfig()
+        sys.path.remove(self.tmpdir)
+        for name in ('sandboxed', 'sandboxdep'):
+            if sys.modules.has_key(name):
+                del sys.modules[name]
+        _TemporaryModulesTestCase.tearDown(self)
+
+    def test_load(self):
+        module = sandbox.loadModule('sandboxed',
+            os.path.join(self.tmpdir, 'sandboxed.py'))
+        self.failUnless(sys.modules['sandboxed'] is module)
+        self.failUnless(sys.modules['os'] is module.os)
+        self.assertEquals(module.LIMIT, 10)
+        self.assertEquals(module.NAMES, ['a', 'b'])
+        # too big to send
+        self.assertEquals(module.TABLE, {})
+
+        # the imported module was built from what the same child sent
+        self.failUnless(module.sandboxdep is sys.modules['sandboxdep'])
+        self.assertEquals(module.Base.__bases__, (module.sandboxdep.Dep, ))
+        self.assertEquals(module.Base.__module__, 'sandboxed')
+        self.assertEquals(module.Base.__doc__, 'doc')
+        self.failUnless(isinstance(module.instance, module.Base))
+
+        run = module.Base.__dict__['run']
+        self.assertEquals(run.func_code.co_varnames, ('self', 'count'))
+        self.assertEquals(run.func_defaults, (10, ))
+        self.failUnless(run.func_globals is module.__dict__)
+        self.failUnless(isinstance(module.Base.__dict__['helper'],
+                                   staticmethod))
+        self.failUnless(isinstance(module.Base.__dict__['name'], property))
+        self.assertEquals(module.function.func_code.co_argcount, 2)
+
+    def test_import_error(self):
+        self._write('sandboxbroken.py', 'import sandboxmissing\n')
+        self.assertRaises(ImportError, sandbox.loadModule, 'sandboxbroken',
+                          os.path.join(self.tmpdir, 'sandboxbroken.py'))
+
+class SandboxTestCase(_TemporaryModulesTestCase):
+    def _check(self, args, files, cwd):
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        checker = os.path.join(os.path.dirname(testdir),
+                               'pychecker', 'checker.py')
+        process = subprocess.Popen([sys.executable, checker,
+            '--limit', '0'] + args + files, cwd=cwd,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, errors = process.communicate()
+        return output
+
+    def test_same_warnings(self):
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        files = ['input/unused_import.py', 'input/nested.py',
+                 'input/starimport.py', 'input/test_dict.py']
+        self.assertEquals(self._check(['--sandbox'], files, testdir),
+                          self._check([], files, testdir))
+
+    def test_crash_and_hang(self):
+        self._write('sandboxcrash.py', _CRASH)
+        self._write('sandboxhang.py', _HANG)
+        self._write('sandboxgood.py', _GOOD)
+
+        start = time.time()
+        output = self._check(['--sandbox', '--sandbox-timeout', '2'],
+            ['sandboxcrash.py', 'sandboxhang.py', 'sandboxgood.py'],
+            self.tmpdir)
+        self.failUnless(time.time() - start < 30)
+        self.failUnless('sandboxcrash:1: NOT PROCESSED UNABLE TO IMPORT'
+                        in output, output)
+        self.failUnless('sandboxhang:1: NOT PROCESSED UNABLE TO IMPORT'
+                        in output, output)
+        self.failUnless('sandboxgood.py:2: Imported module (os) not used'
+                        in output, output)
+
+if __name__ == '__main__':
+    unittest.main()
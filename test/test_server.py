@@ -0,0 +1,111 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for the checker daemon.
+'''
+
+import os
+import sys
+import time
+import shutil
+import signal
+import commands
+import tempfile
+import unittest
+import subprocess
+import common
+
+class ServerTestCase(common.TestCase):
+    serverArgs = []
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._setUpFiles()
+        self.socket = os.path.join(self.tmpdir, 'server.sock')
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        self.checker = os.path.join(os.path.dirname(testdir), 'pychecker',
+                                    'checker.py')
+        self.server = subprocess.Popen(
+            [sys.executable, self.checker, '-Q', '--server', self.socket]
+            + self.serverArgs, cwd=self.tmpdir)
+        for _ in range(100):
+            if os.path.exists(self.socket):
+                break
+            time.sleep(0.05)
+
+    def _setUpFiles(self):
+        pass
+
+    def tearDown(self):
+        os.kill(self.server.pid, signal.SIGTERM)
+        self.server.wait()
+        self.failIf(os.path.exists(self.socket))
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, source, mtime=None):
+        path = os.path.join(self.tmpdir, name)
+        handle = open(path, 'w')
+        handle.write(source)
+        handle.close()
+        # make sure the modification time changes
+        if mtime is None:
+            mtime = time.time() + len(source)
+        os.utime(path, (mtime, mtime))
+
+    def _run(self, args):
+        return commands.getoutput('cd %s; %s %s %s' % (
+            self.tmpdir, sys.executable, self.checker, args))
+
+    def test_same_output(self):
+        self._write('simple.py', 'import os\n')
+        direct = self._run('--limit 0 simple.py')
+        client = self._run('--connect %s --limit 0 simple.py' % self.socket)
+        self.assertEquals(client, direct.replace(
+            'Processing module simple (simple.py)...\n', ''))
+
+    def test_changed_import(self):
+        self._write('servermain.py',
+            'import serverdep\n\ndef f():\n    return serverdep.value\n')
+        self._write('serverdep.py', 'import os\n')
+        output = self._run('--connect %s -Q servermain.py' % self.socket)
+        self.assertEquals(output,
+            'servermain.py:4: No module attribute (value) found')
+
+        self._write('serverdep.py', 'import os\nvalue = os.sep\n')
+        output = self._run('--connect %s -Q servermain.py' % self.socket)
+        self.assertEquals(output, '')
+
+class ForkServerTestCase(ServerTestCase):
+    serverArgs = ['--fork', '--preload', 'forkpre']
+
+    def _setUpFiles(self):
+        self._write('forkpre.py', 'value = 1\n')
+
+    def test_isolated(self):
+        # the same modification time would keep the module loaded in
+        # a daemon that does not fork
+        self._write('forkdep.py', 'import os\n', 1000000000)
+        self._write('forkmain.py',
+            'import forkdep\n\ndef f():\n    return forkdep.value\n')
+        output = self._run('--connect %s -Q forkmain.py' % self.socket)
+        self.assertEquals(output,
+            'forkmain.py:4: No module attribute (value) found')
+
+        self._write('forkdep.py', 'value = 1\n', 1000000000)
+        output = self._run('--connect %s -Q forkmain.py' % self.socket)
+        self.assertEquals(output, '')
+
+    def test_preloaded(self):
+        self._write('forkuser.py',
+            'import forkpre\n\ndef f():\n    return forkpre.other\n')
+        output = self._run('--connect %s -Q forkuser.py' % self.socket)
+        self.assertEquals(output,
+            'forkuser.py:4: No module attribute (other) found')
+
+        self._write('forkpre.py', 'value = 1\nother = 2\n')
+        output = self._run('--connect %s -Q forkuser.py' % self.socket)
+        self.assertEquals(output, '')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for checking source text that is not in a file.
+'''
+
+import os
+import unittest
+import common
+
+from pychecker import OP
+from pychecker import check
+from pychecker import Config
+
+_SOURCE = '''import os
+
+def f():
+    return missing
+'''
+
+class SourceTestCase(common.TestCase):
+    def setUp(self):
+        self.config = Config.Config()
+
+    def _format(self, warnings):
+        return [warning.format() for warning in warnings]
+
+    def test_check_source(self):
+        filename = os.path.join('nosuchdir', 'buffer.py')
+        warnings = check.check_source(_SOURCE, filename, self.config)
+        self.assertEquals(self._format(warnings), [
+            '%s:1: Imported module (os) not used' % filename,
+            '%s:4: No global (missing) found' % filename])
+
+    def test_check_sources(self):
+        warnings = check.check_sources([
+            ('first.py', 'import os\n'),
+            ('broken.py', 'x = (\n'),
+            ('second.py', 'def g(a):\n    return a\n'),
+        ], self.config)
+        self.assertEquals(self._format(warnings), [
+            'broken.py:1: NOT PROCESSED UNABLE TO IMPORT',
+            'first.py:1: Imported module (os) not used'])
+
+    def test_decoded(self):
+        # the decoded instructions do not outlive the check
+        check.check_source(_SOURCE, 'buffer.py', self.config)
+        self.assertEquals(OP._decoded, {})
+
+    def test_static(self):
+        self.config.staticAnalysis = 1
+        warnings = check.check_source(_SOURCE, 'buffer.py', self.config)
+        self.assertEquals(self._format(warnings), [
+            'buffer.py:1: Imported module (os) not used',
+            'buffer.py:4: No global (missing) found'])
+
+if __name__ == '__main__':
+    unittest.main()
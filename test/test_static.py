@@ -0,0 +1,68 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for checking modules without importing them.
+'''
+
+import os
+import sys
+import unittest
+import common
+
+from pychecker import pcmodules
+from pychecker import Config
+
+class StaticTestCase(common.TestCase):
+    def test_static_noexec(self):
+        self.check('static_noexec', '--static')
+
+    def test_unused_import(self):
+        # same output as when importing the module
+        self.check('unused_import', '--static')
+
+class StaticInternalTestCase(common.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(os.path.dirname(__file__))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_tokens(self):
+        config = Config.Config()
+        config.staticAnalysis = 1
+
+        from pychecker.check import _check
+        warnings = _check(['input/static_noexec.py', ], cfg=config)
+        self.assertEquals(len(warnings), 4)
+        self.failIf(sys.modules.has_key('_static_noexec_missing'))
+
+        pcmodule = pcmodules.getPCModule("static_noexec", moduleDir="input")
+        self.failUnless(pcmodule.mainCode)
+
+        functions = pcmodule.functions.keys()
+        self.assertEquals(functions, ['helper'])
+        self.assertEquals(pcmodule.functions['helper'].maxArgs, 2)
+        self.assertEquals(pcmodule.functions['helper'].minArgs, 1)
+
+        classes = pcmodule.classes.keys()
+        classes.sort()
+        self.assertEquals(classes, ['Base', 'Derived'])
+        derived = pcmodule.classes['Derived']
+        methods = [m for m in derived.methods.keys() if m[:2] != '__']
+        methods.sort()
+        self.assertEquals(methods, ['create', 'method', 'other'])
+
+        modules = pcmodule.modules.keys()
+        modules.sort()
+        self.assertEquals(modules, ['os', 'ospath'])
+
+        variables = pcmodule.variables.keys()
+        variables.sort()
+        self.failUnless('VALUE' in variables, variables)
+        self.failUnless('NAMES' in variables, variables)
+        self.failUnless('_static_noexec_missing' in variables, variables)
+
+if __name__ == '__main__':
+    unittest.main()
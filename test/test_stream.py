@@ -0,0 +1,47 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for printing the warnings of each module as soon as it is checked.
+'''
+
+import os
+import unittest
+import StringIO
+import common
+
+from pychecker import check
+from pychecker import Config
+
+_FILES = [
+    'unused_import.py',
+    'test_global.py',
+    'nested.py',
+    'getmodule/A/C.py',
+    'getmodule/B/C.py',
+]
+
+class StreamTestCase(common.TestCase):
+    def test_stream(self):
+        self.checkMultiple('test_stream', _FILES, '-Q --stream')
+
+    def test_stream_limit(self):
+        # the first warnings found are shown, not the most severe ones
+        self.checkMultiple('test_stream', _FILES, '-Q --stream --limit 3')
+
+    def test_stream_processing(self):
+        self.checkMultiple('test_stream', _FILES, '--stream')
+
+    def test_lazy(self):
+        # the warnings of the first file are out before the next is found
+        def files():
+            yield os.path.join(os.path.dirname(common.__file__), 'input',
+                               'unused_import.py')
+            raise AssertionError('looked past the first file')
+        stream = StringIO.StringIO()
+        self.assertRaises(AssertionError, check.streamWarnings, files(),
+                          Config.Config(), stream=stream)
+        self.failUnless('unused_import.py:' in stream.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
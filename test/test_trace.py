@@ -0,0 +1,136 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for tracing what pychecker does.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+import StringIO
+import common
+
+from pychecker import trace
+from pychecker import utils
+from pychecker import Config
+
+try:
+    import json
+except ImportError:
+    json = None
+
+class TraceTestCase(common.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'trace.jsonl')
+        self.stdout = sys.stdout
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        trace.configure(utils._cfg and utils._cfg[-1] or None)
+        shutil.rmtree(self.tmpdir)
+
+    def _config(self, args):
+        cfg = Config.Config()
+        cfg.processArgs(args)
+        return cfg
+
+    def test_parse(self):
+        self.assertEquals(trace.parse(['dis:2', 'import']),
+                          {trace.DIS: 2, trace.IMPORT: 1})
+        self.assertEquals(trace.parse(['all', 'warning:2'])[trace.WARNING], 2)
+        self.assertEquals(len(trace.parse(['all'])), len(trace.CATEGORIES))
+        self.assertRaises(ValueError, trace.parse, ['nothing'])
+        self.assertRaises(ValueError, trace.parse, ['dis:3'])
+
+    def test_off(self):
+        trace.configure(self._config([]))
+        self.failIf(trace.tracing)
+        self.failIf(trace.on(trace.RUN))
+
+        sys.stdout = StringIO.StringIO()
+        # not formatted, or it would fail
+        trace.event(trace.RUN, trace.BRIEF, '%d', 'not a number')
+        self.assertEquals(sys.stdout.getvalue(), '')
+
+    def test_levels(self):
+        trace.configure(self._config(['--trace', 'check,dis:2']))
+        self.failUnless(trace.tracing)
+        self.failUnless(trace.on(trace.DIS, trace.DETAIL))
+        self.failUnless(trace.on(trace.CHECK, trace.BRIEF))
+        self.failIf(trace.on(trace.CHECK, trace.DETAIL))
+        self.failIf(trace.on(trace.IMPORT))
+
+        sys.stdout = StringIO.StringIO()
+        trace.event(trace.CHECK, trace.BRIEF, 'checked %d', 3)
+        trace.event(trace.CHECK, trace.DETAIL, 'not traced')
+        trace.event(trace.IMPORT, trace.BRIEF, 'not traced')
+        trace.event(trace.DIS, trace.DETAIL, 'DIS', 1, 'name')
+        self.assertEquals(sys.stdout.getvalue(),
+                          'DEBUG: checked 3\nDEBUG: DIS 1 name\n')
+
+    def test_debug(self):
+        # -d traces everything, and follows the current configuration
+        utils.initConfig(self._config(['-d']))
+        try:
+            self.failUnless(trace.on(trace.DIS, trace.DETAIL))
+            utils.pushConfig()
+            utils.cfg().processArgs(['--no-debug'])
+            trace.configure(utils.cfg())
+            self.failIf(trace.tracing)
+            utils.popConfig()
+            self.failUnless(trace.tracing)
+        finally:
+            utils.popConfig()
+
+    def test_file(self):
+        trace.configure(self._config(['--trace', 'all',
+                                      '--trace-file', self.path]))
+        sys.stdout = StringIO.StringIO()
+        trace.event(trace.WARNING, trace.BRIEF, 'adding warning: %s', 'w')
+        trace.event(trace.RUN, trace.BRIEF, 'done')
+        self.assertEquals(sys.stdout.getvalue(), '')
+
+        lines = open(self.path).readlines()
+        self.assertEquals(len(lines), 2)
+        if json is None:
+            return
+        record = json.loads(lines[0])
+        self.assertEquals(record['category'], trace.WARNING)
+        self.assertEquals(record['level'], trace.BRIEF)
+        self.assertEquals(record['message'], 'adding warning: w')
+        self.assertEquals(record['pid'], os.getpid())
+
+class TraceFileTestCase(common.TestCase):
+    def test_run(self):
+        if json is None:
+            return
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'trace.jsonl')
+            testdir = os.path.dirname(os.path.abspath(__file__))
+            checker = os.path.join(os.path.dirname(testdir),
+                                   'pychecker', 'checker.py')
+            output = subprocess.Popen([sys.executable, checker, '-Q',
+                '--trace', 'dis:2,warning', '--trace-file', path,
+                'input/nested.py'], cwd=testdir,
+                stdout=subprocess.PIPE).communicate()[0]
+            self.failIf('DEBUG:' in output, output)
+
+            categories = {}
+            for line in open(path).readlines():
+                record = json.loads(line)
+                categories[record['category']] = 1
+            categories = categories.keys()
+            categories.sort()
+            self.assertEquals(categories, [trace.DIS, trace.WARNING])
+        finally:
+            shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- Mode: Python -*-
+# vi:si:et:sw=4:sts=4:ts=4
+
+'''
+Tests for checking files again when they change.
+'''
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import cStringIO
+import common
+
+from pychecker import watch
+from pychecker import utils
+from pychecker import Config
+
+class WatchTestCase(common.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+
+        self._write('watchmain.py',
+            'import watchdep\n\ndef f():\n    return watchdep.value\n')
+        self._write('watchdep.py', 'import os\n')
+        self._write('watchother.py', 'import os\n\ndef g():\n    pass\n')
+
+        self.config = Config.Config()
+        self.config.quiet = 1
+        utils.initConfig(self.config)
+        self.stream = cStringIO.StringIO()
+        self.files = ['watchmain.py', 'watchdep.py', 'watchother.py']
+        self.watcher = watch.Watcher(self.files, self.config,
+                                     stream=self.stream)
+
+    def tearDown(self):
+        utils.popConfig()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, source):
+        handle = open(name, 'w')
+        handle.write(source)
+        handle.close()
+        # make sure the modification time changes
+        mtime = time.time() + len(source)
+        os.utime(name, (mtime, mtime))
+
+    def test_watch(self):
+        self.watcher.check(self.files)
+        self.assertEquals(self.watcher.changed(), [])
+        self.watcher.printWarnings()
+        self.assertEquals(self.stream.getvalue(),
+            "watchdep.py:1: Imported module (os) not used\n\n"
+            "watchmain.py:4: No module attribute (value) found\n\n"
+            "watchother.py:1: Imported module (os) not used\n")
+
+        # the importer is checked again too
+        self._write('watchdep.py', 'import os\nvalue = os.sep\n')
+        changed = self.watcher.changed()
+        self.assertEquals(changed, ['watchmain.py', 'watchdep.py'])
+        self.watcher.check(changed)
+        self.assertEquals(self.watcher.warnings['watchmain.py'], [])
+        self.assertEquals(self.watcher.warnings['watchdep.py'], [])
+        self.assertEquals(self.watcher.changed(), [])
+
+        self._write('watchother.py', 'def g():\n    pass\n')
+        self.assertEquals(self.watcher.changed(), ['watchother.py'])
+
+if __name__ == '__main__':
+    unittest.main()